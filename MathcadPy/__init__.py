@@ -10,11 +10,15 @@ Copyright 2025 Matt Woodhead
 Requirements:
 
 Mathcad Prime ( https://www.mathcad.com )
-PyWin32 ( https://github.com/mhammond/pywin32 )
+PyWin32 ( https://github.com/mhammond/pywin32 ) - imported when the first Mathcad instance starts
 """
 
 from ._application import Mathcad, Worksheet
+from ._application import (
+    MathcadComError, MathcadAliasError, MathcadInputError, MathcadOutputError, MathcadTimeoutError
+)
 from ._application import _matrix_to_array, _array_check
+from .results import OutputResult
 from . import __version__ as ver_file
 
 __author__ = ver_file.__author__
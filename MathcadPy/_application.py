@@ -7,51 +7,141 @@ https://github.com/MattWoodhead/MathcadPy
 Copyright 2025 Matt Woodhead
 """
 
+import functools
+import hashlib
+import itertools
+import logging
+import warnings
+from array import array
+from numbers import Real
 from pathlib import Path
-import pythoncom
-import win32com.client as w32c
+
+from . import _com
+from .results import OutputResult, _is_matrix
+from .units import UnitConverter, scale
+from .util import Installation, find_installation, version_tuple
+
+logger = logging.getLogger(__name__)
+
+_SAVE_OPTIONS = {"Save": 0, "Prompt": 1, "Discard": 2}  # COM SaveOption enum
+ERROR_MODES = ["warn", "strict", "collect"]
 
 
 class Mathcad:
     """Mathcad application object"""
 
     _version_int = 0  # class variable for the Mathcad version
+    default_backend = None  # backend used when none is given (None for the COM server)
 
-    def __init__(self, visible=True):
+    def __init__(self, visible=True, backend=None, profiler=None, watchdog=None, version=None):
+        """
+        backend is an optional callable that returns the Mathcad application object. By default
+        the "MathcadPrime.Application" COM server is dispatched (pywin32 is imported at this
+        point, not when MathcadPy is imported), but a stand-in such as
+        MathcadPy.fake.FakeApplication can be supplied instead, either here or for every
+        instance by setting Mathcad.default_backend.
+        profiler is an optional MathcadPy.instrument.ComProfiler, which records every COM call
+        made by this instance and its worksheets
+        watchdog is an optional MathcadPy.watchdog.Watchdog, which applies time limits to the
+        Open and Synchronize calls and restarts Mathcad if one of them hangs
+        version selects an installed version of Mathcad Prime (e.g. "10" or "10.0.0.0", or an
+        Installation record from MathcadPy.util.list_installations), which is started through
+        its own COM ProgID. ValueError is raised if it is not installed
+        """
         # print("Loading Mathcad")
+        self.profiler = profiler
+        self.watchdog = watchdog
+        self.visible = visible
+        self.restarts = 0  # no. of times Mathcad has been restarted after a hung call
+        self._restarting = False
+        self.installation = None  # the requested Installation
+        if version is not None:
+            if isinstance(version, Installation):
+                self.installation = version
+            else:
+                self.installation = find_installation(version)
+            if backend is None:
+                if self.installation.prog_id is None:
+                    raise MathcadComError(
+                        f"{self.installation.name} is installed, but no COM ProgID starts it "
+                        "(only the most recently registered version can be automated)"
+                    )
+                backend = functools.partial(_com.dispatch, self.installation.prog_id)
+        if backend is None:
+            backend = Mathcad.default_backend or _com.dispatch
+        self._backend = backend
+        self._open_worksheets = {}  # {resolved path: Worksheet}, maintained incrementally
+        self._listed = False  # True once worksheets opened outside open() have been added
+        self._start()
+
+    def _start(self):
+        """Starts (or attaches to) the Mathcad application"""
         try:
-            self.__mcadapp = w32c.Dispatch("MathcadPrime.Application")
+            if self.watchdog is not None:
+                from .watchdog import mathcad_process_ids  # pylint: disable=import-outside-toplevel
+
+                process_ids = mathcad_process_ids()
+            self.__mcadapp = self._backend()
+            if self.watchdog is not None:
+                self.watchdog.track(process_ids)
+            if self.profiler is not None:
+                from .instrument import instrument  # pylint: disable=import-outside-toplevel
+
+                self.__mcadapp = instrument(self.__mcadapp, self.profiler)
 
             self.version = "0"
             self.version_major_int = 0
             self.get_version()  # Fetches Mathcad version and updates the above two variables
+            self._check_version()
 
-            self.open_worksheets = {}
-            if visible is False:
+            if self.visible is False:
                 self.__mcadapp.Visible = False
             else:
                 self.__mcadapp.Visible = True
-            self._list_worksheets()
-        except pythoncom.com_error as pcoe:
+        except _com.com_error as pcoe:
             try:
                 if pcoe.args[1] == "Invalid class string":
                     raise MathcadComError("Could not locate the Mathcad Automation API") from pcoe
             except:
-                raise pythoncom.com_error from pcoe
+                raise _com.com_error from pcoe
+
+    def _check_version(self):
+        """Warns if the running Mathcad is not the requested version"""
+        if self.installation is None:
+            return
+        wanted = version_tuple(self.installation.version)
+        running = version_tuple(self.version)
+        if running[:len(wanted)] != wanted[:len(running)]:
+            logger.warning(
+                "Mathcad Prime %s was requested, but Mathcad Prime %s is running (an existing "
+                "Mathcad instance may have been attached to)", self.installation.version,
+                self.version,
+            )
 
     def __getattribute__(self, *args):
         """ Used to allow access to hidden attributes of class instances """
         # https://docs.python.org/3/reference/datamodel.html#special-method-lookup
         return object.__getattribute__(self, *args)
 
+    @property
+    def open_worksheets(self):
+        """
+        {resolved path: Worksheet} of the worksheets open in the Mathcad instance. Worksheets that
+        were not opened with open() are listed from Mathcad the first time this is used
+        """
+        if not self._listed:
+            self._list_worksheets()
+        return self._open_worksheets
+
     def _list_worksheets(self):
-        """lists worksheets open in the Mathcad instance"""
-        ws_list = {}
-        for i in range(self.__mcadapp.Worksheets.Count):
-            ws_list[self.__mcadapp.Worksheets.Item(i).Name] = Worksheet(
-                self.__mcadapp.Worksheets.Item(i), self,
-            )  # {name: ws_object}
-        self.open_worksheets = ws_list
+        """Adds the worksheets open in the Mathcad instance to the open worksheets table"""
+        worksheets = self.__mcadapp.Worksheets
+        for i in range(worksheets.Count):
+            sheet_object = worksheets.Item(i)
+            filepath = _worksheet_path(sheet_object)
+            if filepath not in self._open_worksheets:
+                self._remember(filepath, Worksheet(sheet_object, self))
+        self._listed = True
 
     def activate(self):
         """Activate the Mathcad window. If visible, this maximises Mathcad"""
@@ -85,27 +175,83 @@ class Mathcad:
             worksheets.append(self.__mcadapp.Worksheets.Item(i).FullName)
         return worksheets  # Returns a list of open worksheet filenames
 
+    def _guarded(self, name, func, *args):
+        """
+        Calls func(*args) under the watchdog's time limit for name, if there is a watchdog. If
+        the call hangs, Mathcad is restarted and MathcadTimeoutError is raised
+        """
+        if self.watchdog is None:
+            return func(*args)
+        try:
+            return self.watchdog.call(name, func, *args)
+        except MathcadTimeoutError:
+            if not self._restarting:  # a hang whilst restarting is raised without another restart
+                self.restart()
+            raise
+
+    def restart(self):
+        """
+        Starts a new Mathcad instance (e.g. after the previous one was stopped by the watchdog)
+        and reopens the worksheets that were open. Existing Worksheet objects remain usable, but
+        their inputs are all sent again by the next set_inputs. Worksheets that had never been
+        saved cannot be reopened, so they are logged and removed from the open worksheets table
+        """
+        self.restarts += 1
+        self._restarting = True
+        try:
+            self._start()
+            for filepath, worksheet in list(self._open_worksheets.items()):
+                worksheet.refresh()
+                if not filepath.is_absolute():  # keyed by its name, as it has no file
+                    logger.warning(
+                        "The unsaved worksheet %s was lost when Mathcad was restarted", filepath
+                    )
+                    self._forget(worksheet)
+                    continue
+                worksheet.ws_object = self._open_sheet_object(filepath)
+        finally:
+            self._restarting = False
+
+    def _open_sheet_object(self, filepath: Path):
+        """Opens a worksheet in Mathcad, returning its full COM worksheet object"""
+        local_obj = self._guarded("Open", self.__mcadapp.Open, str(filepath))
+        # the api open method only returns a basic IMathcadPrimeWorksheet object, so the full
+        # object is fetched from the Worksheets collection. Mathcad adds newly opened sheets
+        # to the end, so the collection is only searched if it is not the last item
+        worksheets = self.__mcadapp.Worksheets
+        full_name = local_obj.FullName
+        sheet_object = worksheets.Item(worksheets.Count - 1)
+        if sheet_object.FullName != full_name:
+            for i in range(worksheets.Count):
+                sheet_object = worksheets.Item(i)
+                if sheet_object.FullName == full_name:
+                    break
+            else:
+                raise MathcadComError(
+                    f"{filepath} was opened, but Mathcad does not list it as an open worksheet"
+                )
+        return sheet_object
+
     def open(self, filepath: Path):
-        """Opens the filepath (if valid) in Mathcad"""
+        """
+        Opens the filepath (if valid) in Mathcad. If the file is already open, its existing
+        Worksheet is returned without calling Mathcad
+        """
         try:
             filepath = Path(filepath).resolve()
+            if filepath in self._open_worksheets:
+                return self._open_worksheets[filepath]
             if not filepath.exists():
                 raise FileNotFoundError()
             if filepath.suffix.lower() != ".mcdx":
                 raise ValueError()
 
-            local_obj = self.__mcadapp.Open(str(filepath))
-            # now we have opened a new worksheet, generate the list of open sheets from the API
-            local_worksheets = {}
-            # need to use a for-loop because the Mathcad API is shit
-            for i in range(self.__mcadapp.Worksheets.Count):
-                sheet_object = self.__mcadapp.Worksheets.item(i)
-                # the api open method only returns a basic IMathcadPrimeWorksheet object
-                local_worksheets[sheet_object.Name] = sheet_object
+            sheet_object = self._open_sheet_object(filepath)
 
             # add the worksheet into the open worksheets dictionary
-            self.open_worksheets[local_obj.Name] = Worksheet(local_worksheets[local_obj.Name], self)
-            return self.open_worksheets[local_obj.Name]  # return the worksheet object
+            worksheet = Worksheet(sheet_object, self)
+            self._remember(filepath, worksheet)
+            return worksheet  # return the worksheet object
 
         except TypeError as exc:
             raise TypeError(
@@ -118,27 +264,36 @@ class Mathcad:
 
     def close_all(self, save_option="Discard"):
         """Closes all worksheets. Can specify save options before closing"""
-        if save_option in ["Discard", 2]:  # check for both "Discard" and its COM equivalent enum
-            self.__mcadapp.CloseAll(2)
-        elif save_option in ["Prompt", 1]:
-            self.__mcadapp.CloseAll(1)
-        elif save_option in ["Save", 0]:
-            self.__mcadapp.CloseAll(0)
-        else:
-            print("incorrect save argument specified")
-        self._list_worksheets()
+        self.__mcadapp.CloseAll(_save_option(save_option))
+        self._clear_worksheets()
+        self._listed = save_option not in ["Prompt", 1]  # the user may keep some sheets open
+
+    def _clear_worksheets(self):
+        """Empties the open worksheets table"""
+        for worksheet in self._open_worksheets.values():
+            worksheet.refresh()  # the COM objects behind the old wrappers are no longer valid
+            worksheet._path = None
+        self._open_worksheets = {}
+
+    def _remember(self, filepath: Path, worksheet):
+        """Records the Worksheet open at filepath in the open worksheets table"""
+        self._forget(worksheet)
+        worksheet._path = filepath
+        self._open_worksheets[filepath] = worksheet
+
+    def _forget(self, worksheet):
+        """Removes a closed (or renamed) Worksheet from the open worksheets table"""
+        if self._open_worksheets.get(worksheet._path) is worksheet:
+            del self._open_worksheets[worksheet._path]
+        worksheet._path = None
 
     def quit(self, save_option="Discard"):
         """
         Closes all worksheets and closes the MathCAD instance.
         Can specify save options before closing
         """
-        if save_option in ["Discard", 2]:  # check for both "Discard" and its COM equivalent enum
-            self.__mcadapp.Quit(2)
-        elif save_option in ["Prompt", 1]:
-            self.__mcadapp.Quit(1)
-        elif save_option in ["Save", 0]:
-            self.__mcadapp.Quit(0)
+        self.__mcadapp.Quit(_save_option(save_option))
+        self._clear_worksheets()
 
 
 class Worksheet:
@@ -147,15 +302,66 @@ class Worksheet:
     Either a filepath for a mathcad file can be supplied, or the
     filepath can be set to None (or similar) and the optional
     open_sheet_name argument can be used
+
+    error_mode sets how errors that Mathcad reports for particular aliases are handled: "warn"
+    (the default) logs input errors as warnings to the MathcadPy._application logger, "strict"
+    raises MathcadInputError / MathcadOutputError and "collect" appends those exceptions to
+    the errors list (see take_errors) without logging. In every mode the error codes are also
+    returned to the caller. default_error_mode is used by worksheets whose error_mode is not set.
     """
 
+    default_error_mode = "warn"
+
     def __init__(self, _worksheet_COM_object=None, _application_class=None):
         self.ws_object = _worksheet_COM_object
         self._app_class = _application_class
-        # try:
-        self.__repr__ = self.ws_object.FullName
-        # except:
-        #     self.__repr__ = "__repr__error"
+        self._input_aliases = None  # cached {alias: index} of designated inputs
+        self._output_aliases = None  # cached {alias: index} of designated outputs
+        self.alias_calls_saved = 0  # no. of COM calls avoided by using the cached alias lists
+        self.result_cache = None  # optional ResultCache used by evaluate()
+        self._content_hash = None
+        self._path = None  # key of the worksheet in Mathcad.open_worksheets
+        self._pushed = {}  # {alias: (fingerprint, units, preserve units)} last sent by set_inputs
+        self._synchronized = False  # True if no input has been sent since the last Synchronize
+        self.inputs_skipped = 0  # no. of unchanged inputs that set_inputs did not re-send
+        self.synchronize_skipped = 0  # no. of Synchronize calls skipped as nothing had changed
+        self._output_values = {}  # {alias: (value, units, error code)} since the last change
+        self.unit_converter = UnitConverter()  # may be shared between worksheets
+        self.errors = []  # MathcadInputError/MathcadOutputError gathered in "collect" error_mode
+        self._input_state = {}  # {alias: value | (value, units)} of the inputs, for evaluate
+        self._pending = set()  # inputs set by evaluate calls served from the cache, not yet sent
+        self.last_input_errors = {}  # {alias: COM error count} from the last evaluate
+        self._error_mode = None  # None for default_error_mode
+
+    def __repr__(self):
+        return f"Worksheet('{self.ws_object.FullName}')"
+
+    @property
+    def error_mode(self) -> str:
+        """How errors reported for particular aliases are handled (see ERROR_MODES)"""
+        return self.default_error_mode if self._error_mode is None else self._error_mode
+
+    @error_mode.setter
+    def error_mode(self, error_mode):
+        if error_mode not in ERROR_MODES:
+            raise ValueError(
+                f"Incorrect error mode {error_mode!r}: expected 'warn', 'strict' or 'collect'"
+            )
+        self._error_mode = error_mode
+
+    def _report(self, error):
+        """Handles an input or output error according to error_mode"""
+        if self.error_mode == "strict":
+            raise error
+        if self.error_mode == "collect":
+            self.errors.append(error)
+        elif isinstance(error, MathcadInputError):  # output errors are only returned in warn mode
+            logger.warning("%s", error)
+
+    def take_errors(self) -> list:
+        """Returns (and clears) the errors gathered in "collect" error_mode"""
+        errors, self.errors = self.errors, []
+        return errors
 
     def activate(self):
         """activates the worksheet object"""
@@ -163,14 +369,11 @@ class Worksheet:
 
     def close(self, save_option="Save"):
         """Closes the worksheet"""
-        if save_option in ["Discard", 2]:
-            self.ws_object.Close(2)
-        elif save_option in ["Prompt", 1]:
-            self.ws_object.Close(1)
-        elif save_option in ["Save", 0]:
-            self.ws_object.Close(0)
-        else:
-            print("incorrect save argument specified")
+        save_option = _save_option(save_option)
+        self.refresh()
+        if self._app_class is not None:
+            self._app_class._forget(self)
+        self.ws_object.Close(save_option)
 
     def save(self):
         """Saves the worksheet"""
@@ -179,6 +382,7 @@ class Worksheet:
     def save_as(self, new_filepath: Path):
         """Saves the worksheet under a new filename"""
         new_filepath = Path(new_filepath)  # Cast to Path object incase they have used a string
+        self.refresh()
         if new_filepath.suffix.lower() == ".pdf":
             if self._app_class.version_major_int > 4:
                 # some versions of Mathcad Prime 5 had PDF export. 6 onwards had the functionality officially.
@@ -187,6 +391,9 @@ class Worksheet:
                 raise ValueError("Mathcad Prime 8 or newer is required to export as PDF")
         elif new_filepath.suffix.lower() in [".mcdx", ".rtf", ".xps"]:
             self.ws_object.SaveAs(new_filepath)
+            if new_filepath.suffix.lower() == ".mcdx" and self._app_class is not None:
+                # the worksheet is now the new file
+                self._app_class._remember(new_filepath.resolve(), self)
         else:
             raise ValueError(
                 "Filename must include one of the following file extensions: "
@@ -211,37 +418,77 @@ class Worksheet:
 
     def pause_calculation(self):
         """Pauses worksheet calculation"""
+        self._calculation_changed()
         self.ws_object.PauseCalculation()
 
     def resume_calculation(self):
         """Resumes the worksheets calculation"""
+        self._calculation_changed()
         self.ws_object.ResumeCalculation()
 
+    def _calculation_changed(self):
+        """
+        Forgets the output values read (and the Synchronize made) before calculation was paused or
+        resumed, as Mathcad may then re-calculate the worksheet
+        """
+        self._synchronized = False
+        self._output_values = {}
+
+    def refresh(self):
+        """
+        Clears the cached input/output alias lists so they are re-read from the worksheet, and
+        forgets the input values last sent by set_inputs so they are all sent again (and any
+        input values that were only served from the result cache)
+        """
+        self._input_state = {}
+        self._pending = set()
+        self._input_aliases = None
+        self._output_aliases = None
+        self._pushed = {}
+        self._synchronized = False
+        self._output_values = {}
+
+    def _input_changed(self, input_alias):
+        """Records that an input has been set outside of set_inputs"""
+        self._input_state.pop(input_alias, None)  # re-read by evaluate when it is next needed
+        self._pending.discard(input_alias)
+        self._pushed.pop(input_alias, None)
+        self._synchronized = False
+        self._output_values = {}
+
+    @staticmethod
+    def _read_aliases(com_aliases):
+        """Reads every alias from a COM Inputs/Outputs collection into an {alias: index} dict"""
+        return {com_aliases.GetAliasByIndex(i): i for i in range(com_aliases.Count)}
+
+    def _input_index(self):
+        """Returns the cached {alias: index} dict of designated inputs, reading it if required"""
+        if self._input_aliases is None:
+            self._input_aliases = self._read_aliases(self.ws_object.Inputs)
+        else:
+            self.alias_calls_saved += len(self._input_aliases) + 1  # GetAliasByIndex calls + Count
+        return self._input_aliases
+
+    def _output_index(self):
+        """Returns the cached {alias: index} dict of designated outputs, reading it if required"""
+        if self._output_aliases is None:
+            self._output_aliases = self._read_aliases(self.ws_object.Outputs)
+        else:
+            self.alias_calls_saved += len(self._output_aliases) + 1  # GetAliasByIndex calls + Count
+        return self._output_aliases
+
     def inputs(self):
         """returns a list of the designated input fields in the worksheet"""
-        _inputs = []
-        for i in range(self.ws_object.Inputs.Count):  # no. of open sheets
-            _inputs.append(self.ws_object.Inputs.GetAliasByIndex(i))
-        return _inputs
+        return list(self._input_index())
 
     def get_input(self, input_alias):
         """Fetches the curent value of a specific input"""
-        if input_alias in self.inputs():
+        if input_alias in self._input_index():
             try:
                 result = self.ws_object.InputGetValue(input_alias)
-                result_type = result.ResultType
-                if result_type == 1:  # ValueResultTypes_Real
-                    return result.RealResult, result.Units, result.ErrorCode
-                if result_type == 2:  # ValueResultTypes_String
-                    return result.StringResult, result.Units, result.ErrorCode
-                if result_type == 3:  # ValueResultTypes_Matrix
-                    return _matrix_to_array(result.MatrixResult), result.Units, result.ErrorCode
-                # else
-                return None, None, None
-            except pythoncom.com_error as pcoe:
+                return _unpack_value_result(result)
+            except _com.com_error as pcoe:
                 raise MathcadComError("COM Error fetching real_output") from pcoe
-            getinput = self.ws_object.InputGetRealValue(input_alias)
-            return getinput.RealResult, getinput.Units, getinput.ErrorCode
         # else
         raise ValueError(f"{input_alias} is not a designated input field")
 
@@ -252,11 +499,12 @@ class Worksheet:
         """
         return self.ws_object.InputGetRealValue(input_alias).Units
 
-    def get_matrix_input(self, input_alias):
-        """Fetches the curent value of a specific input"""
-        if input_alias in self.inputs():
+    def get_matrix_input(self, input_alias, as_numpy=False):
+        """Fetches the curent value of a specific input. Returns a numpy array if as_numpy is True"""
+        if input_alias in self._input_index():
             getinput = self.ws_object.InputGetMatrixValue(input_alias)
-            return _matrix_to_array(getinput.MatrixResult), getinput.Units, getinput.ErrorCode
+            matrix = _matrix_to_array(getinput.MatrixResult, as_numpy)
+            return matrix, getinput.Units, getinput.ErrorCode
         # else
         raise ValueError(f"{input_alias} is not a designated input field")
 
@@ -269,24 +517,19 @@ class Worksheet:
 
     def outputs(self):
         """returns a list of the designated output fields in the worksheet"""
-        _outputs = []
-        for i in range(self.ws_object.Outputs.Count):
-            _outputs.append(self.ws_object.Outputs.GetAliasByIndex(i))
-        return _outputs  # Returns a list of output aliases
+        return list(self._output_index())  # Returns a list of output aliases
 
     def get_real_output(self, output_alias, units="Default"):
         """Gets the numerical value from a designated output in the worksheet"""
         assert isinstance(output_alias, str)
         assert isinstance(units, str)
-        if output_alias in self.outputs():
+        if output_alias in self._output_index():
             try:
                 if units == "Default":
-                    result = self.ws_object.OutputGetRealValue(output_alias)
-                    return result.RealResult, result.Units, result.ErrorCode
+                    return self._native_output(output_alias)
                 # else
-                result = self.ws_object.OutputGetRealValueAs(output_alias, units)
-                return result.RealResult, units, result.ErrorCode
-            except pythoncom.com_error as pcoe:
+                return self._converted_output(output_alias, units)
+            except _com.com_error as pcoe:
                 raise MathcadComError("COM Error fetching real_output") from pcoe
         else:
             raise ValueError(f"{output_alias} is not a designated output field")
@@ -294,41 +537,154 @@ class Worksheet:
     def get_output(self, output_alias):
         """Gets the value from a designated output in the worksheet"""
         assert isinstance(output_alias, str)
-        if output_alias in self.outputs():
+        if output_alias in self._output_index():
             try:
-                result = self.ws_object.OutputGetValue(output_alias)
-                result_type = result.ResultType
-                if result_type == 1:  # ValueResultTypes_Real
-                    return result.RealResult, result.Units, result.ErrorCode
-                if result_type == 2:  # ValueResultTypes_String
-                    return result.StringResult, result.Units, result.ErrorCode
-                if result_type == 3:  # ValueResultTypes_Matrix
-                    return _matrix_to_array(result.MatrixResult), result.Units, result.ErrorCode
-                # else
-                return None, None, None
-            except pythoncom.com_error as pcoe:
+                return self._native_output(output_alias)
+            except _com.com_error as pcoe:
                 raise MathcadComError("COM Error fetching real_output") from pcoe
         else:
             raise ValueError(f"'{output_alias}' is not a designated output field")
 
+    def get_outputs(self, aliases=None, units=None, as_numpy=False, sink=None, case=None):
+        """
+        Gets the values of several designated outputs in one pass.
+
+        aliases is an iterable of output aliases (defaults to every designated output). units is an
+        optional {alias: units} dictionary of the units to convert outputs to. Every alias is
+        checked before any value is fetched. Matrix values are numpy arrays if as_numpy is True.
+        If sink (a MathcadPy.results.ResultSink) is given, the results are also written to it as
+        case number case. Outputs with an error code are handled according to error_mode.
+        Returns a dictionary of {alias: OutputResult}
+        """
+        results = self._fetch_outputs(aliases, units, as_numpy)
+        if sink is not None:
+            sink.write(results, case)
+        self._check_outputs(results, case)
+        return results
+
+    def _fetch_outputs(self, aliases=None, units=None, as_numpy=False):
+        """Fetches several designated outputs (see get_outputs)"""
+        output_index = self._output_index()
+        aliases = list(output_index) if aliases is None else list(aliases)
+        units = {} if units is None else units
+        for output_alias in aliases + list(units):
+            if output_alias not in output_index:
+                raise ValueError(f"'{output_alias}' is not a designated output field")
+
+        results = {}
+        try:
+            for output_alias in aliases:
+                if units.get(output_alias, "Default") == "Default":
+                    result = self._native_output(output_alias, as_numpy)
+                else:
+                    result = self._converted_output(output_alias, units[output_alias], as_numpy)
+                results[output_alias] = OutputResult(*result)
+        except _com.com_error as pcoe:
+            raise MathcadComError("COM Error fetching outputs") from pcoe
+        return results
+
+    def _check_outputs(self, results, case=None):
+        """Reports the outputs with an error code (only in "strict" and "collect" error_mode)"""
+        if self.error_mode == "warn":
+            return
+        failed = {
+            alias: result.error_code for alias, result in results.items() if result.error_code
+        }
+        if failed:
+            self._report(MathcadOutputError(failed, case))
+
+    def convert_outputs(self, unit_system: dict, aliases=None, as_numpy=False):
+        """
+        Gets several designated outputs converted to a unit system. unit_system maps worksheet
+        units to the units to convert them to, e.g. {"m": "in", "N": "lbf"}; outputs in units that
+        are not in unit_system are returned unchanged. Each pair of units is converted by Mathcad
+        only once, after which the conversion is made locally (see unit_converter).
+        Returns a dictionary of {alias: OutputResult}
+        """
+        output_index = self._output_index()
+        aliases = list(output_index) if aliases is None else list(aliases)
+        for output_alias in aliases:
+            if output_alias not in output_index:
+                raise ValueError(f"'{output_alias}' is not a designated output field")
+
+        results = {}
+        try:
+            for output_alias in aliases:
+                result = self._native_output(output_alias, as_numpy)
+                if result[1] in unit_system:
+                    result = self._converted_output(output_alias, unit_system[result[1]], as_numpy)
+                results[output_alias] = OutputResult(*result)
+        except _com.com_error as pcoe:
+            raise MathcadComError("COM Error fetching outputs") from pcoe
+        return results
+
+    def _native_output(self, output_alias, as_numpy=False):
+        """
+        Returns the (value, units, error code) of an output in the worksheet's units. Values are
+        kept until an input is set or the worksheet is re-calculated, so fetching the same output
+        again (e.g. to convert it to several unit systems) does not call Mathcad. Results with an
+        error code are not kept, as the error may clear without any input changing (e.g. once
+        calculation is resumed)
+        """
+        if output_alias not in self._output_values:
+            result = _unpack_value_result(self.ws_object.OutputGetValue(output_alias), as_numpy)
+            if result[2]:
+                return result
+            self._output_values[output_alias] = result
+        value, units, error_code = self._output_values[output_alias]
+        if value is not None and not isinstance(value, str) and _is_matrix(value):
+            value = _matrix_copy(value, as_numpy)  # callers may modify the matrix they are given
+        return value, units, error_code
+
+    def _converted_output(self, output_alias, units, as_numpy=False):
+        """
+        Returns the (value, units, error code) of an output converted to other units. Conversions
+        are made locally if the factor between the units is known, otherwise by Mathcad (and the
+        factor is then recorded)
+        """
+        value, native_units, error_code = self._native_output(output_alias, as_numpy)
+        converter = self.unit_converter
+        numeric = value is not None and not isinstance(value, str) and error_code == 0
+        if numeric:
+            factor = converter.factor(native_units, units)
+            if factor is not None:
+                return scale(value, factor), units, error_code
+
+        if numeric and _is_matrix(value):
+            result = self.ws_object.OutputGetMatrixValueAs(output_alias, units)
+            element = _first_nonzero(value)
+            if element is not None and result.ErrorCode == 0:
+                # one converted element is enough to find the factor
+                row, col = element
+                converted = result.MatrixResult.GetMatrixElement(row, col)
+                if converter.learn(native_units, units, value[row][col], converted):
+                    return scale(value, converter.factor(native_units, units)), units, error_code
+            return _matrix_to_array(result.MatrixResult, as_numpy), units, result.ErrorCode
+        # else
+        result = self.ws_object.OutputGetRealValueAs(output_alias, units)
+        if numeric and result.ErrorCode == 0:
+            converter.learn(native_units, units, value, result.RealResult)
+        return result.RealResult, units, result.ErrorCode
+
     def _get_output(self, output_alias):
         """DEPRECATED: Gets the value from a designated output in the worksheet"""
         # TODO - add deprecation notice
         return self.get_output(output_alias)
 
-    def get_matrix_output(self, output_alias, units="Default"):
-        """Gets the numerical value from a designated output in the worksheet"""
+    def get_matrix_output(self, output_alias, units="Default", as_numpy=False):
+        """
+        Gets the numerical value from a designated output in the worksheet. Returns a numpy array
+        if as_numpy is True
+        """
         assert isinstance(output_alias, str)
         assert isinstance(units, str)
-        if output_alias in self.outputs():
+        if output_alias in self._output_index():
             try:
                 if units == "Default":
-                    result = self.ws_object.OutputGetMatrixValue(output_alias)
-                else:
-                    result = self.ws_object.OutputGetMatrixValueAs(output_alias, units)
-                    print(dir(result))
-                return _matrix_to_array(result.MatrixResult), None, result.ErrorCode
-            except pythoncom.com_error as pcoe:
+                    return self._native_output(output_alias, as_numpy)
+                # else
+                return self._converted_output(output_alias, units, as_numpy)
+            except _com.com_error as pcoe:
                 raise MathcadComError("COM Error fetching matrix output") from pcoe
         else:
             raise ValueError(f"{output_alias} is not a designated output field")
@@ -338,38 +694,30 @@ class Worksheet:
         assert isinstance(input_alias, str)
         assert isinstance(units, str)
         assert isinstance(preserve_worksheet_units, bool)
-        if input_alias in self.inputs():  # Use inputs function to get list
+        if input_alias in self._input_index():  # Use the cached alias index
             if preserve_worksheet_units:
-                previous_units = self._get_real_input_units(input_alias)
-                if units:  # If units is not equal to ""
-                    try:
-                        assert units == previous_units
-                    except AssertionError as exc:
-                        raise AssertionError(
-                            "preserve_worksheet_units is True. The units argument "
-                            "does not equate to the units present in the Worksheet"
-                        ) from exc
-                else:  # No units are specified, but preserve_worksheet_units is True
-                    units = previous_units
+                units = _preserved_units(units, self._get_real_input_units(input_alias))
+            self._input_changed(input_alias)
             error = self.ws_object.SetRealValue(input_alias, value, units)
             # COM command returns error count. 0 = everything set correctly
         else:
             raise ValueError(f"{input_alias} is not a designated input field")
         if error > 0:
-            print(f"\nWarning!\nerror setting '{input_alias}' value/units\n")
+            self._report(MathcadInputError({input_alias: error}))
         return error
 
     def set_string_input(self, input_alias, string_value):
         """Set the value of a numerical input range in the worksheet"""
         assert isinstance(input_alias, str)
         assert isinstance(string_value, str)
-        if input_alias in self.inputs():  # Use inputs function to get list
+        if input_alias in self._input_index():  # Use the cached alias index
+            self._input_changed(input_alias)
             error = self.ws_object.SetStringValue(input_alias, string_value)
             # COM command returns error count. 0 = everything set correctly
         else:
             raise ValueError(f"{input_alias} is not a designated input field")
         if error > 0:
-            print(f"\nWarning!\nerror setting '{input_alias}' value/units\n")
+            self._report(MathcadInputError({input_alias: error}))
         return error
 
     def set_matrix_input(self, input_alias, matrix_array, units="", preserve_worksheet_units=True):
@@ -377,32 +725,12 @@ class Worksheet:
         assert isinstance(input_alias, str)
         assert isinstance(units, str)
         assert isinstance(preserve_worksheet_units, bool)
-        if input_alias in self.inputs():  # Check that the alias specified exists in the worksheet
+        if input_alias in self._input_index():  # Check that the alias specified exists in the worksheet
             if preserve_worksheet_units:
-                previous_units = self._get_matrix_input_units(input_alias)
-                if units:  # If units is not equal to ""
-                    try:
-                        assert units == previous_units
-                    except AssertionError as exc:
-                        raise AssertionError(
-                            "preserve_worksheet_units is True. The units argument "
-                            "does not equate to the units present in the Worksheet"
-                        ) from exc
-                else:  # No units are specified, but preserve_worksheet_units is True
-                    units = previous_units
-
-            rows, cols = _array_check(matrix_array)
-            temp_matrix = self.ws_object.CreateMatrix(rows, cols)
-            for row in range(rows):
-                for col in range(cols):
-                    value = matrix_array[row][col]
-                    try:
-                        temp_matrix.SetMatrixElement(row, col, value)
-                    except Exception as exc:
-                        raise ValueError(
-                            f"Error setting matrix element {row},{col}: {value}"
-                        ) from exc
+                units = _preserved_units(units, self._get_matrix_input_units(input_alias))
 
+            temp_matrix = self._create_matrix(matrix_array)
+            self._input_changed(input_alias)
             error = self.ws_object.SetMatrixValue(str(input_alias), temp_matrix, str(units))
             # error = self.ws_object.SetRealValue(str(input_alias),
             #                                     matrix_array, str(units))
@@ -411,48 +739,408 @@ class Worksheet:
         else:
             raise ValueError(f"{input_alias} is not a designated input field")
         if error > 0:
-            print(f"\nWarning!\nerror setting '{input_alias}' value/units\n")
+            self._report(MathcadInputError({input_alias: error}))
         return error
 
+    def _create_matrix(self, matrix_array):
+        """
+        Builds a COM matrix object in the worksheet from a list of lists, a numpy array or any
+        other 2D buffer protocol object
+        """
+        matrix_array = _array_rows(matrix_array)
+        rows, cols = _array_check(matrix_array)
+        temp_matrix = self.ws_object.CreateMatrix(rows, cols)
+        set_element = temp_matrix.SetMatrixElement  # bind once - COM attribute lookups are slow
+        for row, row_values in enumerate(matrix_array):
+            for col, value in enumerate(row_values):
+                try:
+                    set_element(row, col, value)
+                except Exception as exc:
+                    raise ValueError(
+                        f"Error setting matrix element {row},{col}: {value}"
+                    ) from exc
+        return temp_matrix
+
+    def set_inputs(self, input_values: dict, preserve_worksheet_units=True, synchronize=True,
+                   case=None):
+        """
+        Sets several inputs in one batch, with worksheet calculation paused whilst they are sent.
+
+        input_values maps each input alias to either a value or a (value, units) tuple. Strings are
+        sent with SetStringValue, real numbers with SetRealValue and anything else is treated as a
+        matrix. Every alias (and, if preserve_worksheet_units is True, its worksheet units) is
+        checked before any value is sent. If synchronize is True, the worksheet is re-calculated
+        once after the batch. Returns a dictionary of {alias: COM error count}.
+
+        Only inputs whose value or units differ from those last sent by set_inputs are sent
+        (matrices are compared by a hash of their contents), and Synchronize is skipped if
+        nothing has changed since the worksheet was last re-calculated. Call refresh() if the
+        worksheet may have been edited by other means. Input errors are handled according to
+        error_mode, and are labelled with case.
+        """
+        assert isinstance(input_values, dict)
+        assert isinstance(preserve_worksheet_units, bool)
+        input_index = self._input_index()
+        batch = []  # (alias, kind, value, units)
+        errors = {}
+        fingerprints = {}  # {alias: (fingerprint, units, preserve units)} of the inputs to send
+        for input_alias, value in input_values.items():
+            if input_alias not in input_index:
+                raise ValueError(f"{input_alias} is not a designated input field")
+            units = ""
+            if isinstance(value, tuple) and len(value) == 2 and isinstance(value[1], str):
+                value, units = value
+            kind = _input_kind(value)
+            fingerprint = (_fingerprint(kind, value), units, preserve_worksheet_units)
+            if fingerprint[0] is not None and self._pushed.get(input_alias) == fingerprint:
+                errors[input_alias] = 0  # unchanged since it was last sent
+                self.inputs_skipped += 1
+                continue
+            fingerprints[input_alias] = fingerprint
+            batch.append((input_alias, kind, value, units))
+
+        if preserve_worksheet_units:  # fetch the worksheet units for every alias in one pass
+            for i, (input_alias, kind, value, units) in enumerate(batch):
+                if kind == "real":
+                    previous_units = self._get_real_input_units(input_alias)
+                elif kind == "matrix":
+                    previous_units = self._get_matrix_input_units(input_alias)
+                else:
+                    continue  # string inputs have no units
+                batch[i] = (input_alias, kind, value, _preserved_units(units, previous_units))
+
+        if batch:
+            self._send_inputs(batch, errors, fingerprints)
+        if synchronize:
+            if self._synchronized:
+                self.synchronize_skipped += 1
+            else:
+                self._synchronize()
+        self._input_state.update(input_values)
+        self._pending.difference_update(input_values)
+        failed = {input_alias: error for input_alias, error in errors.items() if error > 0}
+        if failed:
+            self._report(MathcadInputError(failed, case))
+        return errors
+
+    def _send_inputs(self, batch, errors, fingerprints):
+        """Sends a batch of inputs with calculation paused, recording the values that were set"""
+        for input_alias, *_value in batch:
+            self._pushed.pop(input_alias, None)  # unknown until it has been sent successfully
+        self._synchronized = False
+        self._output_values = {}
+        self.ws_object.PauseCalculation()
+        try:
+            for input_alias, kind, value, units in batch:
+                if kind == "string":
+                    errors[input_alias] = self.ws_object.SetStringValue(input_alias, value)
+                elif kind == "real":
+                    errors[input_alias] = self.ws_object.SetRealValue(input_alias, value, units)
+                else:
+                    temp_matrix = self._create_matrix(value)
+                    errors[input_alias] = self.ws_object.SetMatrixValue(input_alias, temp_matrix, units)
+        finally:
+            self.ws_object.ResumeCalculation()
+        for input_alias, fingerprint in fingerprints.items():
+            if errors.get(input_alias) == 0 and fingerprint[0] is not None:
+                self._pushed[input_alias] = fingerprint
+
+    def content_hash(self):
+        """Returns the SHA-256 hash of the worksheet file, as it was when first requested"""
+        if self._content_hash is None:
+            from .cache import file_hash  # pylint: disable=import-outside-toplevel
+
+            self._content_hash = file_hash(self.ws_object.FullName)
+        return self._content_hash
+
+    def enable_result_cache(self, cache=None):
+        """
+        Enables memoization of evaluate() results. A new in-memory ResultCache is created if one is
+        not supplied. The same cache can be shared by several worksheets. Returns the cache
+        """
+        if cache is None:
+            from .cache import ResultCache  # pylint: disable=import-outside-toplevel
+
+            cache = ResultCache()
+        self.result_cache = cache
+        return self.result_cache
+
+    def evaluate(self, input_values: dict, outputs=None, units=None, preserve_worksheet_units=True,
+                 as_numpy=False, sink=None, case=None):
+        """
+        Sets the input values (see set_inputs), re-calculates the worksheet and returns the output
+        values (see get_outputs). If sink is given, the inputs and outputs are written to it as
+        case number case.
+
+        If a result cache has been enabled, results are memoized by the worksheet file's content
+        hash and the values of every designated input once input_values have been applied (the
+        inputs that have not been set are read from the worksheet the first time). When a result
+        is served from the cache, nothing is sent to Mathcad; the values are sent with the next
+        case that has to be calculated. Results with any input or output error are not cached.
+        The input error codes of the case are kept in last_input_errors
+        """
+        key = None
+        self.last_input_errors = {}
+        if self.result_cache is not None:
+            from .cache import result_key  # pylint: disable=import-outside-toplevel
+
+            key = result_key(
+                self.content_hash(), self._full_input_state(input_values), outputs, units,
+                preserve_worksheet_units=preserve_worksheet_units,
+            )
+            self._pending.update(input_values)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                results = {
+                    alias: OutputResult(_cached_value(value, as_numpy), result_units, error_code)
+                    for alias, (value, result_units, error_code) in cached.items()
+                }
+                if sink is not None:
+                    sink.write(results, case, input_values)
+                return results
+            # also send the values of earlier cases that were served from the cache
+            input_values = {input_alias: self._input_state[input_alias]
+                            for input_alias in self._pending}
+        input_errors = self.set_inputs(
+            input_values, preserve_worksheet_units, synchronize=True, case=case
+        )
+        self.last_input_errors = input_errors
+        results = self._fetch_outputs(outputs, units, as_numpy)
+        if sink is not None:
+            sink.write(results, case, input_values)
+        self._check_outputs(results, case)
+        failed = any(input_errors.values()) or any(result.error_code for result in results.values())
+        if key is not None and not failed:
+            self.result_cache.put(key, {
+                alias: (_cached_value(result.value), result.units, result.error_code)
+                for alias, result in results.items()
+            })
+        return results
+
+    def _full_input_state(self, input_values) -> dict:
+        """
+        Applies input_values to the recorded input state, and returns the value of every
+        designated input. Inputs whose values are not known are read from the worksheet
+        """
+        input_index = self._input_index()
+        for input_alias, value in input_values.items():
+            if input_alias not in input_index:
+                raise ValueError(f"{input_alias} is not a designated input field")
+            self._input_state[input_alias] = value
+        for input_alias in input_index:
+            if input_alias not in self._input_state:
+                value, units, _error_code = self.get_input(input_alias)
+                self._input_state[input_alias] = (value, units)
+        return dict(self._input_state)
+
     def PauseCalculation(self):  # todo - duplicate of pause_calculation
         """DEPRECATED: Pauses worksheet calculation - may speed up routines the set many input values"""
-        print(
-            "Warning: the PauseCalculation method will be removed in a future version "
-            "- use pause_calculation instead"
+        warnings.warn(
+            "the PauseCalculation method will be removed in a future version "
+            "- use pause_calculation instead", DeprecationWarning, stacklevel=2,
         )
+        self._calculation_changed()
         self.ws_object.PauseCalculation()
 
     def ResumeCalculation(self):  # todo - duplicate of resume_calculation
         """DEPRECATED: Pauses worksheet calculation"""
-        print(
-            "Warning: the ResumeCalculation method will be removed in a future version "
-            "- use resume_calculation instead"
+        warnings.warn(
+            "the ResumeCalculation method will be removed in a future version "
+            "- use resume_calculation instead", DeprecationWarning, stacklevel=2,
         )
+        self._calculation_changed()
         self.ws_object.ResumeCalculation()
 
     def syncronize(self):
         """Syncronises (i.e. re-calculates) worksheet"""
-        self.ws_object.Synchronize()
+        self.calculate()
 
     def calculate(self):
         """Syncronises (i.e. re-calculates) worksheet"""
-        self.ws_object.Synchronize()
+        self._output_values = {}
+        self._synchronize()
+
+    def _synchronize(self):
+        """Calls Synchronize, under the watchdog's time limit if the application has one"""
+        if self._app_class is None:
+            self.ws_object.Synchronize()
+        else:
+            self._app_class._guarded("Synchronize", self.ws_object.Synchronize)
+        self._synchronized = True
+
+
+def _cached_value(value, as_numpy=False):
+    """
+    Converts an output value to the form held in a result cache (matrices as lists), or back
+    from it to a numpy array if as_numpy is True
+    """
+    if as_numpy and _is_matrix(value):
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return np.array(value, dtype=np.float64)
+    if hasattr(value, "tolist"):  # numpy arrays
+        return value.tolist()
+    if _is_matrix(value):
+        return [list(row) for row in value]  # a copy, so callers cannot change the cached value
+    return value
 
 
-def _matrix_to_array(mathcad_matrix_obj) -> list:
-    """converts a COM matrix object to a list of lists (row = sub list, column = value)"""
+def _worksheet_path(sheet_object) -> Path:
+    """Returns the key of a worksheet COM object in the open worksheets table"""
+    full_name = sheet_object.FullName
+    if full_name:
+        return Path(full_name).resolve()
+    return Path(sheet_object.Name)  # an unsaved worksheet
+
+
+def _matrix_to_array(mathcad_matrix_obj, as_numpy=False):
+    """
+    converts a COM matrix object to a list of lists (row = sub list, column = value), or to a
+    2D float64 numpy array if as_numpy is True
+
+    The Mathcad Prime matrix object only exposes element accessors, so one GetMatrixElement call
+    is made per element. When as_numpy is True the elements are written straight into a
+    preallocated float64 buffer rather than being collected into intermediate lists.
+    """
 
     rows = int(mathcad_matrix_obj.Rows)
     # print(f"rows: {rows}")
     cols = int(mathcad_matrix_obj.Columns)
     # print(f"cols: {cols}")
+    get_element = mathcad_matrix_obj.GetMatrixElement  # bind once - COM attribute lookups are slow
+    if as_numpy:
+        try:
+            import numpy as np  # pylint: disable=import-outside-toplevel
+        except ModuleNotFoundError as exc:  # numpy is optional - it is only required here
+            raise ModuleNotFoundError("numpy must be installed to use as_numpy=True") from exc
+        matrix = np.fromiter(
+            (get_element(row, col) for row in range(rows) for col in range(cols)),
+            dtype=np.float64,
+            count=rows * cols,
+        )
+        return matrix.reshape((rows, cols))
     matrix = []
     for row in range(rows):
-        row_list = [mathcad_matrix_obj.GetMatrixElement(row, col) for col in range(cols)]
+        row_list = [get_element(row, col) for col in range(cols)]
         matrix.append(row_list)
     return matrix
 
 
+def _matrix_copy(matrix, as_numpy=False):
+    """Returns a copy of a matrix value, as a numpy array if as_numpy is True"""
+    if as_numpy:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return np.array(matrix, dtype=np.float64)
+    if hasattr(matrix, "tolist"):  # numpy arrays
+        return matrix.tolist()
+    return [list(row) for row in matrix]
+
+
+def _first_nonzero(matrix):
+    """Returns the (row, col) of the first non-zero element of a matrix, or None"""
+    for row, row_values in enumerate(matrix):
+        for col, element in enumerate(row_values):
+            if element != 0:
+                return row, col
+    return None
+
+
+def _array_rows(matrix_array):
+    """
+    Returns a matrix input as a sequence of rows. numpy arrays and other buffer protocol objects
+    are converted to nested lists of python numbers in a single C-level step (memoryview.tolist)
+    rather than being indexed one element at a time
+    """
+    if isinstance(matrix_array, (list, tuple)):
+        return matrix_array
+    try:
+        view = memoryview(matrix_array)
+    except TypeError:  # not a buffer - index it like a list of lists
+        return matrix_array
+    if view.ndim != 2:
+        raise ValueError(f"Matrix inputs must be 2 dimensional. Got {view.ndim} dimension(s)")
+    try:
+        return view.tolist()
+    except NotImplementedError:  # unsupported buffer format (e.g. an object dtype numpy array)
+        return matrix_array
+
+
+def _unpack_value_result(result, as_numpy=False) -> tuple:
+    """Unpacks a COM value result object (of any result type) into a (value, units, error) tuple"""
+    result_type = result.ResultType
+    if result_type == 1:  # ValueResultTypes_Real
+        return result.RealResult, result.Units, result.ErrorCode
+    if result_type == 2:  # ValueResultTypes_String
+        return result.StringResult, result.Units, result.ErrorCode
+    if result_type == 3:  # ValueResultTypes_Matrix
+        return _matrix_to_array(result.MatrixResult, as_numpy), result.Units, result.ErrorCode
+    # else no value (e.g. the output could not be calculated), but the error code is still returned
+    return None, None, result.ErrorCode
+
+
+def _save_option(save_option) -> int:
+    """Returns the COM SaveOption enum for "Save", "Prompt" or "Discard" (or the enum itself)"""
+    if save_option in _SAVE_OPTIONS.values():
+        return save_option
+    try:
+        return _SAVE_OPTIONS[save_option]
+    except (KeyError, TypeError) as exc:
+        raise ValueError(
+            f"Incorrect save option {save_option!r}: expected 'Save', 'Prompt' or 'Discard'"
+        ) from exc
+
+
+def _preserved_units(units: str, previous_units: str) -> str:
+    """
+    Returns the units to send when preserve_worksheet_units is True. If units were specified,
+    they must equate to the units already present in the worksheet
+    """
+    if units:  # If units is not equal to ""
+        try:
+            assert units == previous_units
+        except AssertionError as exc:
+            raise AssertionError(
+                "preserve_worksheet_units is True. The units argument "
+                "does not equate to the units present in the Worksheet"
+            ) from exc
+        return units
+    # else no units are specified, but preserve_worksheet_units is True
+    return previous_units
+
+
+def _input_kind(value) -> str:
+    """Returns the type of input ("string", "real" or "matrix") a python value should be sent as"""
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, Real):  # also covers numpy scalar types
+        return "real"
+    return "matrix"
+
+
+def _fingerprint(kind, value):
+    """
+    Returns a comparable fingerprint of an input value, used to detect inputs that have not
+    changed. Matrices are reduced to their shape and a hash of their contents. Returns None if the
+    value cannot be fingerprinted (it is then always sent)
+    """
+    if kind == "string":
+        return value
+    if kind == "real":
+        return float(value)
+    try:
+        view = memoryview(value)
+    except TypeError:  # a list of lists
+        try:
+            rows = [len(row) for row in value]
+            data = array("d", itertools.chain.from_iterable(value))
+        except TypeError:
+            return None
+        return tuple(rows), hashlib.blake2b(data).digest()
+    data = view if view.c_contiguous else view.tobytes()
+    return view.format, view.shape, hashlib.blake2b(data).digest()
+
+
 def _array_check(matrix_array: list):
     """A helper function to validate that the array input is suitable to be sent to Mathcad"""
     rows = len(matrix_array)
@@ -493,6 +1181,42 @@ class MathcadComError(Exception):
         super().__init__(message if error_code is None else f"{message} [Error Code {error_code}]")
 
 
+class MathcadTimeoutError(MathcadComError):
+    """Raised when a Mathcad call runs past its watchdog time limit and Mathcad is stopped"""
+
+
+class MathcadAliasError(MathcadComError):
+    """
+    Base class of the errors Mathcad reports for particular aliases. errors is a dictionary of
+    {alias: error code}, case is the case number it occurred in and inputs the {input alias:
+    value} it occurred at (None if not known)
+    """
+
+    _description = "Mathcad reported an error"
+
+    def __init__(self, errors: dict, case=None, inputs=None) -> None:
+        self.errors = errors
+        self.case = case
+        self.inputs = inputs
+        aliases = ", ".join(f"'{alias}'" for alias in errors)
+        message = f"{self._description} for {aliases}"
+        if inputs is not None:
+            message = f"{message} at {inputs}"
+        super().__init__(message if case is None else f"case {case}: {message}")
+
+
+class MathcadInputError(MathcadAliasError):
+    """Mathcad reported an error setting the value/units of one or more inputs"""
+
+    _description = "error setting value/units"
+
+
+class MathcadOutputError(MathcadAliasError):
+    """One or more outputs were returned with an error code"""
+
+    _description = "error code returned"
+
+
 if __name__ == "__main__":
     mc = Mathcad()
     print(mc.get_version())
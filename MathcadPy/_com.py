@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+_com.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Lazy loading of pywin32. The COM modules are only imported when a Mathcad instance is first
+created with the COM backend, so the rest of the package (the matrix helpers, result handling and
+offline .mcdx tools) can be imported quickly, and on machines without pywin32.
+"""
+
+import sys
+
+PROG_ID = "MathcadPrime.Application"
+
+
+class _ComUnavailable(Exception):
+    """
+    Stands in for pythoncom.com_error before pywin32 has been loaded. It is only raised by
+    MathcadPy.replay, for the COM errors in a trace replayed without pywin32
+    """
+
+
+def dispatch(prog_id=PROG_ID):
+    """Attaches to (or starts) the Mathcad COM server"""
+    import win32com.client  # pylint: disable=import-outside-toplevel
+
+    return win32com.client.Dispatch(prog_id)
+
+
+def dispatch_ex(prog_id=PROG_ID):
+    """Starts a new instance of the Mathcad COM server"""
+    import win32com.client  # pylint: disable=import-outside-toplevel
+
+    return win32com.client.DispatchEx(prog_id)
+
+
+def get_active(prog_id=PROG_ID):
+    """Returns the running Mathcad instance, or None if Mathcad is not running"""
+    import pythoncom  # pylint: disable=import-outside-toplevel
+    import win32com.client  # pylint: disable=import-outside-toplevel
+
+    try:
+        return win32com.client.GetActiveObject(prog_id)
+    except pythoncom.com_error:  # Mathcad is not running
+        return None
+
+
+def attach(prog_id=PROG_ID):
+    """Attaches to a running Mathcad instance, or starts one if none is running"""
+    active = get_active(prog_id)
+    return dispatch(prog_id) if active is None else active
+
+
+def __getattr__(name):
+    """
+    Provides com_error, the pywin32 COM exception class, for use in except clauses. No COM error
+    can have been raised if pywin32 has not been imported, so a placeholder is returned until it is
+    """
+    if name == "com_error":
+        pythoncom = sys.modules.get("pythoncom")
+        return _ComUnavailable if pythoncom is None else pythoncom.com_error
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
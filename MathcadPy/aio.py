@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+aio.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+asyncio front-end for the Mathcad and Worksheet classes. Every COM call is made on a dedicated
+single threaded apartment (STA) thread owned by the AsyncMathcad instance, so long running calls
+such as Open, Synchronize and SaveAs do not block the event loop:
+
+>>> from MathcadPy.aio import AsyncMathcad
+>>> async def main():
+...     async with AsyncMathcad(visible=False, timeout=60) as mathcad_app:
+...         worksheet = await mathcad_app.open("beam.mcdx")
+...         await worksheet.set_inputs({"length": 2.0})
+...         results = await worksheet.get_outputs(["deflection"])
+...         await worksheet.save_as("beam.pdf")
+
+Calls on one instance are queued and run one at a time, in order. To evaluate cases concurrently,
+use AsyncMathcadPool, which spreads them over several Mathcad instances.
+
+A call that times out (or is cancelled) whilst it is running in Mathcad cannot be interrupted; it
+runs to completion on the STA thread, and later calls on the same instance wait for it.
+AsyncMathcadPool therefore sets aside (quarantines) an instance whose call timed out until that
+call has finished, rather than queueing the next case behind it.
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from ._application import Mathcad
+from .pool import new_instance
+
+_DEFAULT = object()  # timeout argument: use the instance's default time limit
+
+
+class _StaThread:
+    """A thread that initialises COM and then runs queued calls one at a time"""
+
+    def __init__(self, name="MathcadPy STA"):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            import pythoncom  # pylint: disable=import-outside-toplevel
+        except ModuleNotFoundError:  # e.g. a pure-Python backend on a non-Windows machine
+            pythoncom = None
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                future, func, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue  # cancelled whilst it was queued
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as exc:  # pylint: disable=broad-except
+                    future.set_exception(exc)
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def submit(self, func, *args, **kwargs) -> concurrent.futures.Future:
+        """Queues a call, returning a future for its result"""
+        future = concurrent.futures.Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def stop(self):
+        """Stops the thread once the calls already queued have run"""
+        self._queue.put(None)
+
+
+class AsyncMathcad:
+    """
+    asyncio wrapper of a Mathcad application object, with its own STA thread.
+
+    visible and backend are passed to the Mathcad class. timeout is the default time limit in
+    seconds for each call (None for no limit); asyncio.TimeoutError is raised if it is exceeded.
+    """
+
+    def __init__(self, visible=True, backend=None, timeout=None):
+        self.visible = visible
+        self.backend = backend
+        self.timeout = timeout
+        self.app = None  # the underlying Mathcad object, created by start()
+        self._thread = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.quit()
+
+    async def _call(self, func, *args, timeout=_DEFAULT, **kwargs):
+        """
+        Runs func on the STA thread and waits for its result. timeout defaults to the instance's
+        time limit; None waits without a limit
+        """
+        if self._thread is None:
+            raise RuntimeError("AsyncMathcad has not been started")
+        future = asyncio.wrap_future(self._thread.submit(func, *args, **kwargs))
+        return await asyncio.wait_for(future, self.timeout if timeout is _DEFAULT else timeout)
+
+    async def start(self):
+        """Starts the STA thread and the Mathcad application. Returns self"""
+        if self._thread is None:
+            self._thread = _StaThread()
+            self.app = await self._call(Mathcad, visible=self.visible, backend=self.backend)
+        return self
+
+    async def open(self, filepath: Path, timeout=_DEFAULT):
+        """Opens a worksheet, returning an AsyncWorksheet"""
+        worksheet = await self._call(self.app.open, filepath, timeout=timeout)
+        return AsyncWorksheet(worksheet, self)
+
+    async def quit(self, save_option="Discard", timeout=_DEFAULT):
+        """Closes Mathcad and stops the STA thread"""
+        if self._thread is None:
+            return
+        try:
+            await self._call(self.app.quit, save_option, timeout=timeout)
+        finally:
+            self._thread.stop()
+            self._thread = None
+            self.app = None
+
+
+class AsyncWorksheet:
+    """
+    asyncio wrapper of a Worksheet. Each method runs the Worksheet method of the same name on the
+    owning AsyncMathcad's STA thread, and accepts an optional timeout keyword argument (by
+    default the AsyncMathcad's time limit; None for no limit)
+    """
+
+    def __init__(self, worksheet, async_app):
+        self.worksheet = worksheet
+        self._async_app = async_app
+
+    def _call(self, func, *args, timeout=_DEFAULT, **kwargs):
+        return self._async_app._call(func, *args, timeout=timeout, **kwargs)
+
+    async def inputs(self, timeout=_DEFAULT):
+        """returns a list of the designated input fields in the worksheet"""
+        return await self._call(self.worksheet.inputs, timeout=timeout)
+
+    async def outputs(self, timeout=_DEFAULT):
+        """returns a list of the designated output fields in the worksheet"""
+        return await self._call(self.worksheet.outputs, timeout=timeout)
+
+    async def set_inputs(self, input_values: dict, timeout=_DEFAULT, **kwargs):
+        """Sets several inputs in one batch (see Worksheet.set_inputs)"""
+        return await self._call(self.worksheet.set_inputs, input_values, timeout=timeout, **kwargs)
+
+    async def get_outputs(self, aliases=None, units=None, timeout=_DEFAULT, **kwargs):
+        """Gets the values of several designated outputs in one pass (see Worksheet.get_outputs)"""
+        return await self._call(
+            self.worksheet.get_outputs, aliases, units, timeout=timeout, **kwargs
+        )
+
+    async def get_output(self, output_alias, timeout=_DEFAULT):
+        """Gets the value from a designated output in the worksheet"""
+        return await self._call(self.worksheet.get_output, output_alias, timeout=timeout)
+
+    async def calculate(self, timeout=_DEFAULT):
+        """Syncronises (i.e. re-calculates) worksheet"""
+        return await self._call(self.worksheet.calculate, timeout=timeout)
+
+    async def save(self, timeout=_DEFAULT):
+        """Saves the worksheet"""
+        return await self._call(self.worksheet.save, timeout=timeout)
+
+    async def save_as(self, new_filepath: Path, timeout=_DEFAULT):
+        """Saves the worksheet under a new filename"""
+        return await self._call(self.worksheet.save_as, new_filepath, timeout=timeout)
+
+    async def close(self, save_option="Save", timeout=_DEFAULT):
+        """Closes the worksheet"""
+        return await self._call(self.worksheet.close, save_option, timeout=timeout)
+
+
+def _idle_check():
+    """Does nothing. Queued on an STA thread to find out when the calls before it have finished"""
+
+
+def _evaluate(worksheet, case_inputs, outputs, units, preserve_worksheet_units):
+    """Sets a case's inputs and fetches its outputs. Runs on an STA thread as a single call"""
+    worksheet.set_inputs(
+        case_inputs, preserve_worksheet_units=preserve_worksheet_units, synchronize=True
+    )
+    return worksheet.get_outputs(outputs, units=units)
+
+
+class AsyncMathcadPool:
+    """
+    A pool of AsyncMathcad instances, each with its own copy of a worksheet. evaluate() runs a
+    case on whichever instance is free next, so the number of cases in progress at once scales
+    with the size of the pool without blocking the event loop.
+
+    backend defaults to starting a new Mathcad instance for every member of the pool. A member
+    whose case times out (or is cancelled) is quarantined until its call has finished in Mathcad,
+    and only then given another case.
+    """
+
+    def __init__(self, worksheet_path, size=2, visible=False, backend=new_instance, timeout=None):
+        self.worksheet_path = Path(worksheet_path).resolve()
+        self.size = size
+        self.visible = visible
+        self.backend = backend
+        self.timeout = timeout
+        self.quarantined = 0  # no. of times a member was set aside after a timeout
+        self._apps = []
+        self._idle = None  # asyncio.Queue of idle AsyncWorksheet objects
+        self._recovering = set()  # tasks waiting for quarantined members to finish their call
+        self._temp_dir = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _start_member(self, index):
+        """Starts one Mathcad instance and opens a private copy of the worksheet in it"""
+        member_dir = self._temp_dir / f"instance_{index}"
+        member_dir.mkdir()
+        worksheet_copy = shutil.copy2(self.worksheet_path, member_dir / self.worksheet_path.name)
+        async_app = AsyncMathcad(self.visible, self.backend, self.timeout)
+        self._apps.append(async_app)
+        await async_app.start()
+        return await async_app.open(worksheet_copy)
+
+    async def start(self):
+        """Starts every instance in the pool concurrently. Returns self"""
+        self._temp_dir = Path(tempfile.mkdtemp(prefix="mathcadpy_aio_"))
+        self._idle = asyncio.Queue()
+        worksheets = await asyncio.gather(*(self._start_member(i) for i in range(self.size)))
+        for worksheet in worksheets:
+            self._idle.put_nowait(worksheet)
+        return self
+
+    async def evaluate(self, case_inputs: dict, outputs=None, units=None,
+                       preserve_worksheet_units=True, timeout=_DEFAULT):
+        """
+        Sets a case's inputs and returns its outputs ({alias: OutputResult}) using the next free
+        instance. Waiting for a free instance does not count towards the timeout (by default the
+        pool's time limit; None for no limit)
+        """
+        worksheet = await self._idle.get()
+        try:
+            results = await worksheet._call(
+                _evaluate, worksheet.worksheet, case_inputs, outputs, units,
+                preserve_worksheet_units, timeout=timeout,
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._quarantine(worksheet)
+            raise
+        except BaseException:
+            self._idle.put_nowait(worksheet)
+            raise
+        self._idle.put_nowait(worksheet)
+        return results
+
+    def _quarantine(self, worksheet):
+        """Returns a member to the pool once the call it is still running has finished"""
+        self.quarantined += 1
+        task = asyncio.ensure_future(self._recover(worksheet))
+        self._recovering.add(task)
+        task.add_done_callback(self._recovering.discard)
+
+    async def _recover(self, worksheet):
+        try:
+            await worksheet._call(_idle_check, timeout=None)  # runs after the hung call
+        except Exception:  # pylint: disable=broad-except
+            return  # the instance has stopped, so it is not returned to the pool
+        self._idle.put_nowait(worksheet)
+
+    async def close(self):
+        """Quits every instance and removes the worksheet copies"""
+        for task in list(self._recovering):
+            task.cancel()
+        await asyncio.gather(*(async_app.quit() for async_app in self._apps), return_exceptions=True)
+        self._apps = []
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+cache.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A memoizing cache of worksheet results, keyed by the content hash of the .mcdx file and the
+input values that were sent to it. Used by Worksheet.evaluate once it has been enabled with
+Worksheet.enable_result_cache:
+
+>>> from MathcadPy.cache import ResultCache
+>>> cache = ResultCache(maxsize=10000, path="results_cache.sqlite")  # path is optional
+>>> worksheet.enable_result_cache(cache)
+>>> worksheet.evaluate({"length": 2.0})  # runs the worksheet
+>>> worksheet.evaluate({"length": 2.0})  # served from the cache
+>>> cache.stats()
+{'hits': 1, 'misses': 1, 'disk_hits': 0, 'size': 1}
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+from collections import OrderedDict
+from numbers import Real
+from pathlib import Path
+
+
+def file_hash(filepath: Path) -> str:
+    """Returns the SHA-256 hash of a file's contents"""
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _canonical(value):
+    """Converts an input value to a JSON serialisable form that is equal for equivalent values"""
+    if hasattr(value, "tolist"):  # numpy arrays and scalars
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, Real) and not isinstance(value, bool):
+        return float(value)  # 2 and 2.0 are the same value to Mathcad
+    return value
+
+
+def result_key(worksheet_hash: str, input_values: dict, outputs=None, units=None, **options) -> str:
+    """
+    Returns the cache key for a set of input values (and requested outputs) sent to a worksheet.
+    Values may be given as value or (value, units); (value, "") is equivalent to value
+    """
+    inputs = {}
+    for input_alias, value in input_values.items():
+        if isinstance(value, tuple) and len(value) == 2 and isinstance(value[1], str):
+            value, input_units = value
+        else:
+            input_units = ""
+        inputs[input_alias] = [_canonical(value), input_units]
+    key_data = {
+        "worksheet": worksheet_hash,
+        "inputs": inputs,
+        "outputs": None if outputs is None else list(outputs),
+        "units": units or {},
+        "options": options,
+    }
+    key_json = json.dumps(key_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    An in-memory LRU cache of results, holding at most maxsize entries. If path is given, every
+    result is also written to a SQLite database there, so that the cache survives restarts
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = None if path is None else Path(path)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0  # hits that were not in memory, but were found in the database
+        self._memory = OrderedDict()
+        self._connection = None
+        if self.path is not None:
+            self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)"
+            )
+            self._connection.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)  # evict the least recently used entry
+
+    def get(self, key, default=None):
+        """Returns the cached value for a key, or default if it is not cached"""
+        if key in self._memory:
+            self.hits += 1
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if self._connection is not None:
+            row = self._connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                value = pickle.loads(row[0])
+                self._remember(key, value)
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Stores a value in the cache (and the database, if there is one)"""
+        self._remember(key, value)
+        if self._connection is not None:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+            self._connection.commit()
+
+    def clear(self):
+        """Empties the cache (including the database) and resets the statistics"""
+        self._memory.clear()
+        self.hits = self.misses = self.disk_hits = 0
+        if self._connection is not None:
+            self._connection.execute("DELETE FROM results")
+            self._connection.commit()
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that were served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Returns the hit/miss statistics as a dictionary"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": len(self._memory),
+        }
+
+    def close(self):
+        """Closes the database connection"""
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
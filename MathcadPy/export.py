@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+export.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Exports many worksheets to PDF/RTF/XPS/MCDX in one go. Each worksheet is opened, re-calculated
+and saved in every requested format by a hidden Mathcad instance that is reused for the whole
+batch, optionally across several worker processes:
+
+>>> from pathlib import Path
+>>> from MathcadPy.export import batch_export
+>>> results = batch_export(
+...     Path("calcs").glob("*.mcdx"), formats=[".pdf"], out_dir="release", processes=4
+... )
+>>> for result in results:
+...     if result.error:
+...         print(f"{result.source} failed: {result.error}")
+
+Outputs that are newer than their source worksheet are skipped, and a failure on one worksheet
+is recorded in its ExportResult rather than stopping the batch. If Mathcad (or a worker process)
+crashes, it is restarted for the remaining worksheets.
+"""
+
+import concurrent.futures
+import multiprocessing
+import multiprocessing.util
+from collections import namedtuple
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from time import perf_counter
+
+from . import _com
+from ._application import Mathcad, MathcadComError
+from .pool import new_instance
+
+EXPORT_FORMATS = [".mcdx", ".pdf", ".rtf", ".xps"]
+
+# The outcome of exporting a single worksheet. outputs lists the files written, skipped lists the
+# files that were already up to date, and error is "" if the export succeeded
+ExportResult = namedtuple("ExportResult", ["source", "outputs", "skipped", "seconds", "error"])
+
+
+def _targets(source: Path, formats, out_dir) -> list:
+    """Returns the output file paths for a source worksheet"""
+    directory = source.parent if out_dir is None else Path(out_dir)
+    return [directory / f"{source.stem}{file_format}" for file_format in formats]
+
+
+def _up_to_date(source: Path, target: Path) -> bool:
+    """Returns True if target exists and is newer than source"""
+    if not target.exists():
+        return False
+    return target.stat().st_mtime >= source.stat().st_mtime
+
+
+class _Exporter:
+    """Opens, re-calculates and exports worksheets with a single, lazily started Mathcad instance"""
+
+    def __init__(self, visible=False, backend=None):
+        self.visible = visible
+        self.backend = backend
+        self.app = None
+
+    def export(self, source: Path, targets, recalculate=True) -> ExportResult:
+        """Exports one worksheet to every target path. Exceptions are recorded, not raised"""
+        start = perf_counter()
+        outputs = []
+        try:
+            if self.app is None:
+                self.app = Mathcad(visible=self.visible, backend=self.backend)
+            worksheet = self.app.open(source)
+            try:
+                if recalculate:
+                    worksheet.calculate()
+                for target in targets:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    worksheet.save_as(target)
+                    outputs.append(target)
+            finally:
+                worksheet.close("Discard")
+            error = ""
+        except (_com.com_error, MathcadComError) as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            self.quit()  # Mathcad has most likely crashed - start a new instance for the next one
+        except Exception as exc:  # pylint: disable=broad-except
+            error = f"{type(exc).__name__}: {exc}"
+        return ExportResult(source, outputs, [], perf_counter() - start, error)
+
+    def quit(self):
+        """Closes the Mathcad instance, if one was started"""
+        if self.app is not None:
+            try:
+                self.app.quit("Discard")
+            except Exception:  # pylint: disable=broad-except
+                pass  # Mathcad has already gone
+        self.app = None
+
+
+_PROCESS_EXPORTER = None  # the _Exporter belonging to a worker process
+
+
+def _initialise_worker(visible, backend):
+    """Worker process initialiser: sets up COM and the process's exporter"""
+    global _PROCESS_EXPORTER  # pylint: disable=global-statement
+    if backend is new_instance:
+        import pythoncom  # pylint: disable=import-outside-toplevel
+
+        pythoncom.CoInitialize()
+    _PROCESS_EXPORTER = _Exporter(visible, backend)
+    # quit this worker's Mathcad instance when the process pool shuts down
+    multiprocessing.util.Finalize(None, _PROCESS_EXPORTER.quit, exitpriority=10)
+
+
+def _export_in_worker(source, targets, recalculate):
+    return _PROCESS_EXPORTER.export(source, targets, recalculate)
+
+
+def batch_export(paths, formats=(".pdf",), out_dir=None, processes=1, recalculate=True,
+                 skip_up_to_date=True, visible=False, backend=None) -> list:
+    """
+    Exports each worksheet in paths to every file format in formats, returning a list of
+    ExportResult in the same order as paths.
+
+    Outputs are written to out_dir (by default, next to each source worksheet) with the source's
+    file name and the new extension. Exporting to .mcdx therefore needs an out_dir, as a
+    worksheet is never saved over itself (ValueError is raised before anything is exported).
+    If skip_up_to_date is True, outputs newer than their source are not re-exported, and
+    worksheets with no out of date outputs are not opened at all.
+    If processes is greater than 1, worksheets are shared between that many worker processes,
+    each with its own Mathcad instance (backend then defaults to starting a new instance per
+    worker, and any other backend must be picklable).
+    """
+    formats = [file_format.lower() for file_format in formats]
+    for file_format in formats:
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unsupported export format {file_format}. Must be one of {EXPORT_FORMATS}"
+            )
+
+    results = []
+    jobs = []  # (index, source, targets to export)
+    for index, source in enumerate(paths):
+        source = Path(source).resolve()
+        targets = _targets(source, formats, out_dir)
+        if source in [target.resolve() for target in targets]:
+            raise ValueError(
+                f"Exporting {source.name} to {source.suffix} would overwrite it - give an out_dir"
+            )
+        skipped = []
+        if skip_up_to_date and source.exists():
+            skipped = [target for target in targets if _up_to_date(source, target)]
+            targets = [target for target in targets if target not in skipped]
+        results.append(ExportResult(source, [], skipped, 0.0, ""))
+        if not source.exists():
+            results[index] = results[index]._replace(error=f"FileNotFoundError: {source}")
+        elif targets:
+            jobs.append((index, source, targets))
+
+    def _record(index, result):
+        results[index] = result._replace(skipped=results[index].skipped)
+
+    if processes <= 1:
+        exporter = _Exporter(visible, backend)
+        try:
+            for index, source, targets in jobs:
+                _record(index, exporter.export(source, targets, recalculate))
+        finally:
+            exporter.quit()
+        return results
+
+    # If a worker process dies, the pool breaks and every unfinished job fails with it. Those jobs
+    # are run again in a new pool, and then (if it breaks again) each in a pool of its own, so
+    # that only the worksheet that kills its worker is recorded as failed
+    backend = new_instance if backend is None else backend
+    jobs = _export_in_pool(jobs, processes, recalculate, visible, backend, _record)
+    if jobs:
+        jobs = _export_in_pool(jobs, processes, recalculate, visible, backend, _record)
+    for job in jobs:
+        for index, source, _job_targets in _export_in_pool(
+            [job], 1, recalculate, visible, backend, _record
+        ):
+            _record(index, ExportResult(
+                source, [], [], 0.0, "BrokenProcessPool: the export worker process died"
+            ))
+    return results
+
+
+def _export_in_pool(jobs, processes, recalculate, visible, backend, record) -> list:
+    """
+    Exports jobs across a new process pool, recording each result. Returns the jobs that did not
+    complete because a worker process died
+    """
+    broken = []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context(),
+        initializer=_initialise_worker,
+        initargs=(visible, backend),
+    ) as executor:
+        futures = {}
+        for job in jobs:
+            _index, source, targets = job
+            futures[executor.submit(_export_in_worker, source, targets, recalculate)] = job
+        for future in concurrent.futures.as_completed(futures):
+            index, source, _job_targets = job = futures[future]
+            try:
+                record(index, future.result())
+            except BrokenProcessPool:
+                broken.append(job)
+            except Exception as exc:  # pylint: disable=broad-except
+                record(index, ExportResult(source, [], [], 0.0, f"{type(exc).__name__}: {exc}"))
+    return sorted(broken)
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+fake.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A pure-Python stand-in for the "MathcadPrime.Application" COM object. It implements the part of
+the Mathcad Prime automation API that MathcadPy uses, so that scripts, sweeps and the scheduling
+code can be exercised without a Mathcad installation (e.g. on Linux):
+
+>>> from MathcadPy import Mathcad
+>>> from MathcadPy.fake import FakeApplication, FakeSheet
+>>> sheet = FakeSheet(
+...     inputs={"length": (2.0, "m"), "width": (3.0, "m")},
+...     outputs={"area": "m^2"},
+...     calculate=lambda values: {"area": values["length"] * values["width"]},
+... )
+>>> mathcad_app = Mathcad(backend=FakeApplication({"test.mcdx": sheet}))
+
+Worksheets are matched to their FakeSheet definition by file name when they are opened.
+latency (in seconds) is added to every COM method call, to mimic the cost of a round trip to a
+real Mathcad instance when benchmarking. The fake only converts outputs between the units listed
+in unit_factors, {(from units, to units): factor}; other conversions return the value unchanged.
+
+FakeRegistry stands in for the Windows registry when discovering installations with
+MathcadPy.util.list_installations.
+"""
+
+import functools
+from pathlib import Path
+from time import perf_counter
+
+from .util import RegistryReader
+
+
+def _wait(seconds):
+    """Busy-waits for a number of seconds (time.sleep is too coarse for per-call latencies)"""
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        pass
+
+
+def _com_method(method):
+    """Adds the owning object's latency to each call of a fake COM method"""
+
+    @functools.wraps(method)
+    def com_call(self, *args):
+        if self.latency:
+            _wait(self.latency)
+        return method(self, *args)
+
+    return com_call
+
+
+class FakeSheet:
+    """
+    Definition of a fake worksheet.
+
+    inputs maps each designated input alias to its initial (value, units). outputs maps each
+    designated output alias to its units. calculate is called with {input alias: value} each time
+    the worksheet recalculates, and returns {output alias: value}.
+    """
+
+    def __init__(self, inputs=None, outputs=None, calculate=None):
+        self.inputs = dict(inputs or {})
+        self.outputs = dict(outputs or {})
+        self.calculate = calculate
+
+    def __call__(self, values):
+        if self.calculate is None:
+            return {}
+        return self.calculate(values)
+
+
+class FakeApplication:
+    """Pure-Python stand-in for the MathcadPrime.Application COM object"""
+
+    def __init__(self, sheets=None, version="10.0.0.0", latency=0.0, unit_factors=None):
+        self.sheets = dict(sheets or {})  # {file name: FakeSheet}
+        self.version = version
+        self.latency = latency
+        self.unit_factors = dict(unit_factors or {})  # {(from units, to units): factor}
+        self.Visible = True
+        self.Worksheets = _FakeWorksheets()
+
+    def __call__(self):
+        """Allows an application instance to be passed directly as a Mathcad backend"""
+        return self
+
+    @_com_method
+    def GetVersion(self):
+        return self.version
+
+    @_com_method
+    def Activate(self):
+        pass
+
+    @property
+    def ActiveWorksheet(self):
+        if self.Worksheets.Count:
+            return self.Worksheets.Item(self.Worksheets.Count - 1)
+        return FakeWorksheet(self, "", FakeSheet())
+
+    @_com_method
+    def Open(self, filepath):
+        filepath = Path(filepath)
+        sheet = self.sheets.get(filepath.name, FakeSheet())
+        worksheet = FakeWorksheet(self, str(filepath), sheet)
+        self.Worksheets.append(worksheet)
+        return worksheet
+
+    @_com_method
+    def CloseAll(self, save_option):
+        self.Worksheets.clear()
+
+    @_com_method
+    def Quit(self, save_option):
+        self.Worksheets.clear()
+
+
+class FakeWorksheet:
+    """Pure-Python stand-in for the IMathcadPrimeWorksheet COM object"""
+
+    def __init__(self, application, full_name, sheet):
+        self._application = application
+        self._sheet = sheet
+        self.latency = application.latency
+        self.FullName = full_name
+        self.Name = Path(full_name).name if full_name else ""
+        self.IsReadOnly = False
+        self.Modified = False
+        self._input_values = dict(sheet.inputs)  # {alias: (value, units)}
+        self._output_values = {}  # {alias: value}
+        self._paused = False
+        self._dirty = True
+        self.Inputs = _FakeAliases(list(sheet.inputs), self.latency)
+        self.Outputs = _FakeAliases(list(sheet.outputs), self.latency)
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Worksheet management ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    @_com_method
+    def Activate(self):
+        pass
+
+    @_com_method
+    def Close(self, save_option):
+        self._application.Worksheets.remove(self)
+
+    @_com_method
+    def Save(self):
+        self.Modified = False
+
+    @_com_method
+    def SaveAs(self, filepath):
+        filepath = Path(filepath)
+        if filepath.suffix.lower() == ".mcdx" and Path(self.FullName).exists():
+            filepath.write_bytes(Path(self.FullName).read_bytes())
+        else:
+            filepath.write_bytes(b"")  # a placeholder for exported (.pdf, .rtf, .xps) files
+        self.FullName = str(filepath)
+        self.Name = Path(filepath).name
+        self.Modified = False
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Calculation ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    @_com_method
+    def PauseCalculation(self):
+        self._paused = True
+
+    @_com_method
+    def ResumeCalculation(self):
+        self._paused = False
+
+    @_com_method
+    def Synchronize(self):
+        self._recalculate()
+
+    def _recalculate(self):
+        if self._dirty:
+            values = {
+                alias: value.rows() if isinstance(value, FakeMatrix) else value
+                for alias, (value, _units) in self._input_values.items()
+            }
+            self._output_values = dict(self._sheet(values))
+            self._dirty = False
+
+    def _set_input(self, input_alias, value, units):
+        if input_alias not in self._input_values:
+            return 1
+        self._input_values[input_alias] = (value, units)
+        self._dirty = True
+        self.Modified = True
+        return 0
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Inputs ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    @_com_method
+    def CreateMatrix(self, rows, cols):
+        return FakeMatrix(rows, cols, self.latency)
+
+    @_com_method
+    def SetRealValue(self, input_alias, value, units):
+        return self._set_input(input_alias, float(value), units)
+
+    @_com_method
+    def SetStringValue(self, input_alias, value):
+        return self._set_input(input_alias, str(value), "")
+
+    @_com_method
+    def SetMatrixValue(self, input_alias, matrix, units):
+        matrix = FakeMatrix.from_rows(matrix.rows(), self.latency)
+        return self._set_input(input_alias, matrix, units)
+
+    def _input(self, input_alias):
+        value, units = self._input_values[input_alias]
+        return _FakeResult(value, units, latency=self.latency)
+
+    @_com_method
+    def InputGetValue(self, input_alias):
+        return self._input(input_alias)
+
+    @_com_method
+    def InputGetRealValue(self, input_alias):
+        return self._input(input_alias)
+
+    @_com_method
+    def InputGetMatrixValue(self, input_alias):
+        return self._input(input_alias)
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Outputs ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _output(self, output_alias):
+        if not self._paused:
+            self._recalculate()
+        if output_alias not in self._output_values:
+            return _FakeResult(None, "", error_code=1)
+        value, units = self._output_values[output_alias], self._sheet.outputs[output_alias]
+        return _FakeResult(value, units, latency=self.latency)
+
+    def _output_as(self, output_alias, units):
+        result = self._output(output_alias)
+        factor = self._application.unit_factors.get((result.Units, units), 1.0)
+        if result.ResultType == 1:
+            result.RealResult *= factor
+        elif result.ResultType == 3:
+            result.MatrixResult = FakeMatrix.from_rows(
+                [[element * factor for element in row] for row in result.MatrixResult.rows()],
+                self.latency,
+            )
+        result.Units = units
+        return result
+
+    @_com_method
+    def OutputGetValue(self, output_alias):
+        return self._output(output_alias)
+
+    @_com_method
+    def OutputGetRealValue(self, output_alias):
+        return self._output(output_alias)
+
+    @_com_method
+    def OutputGetMatrixValue(self, output_alias):
+        return self._output(output_alias)
+
+    @_com_method
+    def OutputGetRealValueAs(self, output_alias, units):
+        return self._output_as(output_alias, units)
+
+    @_com_method
+    def OutputGetMatrixValueAs(self, output_alias, units):
+        return self._output_as(output_alias, units)
+
+
+class FakeMatrix:
+    """Pure-Python stand-in for the IMathcadPrimeMatrix COM object"""
+
+    def __init__(self, rows, cols, latency=0.0):
+        self.Rows = rows
+        self.Columns = cols
+        self.latency = latency
+        self._values = [[0.0] * cols for _ in range(rows)]
+
+    @classmethod
+    def from_rows(cls, rows, latency=0.0):
+        """Creates a FakeMatrix from a list of lists"""
+        matrix = cls(len(rows), len(rows[0]) if rows else 0, latency)
+        matrix._values = [[float(value) for value in row] for row in rows]
+        return matrix
+
+    def rows(self):
+        """Returns the matrix as a list of lists"""
+        return [list(row) for row in self._values]
+
+    @_com_method
+    def GetMatrixElement(self, row, col):
+        return self._values[row][col]
+
+    @_com_method
+    def SetMatrixElement(self, row, col, value):
+        self._values[row][col] = float(value)
+
+
+class FakeRegistry(RegistryReader):
+    """
+    Stand-in for the Windows registry, for installation discovery with
+    MathcadPy.util.list_installations(reader=...). keys is {key path: {value name: data}}; the
+    parent keys of each path exist implicitly. Key paths are case insensitive, as in Windows
+    """
+
+    def __init__(self, keys=None):
+        self._keys = {}  # {lower case key path: (key path, values)}
+        self._modified = {}  # {lower case key path: change count}
+        for key, values in (keys or {}).items():
+            self.set(key, values)
+
+    def _touch(self, key):
+        """Updates the last-modified time of a key and its parents"""
+        parts = key.lower().split("\\")
+        for i in range(1, len(parts) + 1):
+            parent = "\\".join(parts[:i])
+            self._modified[parent] = self._modified.get(parent, 0) + 1
+
+    def set(self, key, values):
+        """Creates (or replaces) a key with {value name: data}"""
+        self._keys[key.lower()] = (key, dict(values))
+        self._touch(key)
+
+    def delete(self, key):
+        """Deletes a key and its subkeys"""
+        prefix = key.lower() + "\\"
+        for path in [path for path in self._modified if path == key.lower() or
+                     path.startswith(prefix)]:
+            self._keys.pop(path, None)
+            del self._modified[path]
+        self._touch(key.rsplit("\\", 1)[0])
+
+    def subkeys(self, key) -> list:
+        prefix = key.lower() + "\\"
+        names = {}
+        for path, (original, _values) in self._keys.items():
+            if path.startswith(prefix):
+                name = original[len(prefix):].split("\\", 1)[0]
+                names.setdefault(name.lower(), name)
+        return list(names.values())
+
+    def values(self, key) -> dict:
+        return dict(self._keys.get(key.lower(), (key, {}))[1])
+
+    def modified(self, key):
+        return self._modified.get(key.lower())
+
+
+class _FakeWorksheets(list):
+    """The application's Worksheets collection"""
+
+    @property
+    def Count(self):
+        return len(self)
+
+    def Item(self, index):
+        return self[index]
+
+    item = Item  # the COM API is case insensitive
+
+
+class _FakeAliases:
+    """A worksheet's Inputs or Outputs collection"""
+
+    def __init__(self, aliases, latency=0.0):
+        self._aliases = aliases
+        self.latency = latency
+
+    @property
+    def Count(self):
+        return len(self._aliases)
+
+    @_com_method
+    def GetAliasByIndex(self, index):
+        return self._aliases[index]
+
+
+class _FakeResult:
+    """A COM value result object"""
+
+    def __init__(self, value, units, error_code=0, latency=0.0):
+        self.Units = units
+        self.ErrorCode = error_code
+        self.RealResult = None
+        self.StringResult = None
+        self.MatrixResult = None
+        if isinstance(value, str):
+            self.ResultType = 2  # ValueResultTypes_String
+            self.StringResult = value
+        elif isinstance(value, FakeMatrix):
+            self.ResultType = 3  # ValueResultTypes_Matrix
+            self.MatrixResult = value
+        elif isinstance(value, (list, tuple)) or getattr(value, "ndim", 0) == 2:
+            self.ResultType = 3
+            self.MatrixResult = FakeMatrix.from_rows(value, latency)
+        elif value is None:
+            self.ResultType = 0
+        else:
+            self.ResultType = 1  # ValueResultTypes_Real
+            self.RealResult = float(value)
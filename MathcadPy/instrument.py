@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+instrument.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Opt-in instrumentation of the COM calls made by the Mathcad and Worksheet classes. When a
+ComProfiler is given to Mathcad, the application object (and every COM object reached through it:
+worksheets, alias collections, results, matrices) is wrapped in a proxy that counts and times
+each method call and property access by name:
+
+>>> from MathcadPy import Mathcad
+>>> from MathcadPy.instrument import ComProfiler
+>>> profiler = ComProfiler(trace=True)
+>>> mathcad_app = Mathcad(profiler=profiler)
+>>> worksheet = mathcad_app.open("beam.mcdx")
+>>> with profiler.case("baseline"):  # logs the calls made within the block
+...     worksheet.evaluate({"length": 2.0})
+>>> profiler.as_dict()["Synchronize"]["count"]
+1
+>>> profiler.dump_chrome_trace("beam_trace.json")  # open in chrome://tracing or Perfetto
+
+Without a profiler the COM objects are used directly, so there is no overhead.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import types
+from contextlib import contextmanager
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+_HISTOGRAM_BUCKETS = 32  # bucket i counts calls taking up to 2**i microseconds
+_CALLABLE_TYPES = (types.MethodType, types.FunctionType, types.BuiltinFunctionType)
+_PLAIN_TYPES = frozenset([str, bytes, int, float, complex, bool, type(None), list, tuple, dict])
+
+
+class CallStats:
+    """Count, timing and latency histogram of one COM method or property"""
+
+    __slots__ = ("count", "total", "minimum", "maximum", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+        self.histogram = [0] * _HISTOGRAM_BUCKETS
+
+    def add(self, seconds):
+        """Records one call"""
+        self.count += 1
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+        microseconds = seconds * 1e6
+        bucket = 0 if microseconds <= 1 else math.ceil(math.log2(microseconds))
+        self.histogram[min(bucket, _HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Estimates a latency percentile (in seconds) from the histogram's bucket upper bounds"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        running = 0
+        for bucket, count in enumerate(self.histogram):
+            running += count
+            if running >= target:
+                return min(2 ** bucket / 1e6, self.maximum)
+        return self.maximum
+
+    def as_dict(self) -> dict:
+        """Returns the statistics as a dictionary (times in seconds)"""
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "min_s": self.minimum if self.count else 0.0,
+            "max_s": self.maximum,
+            "p50_s": self.percentile(0.5),
+            "p95_s": self.percentile(0.95),
+            "histogram_us": {
+                f"<={2 ** bucket}": count for bucket, count in enumerate(self.histogram) if count
+            },
+        }
+
+
+class ComProfiler:
+    """
+    Collects COM call statistics. If trace is True, every call is also kept (up to max_events) as
+    an event for dump_chrome_trace
+    """
+
+    def __init__(self, trace=False, max_events=1_000_000):
+        self.trace = trace
+        self.max_events = max_events
+        self.stats = {}  # {name: CallStats}
+        self.events = []  # (name, start, duration, thread id)
+        self._origin = perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, start, seconds):
+        """Records a call to name which started at start (perf_counter) and took seconds"""
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CallStats()
+            stats.add(seconds)
+            if self.trace and len(self.events) < self.max_events:
+                self.events.append((name, start, seconds, threading.get_ident()))
+
+    def reset(self):
+        """Clears all statistics and events"""
+        with self._lock:
+            self.stats = {}
+            self.events = []
+            self._origin = perf_counter()
+
+    def total_calls(self) -> int:
+        """Returns the total number of COM calls recorded"""
+        return sum(stats.count for stats in self.stats.values())
+
+    def as_dict(self) -> dict:
+        """Returns {name: statistics dictionary}, ordered by total time (largest first)"""
+        with self._lock:
+            ordered = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+            return {name: stats.as_dict() for name, stats in ordered}
+
+    def _counts(self):
+        with self._lock:
+            return {name: (stats.count, stats.total) for name, stats in self.stats.items()}
+
+    @contextmanager
+    def case(self, label, level=logging.INFO):
+        """
+        Context manager that logs the COM calls made within it (count and time per method) to
+        the MathcadPy.instrument logger
+        """
+        before = self._counts()
+        start = perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = perf_counter() - start
+            calls = {}
+            for name, (count, total) in self._counts().items():
+                previous_count, previous_total = before.get(name, (0, 0.0))
+                if count > previous_count:
+                    calls[name] = (count - previous_count, total - previous_total)
+            summary = ", ".join(
+                f"{name} x{count} {total * 1000:.1f}ms"
+                for name, (count, total) in sorted(calls.items(), key=lambda item: -item[1][1])
+            )
+            logger.log(
+                level, "case %s: %d COM calls in %.3fs [%s]",
+                label, sum(count for count, _total in calls.values()), elapsed, summary,
+            )
+
+    def dump_json(self, filepath):
+        """Writes the statistics (as_dict) to a JSON file"""
+        with open(filepath, "w", encoding="utf-8") as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+    def dump_chrome_trace(self, filepath):
+        """Writes the recorded events in the Chrome trace event format (requires trace=True)"""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    "name": name,
+                    "cat": "COM",
+                    "ph": "X",
+                    "ts": (start - self._origin) * 1e6,
+                    "dur": seconds * 1e6,
+                    "pid": pid,
+                    "tid": thread_id,
+                }
+                for name, start, seconds, thread_id in self.events
+            ]
+        with open(filepath, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def _unwrap(value):
+    """Returns the underlying COM object of a proxy (so it can be passed back into COM)"""
+    return object.__getattribute__(value, "_com_object") if isinstance(value, ComProxy) else value
+
+
+def _wrap(value, profiler):
+    """Wraps COM objects in a ComProxy. Plain python values are returned unchanged"""
+    # exact types, as COM collections may subclass the plain types
+    if type(value) in _PLAIN_TYPES or isinstance(value, ComProxy):
+        return value
+    return ComProxy(value, profiler)
+
+
+class ComProxy:
+    """Wraps a COM object, recording every method call and property access with a ComProfiler"""
+
+    __slots__ = ("_com_object", "_profiler")
+
+    def __init__(self, com_object, profiler):
+        object.__setattr__(self, "_com_object", com_object)
+        object.__setattr__(self, "_profiler", profiler)
+
+    def __getattr__(self, name):
+        profiler = object.__getattribute__(self, "_profiler")
+        start = perf_counter()
+        value = getattr(object.__getattribute__(self, "_com_object"), name)
+        if isinstance(value, _CALLABLE_TYPES):
+            return _ProfiledMethod(name, value, profiler)
+        profiler.record(name, start, perf_counter() - start)  # a property get
+        return _wrap(value, profiler)
+
+    def __setattr__(self, name, value):
+        profiler = object.__getattribute__(self, "_profiler")
+        start = perf_counter()
+        setattr(object.__getattribute__(self, "_com_object"), name, _unwrap(value))
+        profiler.record(name, start, perf_counter() - start)
+
+    def __repr__(self):
+        return f"ComProxy({object.__getattribute__(self, '_com_object')!r})"
+
+
+class _ProfiledMethod:
+    """A COM method that records its calls"""
+
+    __slots__ = ("name", "method", "profiler")
+
+    def __init__(self, name, method, profiler):
+        self.name = name
+        self.method = method
+        self.profiler = profiler
+
+    def __call__(self, *args):
+        args = [_unwrap(arg) for arg in args]
+        start = perf_counter()
+        try:
+            result = self.method(*args)
+        finally:
+            self.profiler.record(self.name, start, perf_counter() - start)
+        return _wrap(result, self.profiler)
+
+
+def instrument(com_object, profiler: ComProfiler):
+    """Wraps a COM object so that all calls made through it are recorded by profiler"""
+    return _wrap(com_object, profiler)
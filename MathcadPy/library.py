@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+library.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A searchable SQLite index of a library of worksheets. The designated aliases, their units and
+saved values, and the Prime version of every .mcdx file in a directory tree are read with
+McdxWorksheet (so Mathcad is not needed), and stored with a full-text index:
+
+>>> from MathcadPy.library import WorksheetIndex
+>>> with WorksheetIndex("calcs_index.sqlite") as index:
+...     report = index.update("//share/calcs", processes=8)  # only changed files are re-read
+...     index.find(alias="bolt_diameter", io="Input")
+...     index.search('aliases:torque AND units:"kN*m"')
+[PosixPath('//share/calcs/joints/bolted_joint.mcdx'), ...]
+
+A file is only re-read if its modification time or size has changed, and then only if its
+content hash has also changed (a file that was merely copied or touched keeps its entry).
+Entries for files that have been deleted are removed.
+"""
+
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+from time import perf_counter, time
+
+from .cache import file_hash
+from .mcdx import McdxWorksheet
+
+# The outcome of an update. failed lists (path, error) of the files that could not be read
+IndexReport = namedtuple(
+    "IndexReport", ["scanned", "indexed", "unchanged", "removed", "failed", "seconds"]
+)
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime REAL, "
+    "size INTEGER, hash TEXT, version TEXT, error TEXT, indexed REAL)",
+    "CREATE TABLE IF NOT EXISTS aliases (path TEXT, io TEXT, alias TEXT, value TEXT, units TEXT, "
+    "error_code INTEGER)",
+    "CREATE INDEX IF NOT EXISTS aliases_alias ON aliases (alias)",
+    "CREATE INDEX IF NOT EXISTS aliases_units ON aliases (units)",
+    "CREATE INDEX IF NOT EXISTS aliases_path ON aliases (path)",
+    # rows of the full-text index share the rowid of their files row
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(name, aliases, units, version, "
+    "tokenize = \"unicode61 tokenchars '_.'\")",
+]
+
+
+def _json_value(value):
+    """Returns a saved value as JSON text (None stays None)"""
+    return None if value is None else json.dumps(value)
+
+
+def _read_worksheet(path, mtime, size, known_hash):
+    """
+    Reads one worksheet for the index (run in the worker processes). Returns the record to
+    store; its aliases are None if the file's content hash is known_hash (it has not changed)
+    """
+    record = {
+        "path": path, "mtime": mtime, "size": size, "hash": None, "version": "", "error": "",
+        "aliases": [],
+    }
+    try:
+        record["hash"] = file_hash(path)
+    except OSError as exc:  # e.g. locked or unreadable - stored without an mtime, so it is retried
+        record.update(mtime=None, error=f"{type(exc).__name__}: {exc}")
+        return record
+    if record["hash"] == known_hash:
+        return {"path": path, "mtime": mtime, "size": size, "hash": known_hash, "aliases": None}
+    try:
+        worksheet = McdxWorksheet(path)
+        record["version"] = worksheet.version()
+        for alias in worksheet.inputs():
+            value, units, error_code = worksheet.get_input(alias)
+            record["aliases"].append(("Input", alias, _json_value(value), units, error_code))
+        for alias in worksheet.outputs():
+            value, units, error_code = worksheet.get_output(alias)
+            record["aliases"].append(("Output", alias, _json_value(value), units, error_code))
+    except Exception as exc:  # pylint: disable=broad-except
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    return record
+
+
+def _read_chunk(jobs):
+    return [_read_worksheet(*job) for job in jobs]
+
+
+class WorksheetIndex:
+    """An SQLite index of the worksheets in one or more directory trees"""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._connection = sqlite3.connect(str(path))
+        with self._connection:
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        """Closes the database connection"""
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Indexing ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def update(self, root, pattern="*.mcdx", processes=1, chunksize=32) -> IndexReport:
+        """
+        Brings the index up to date with the worksheets matching pattern under root (searched
+        recursively). Files are read in parallel if processes is greater than 1. Returns an
+        IndexReport
+        """
+        start = perf_counter()
+        root = Path(root).resolve()
+        prefix = os.path.join(str(root), "")  # only the files under root
+        known = {
+            path: (mtime, size, content_hash)
+            for path, mtime, size, content_hash in self._connection.execute(
+                "SELECT path, mtime, size, hash FROM files WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\uffff"),
+            )
+        }
+        jobs = []  # (path, mtime, size, known hash) of the new and modified files
+        seen = set()
+        for filepath in root.rglob(pattern):
+            path = str(filepath)
+            try:
+                stat = filepath.stat()
+            except OSError:
+                continue  # removed during the scan
+            seen.add(path)
+            mtime, size, content_hash = known.get(path, (None, None, None))
+            if (mtime, size) != (stat.st_mtime, stat.st_size):
+                jobs.append((path, stat.st_mtime, stat.st_size, content_hash))
+
+        if processes <= 1:
+            records = [_read_worksheet(*job) for job in jobs]
+        else:
+            chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context()
+            ) as executor:
+                records = [
+                    record for chunk in executor.map(_read_chunk, chunks) for record in chunk
+                ]
+
+        removed = [path for path in known if path not in seen]
+        indexed = 0
+        with self._connection:  # one transaction per update
+            for path in removed:
+                self._remove(path)
+            for record in records:
+                if record["aliases"] is None:  # touched, but the content has not changed
+                    self._connection.execute(
+                        "UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                        (record["mtime"], record["size"], record["path"]),
+                    )
+                else:
+                    self._store(record)
+                    indexed += 1
+        failed = [(record["path"], record["error"]) for record in records if record.get("error")]
+        return IndexReport(
+            len(seen), indexed, len(seen) - indexed, len(removed), failed, perf_counter() - start
+        )
+
+    def _remove(self, path):
+        row = self._connection.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            self._connection.execute("DELETE FROM search WHERE rowid = ?", row)
+            self._connection.execute("DELETE FROM files WHERE id = ?", row)
+        self._connection.execute("DELETE FROM aliases WHERE path = ?", (path,))
+
+    def _store(self, record):
+        path = record["path"]
+        self._remove(path)
+        file_id = self._connection.execute(
+            "INSERT INTO files (path, mtime, size, hash, version, error, indexed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, record["mtime"], record["size"], record["hash"], record["version"],
+             record["error"], time()),
+        ).lastrowid
+        self._connection.executemany(
+            "INSERT INTO aliases VALUES (?, ?, ?, ?, ?, ?)",
+            [(path, *alias_record) for alias_record in record["aliases"]],
+        )
+        aliases = " ".join(alias for _io, alias, *_rest in record["aliases"])
+        units = " ".join(dict.fromkeys(
+            units for *_rest, units, _error_code in record["aliases"] if units
+        ))
+        self._connection.execute(
+            "INSERT INTO search (rowid, name, aliases, units, version) VALUES (?, ?, ?, ?, ?)",
+            (file_id, Path(path).stem, aliases, units, record["version"]),
+        )
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Queries ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def find(self, alias=None, units=None, io=None) -> list:
+        """
+        Returns the paths of the worksheets with a designated alias matching all of the given
+        criteria: alias name, units (exactly as reported by McdxWorksheet, e.g. "N*m") and io
+        ("Input" or "Output")
+        """
+        conditions, parameters = [], []
+        for column, value in [("alias", alias), ("units", units), ("io", io)]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection.execute(
+            f"SELECT DISTINCT path FROM aliases {where} ORDER BY path", parameters
+        )
+        return [Path(path) for (path,) in rows]
+
+    def search(self, query, limit=100) -> list:
+        """
+        Full-text search of worksheet names, aliases, units and versions (SQLite FTS5 query
+        syntax, e.g. 'bolt*', 'aliases:torque AND units:kN'). Units containing operators must be
+        quoted, e.g. 'units:"kN*m"' or 'units:"N/mm^2"', as FTS5 reads * as a prefix search
+        and rejects / and ^ outside quotes. Returns paths, best match first
+        """
+        rows = self._connection.execute(
+            "SELECT files.path FROM search JOIN files ON files.id = search.rowid "
+            "WHERE search MATCH ? ORDER BY search.rank LIMIT ?", (query, limit)
+        )
+        return [Path(path) for (path,) in rows]
+
+    def info(self, path) -> dict:
+        """
+        Returns the indexed details of a worksheet: its version, any error reading it, and
+        {alias: (value, units, error code)} of its inputs and outputs
+        """
+        path = str(Path(path).resolve())
+        row = self._connection.execute(
+            "SELECT version, error, hash FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"{path} is not in the index")
+        details = {"version": row[0], "error": row[1], "hash": row[2], "Input": {}, "Output": {}}
+        for io_type, alias, value, units, error_code in self._connection.execute(
+            "SELECT io, alias, value, units, error_code FROM aliases WHERE path = ? ORDER BY rowid",
+            (path,),
+        ):
+            details[io_type][alias] = (
+                None if value is None else json.loads(value), units, error_code
+            )
+        return details
+
+    def stats(self) -> dict:
+        """Returns the number of files, aliases and distinct aliases and units in the index"""
+        execute = self._connection.execute
+        return {
+            "files": len(self),
+            "aliases": execute("SELECT COUNT(*) FROM aliases").fetchone()[0],
+            "distinct_aliases": execute("SELECT COUNT(DISTINCT alias) FROM aliases").fetchone()[0],
+            "distinct_units": execute("SELECT COUNT(DISTINCT units) FROM aliases").fetchone()[0],
+        }
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+mcdx.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Reads the designated inputs and outputs of a Mathcad Prime (.mcdx) file, and the values they had
+when it was last saved, without starting Mathcad. An .mcdx file is an OPC (zip) package of XML
+parts; the parts needed are read with zipfile and parsed incrementally, so this works on any
+operating system and is fast enough to index large numbers of worksheets:
+
+>>> from MathcadPy.mcdx import McdxWorksheet
+>>> worksheet = McdxWorksheet("Test/test.mcdx")
+>>> worksheet.inputs()
+['real_input_test', 'real_input_with_units_test', 'string_input_test', 'matrix_input_test']
+>>> worksheet.get_input("real_input_with_units_test")
+(3.0, 'mm', 0)
+>>> worksheet.get_output("real_output_test")
+(0.033, 'm', 0)
+
+Output values are those saved in the file, so they are only as up to date as the last
+calculation before the worksheet was saved. Input values are read from the worksheet's
+definitions; inputs defined by an expression rather than a value are returned as None.
+"""
+
+import zipfile
+from pathlib import Path
+from xml.etree import ElementTree
+
+from .results import OutputResult
+
+WORKSHEET_PART = "mathcad/worksheet.xml"
+RESULT_PART = "mathcad/result.xml"
+INTEGRATION_PART = "mathcad/integration.xml"
+APP_PROPERTIES_PART = "docProps/app.xml"
+CALCULATION_PART = "mathcad/settings/calculation.xml"
+
+# Symbols for the unit names used in saved results. Other unit names are used unchanged
+UNIT_SYMBOLS = {
+    "meter": "m", "second": "s", "kilogram": "kg", "gram": "gm", "ampere": "A", "kelvin": "K",
+    "mole": "mol", "candela": "cd", "radian": "rad", "steradian": "sr", "newton": "N",
+    "joule": "J", "watt": "W", "pascal": "Pa", "hertz": "Hz", "coulomb": "C", "volt": "V",
+    "ohm": "Ω", "farad": "F", "henry": "H", "tesla": "T", "weber": "Wb", "siemens": "S",
+    "liter": "L", "minute": "min", "hour": "hr", "day": "day", "degree": "deg",
+    "pound": "lb", "foot": "ft", "inch": "in", "mile": "mi", "yard": "yd",
+}
+
+
+def _local_name(tag: str) -> str:
+    """Returns an XML tag without its namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _children(element):
+    """Returns the child elements of an XML element"""
+    return list(element)
+
+
+def _unit_expression(element) -> str:
+    """Converts a units expression (e.g. N*m, from a definition or unit override) to a string"""
+    tag = _local_name(element.tag)
+    if tag == "id":
+        return element.text or ""
+    if tag == "parens":
+        return f"({_unit_expression(_children(element)[0])})"
+    if tag == "apply":
+        operator, *operands = _children(element)
+        operator = _local_name(operator.tag)
+        parts = [_unit_expression(operand) for operand in operands]
+        if operator in ["mult", "scale"]:
+            return "*".join(parts)
+        if operator == "div":
+            return "/".join(parts)
+        if operator == "pow":
+            return "^".join(parts)
+    if tag == "real":
+        return element.text or ""
+    return ""
+
+
+def _unit_monomial(element) -> str:
+    """Converts a saved result's unitMonomial element to a units string, e.g. lb*ft^2/s^2"""
+    numerator, denominator = [], []
+    for unit_reference in _children(element):
+        symbol = UNIT_SYMBOLS.get(unit_reference.get("unit"), unit_reference.get("unit"))
+        power = int(unit_reference.get("power-numerator", "1"))
+        power_denominator = int(unit_reference.get("power-denominator", "1"))
+        magnitude = abs(power) if power_denominator == 1 else f"({abs(power)}/{power_denominator})"
+        term = symbol if magnitude == 1 else f"{symbol}^{magnitude}"
+        (numerator if power > 0 else denominator).append(term)
+    units = "*".join(numerator) or ("1" if denominator else "")
+    if len(denominator) == 1:
+        units += f"/{denominator[0]}"
+    elif denominator:
+        units += f"/({'*'.join(denominator)})"
+    return units
+
+
+def _matrix_rows(element, values):
+    """Arranges a saved matrix's (column-major) element values into a list of rows"""
+    rows = int(element.get("rows"))
+    cols = int(element.get("cols"))
+    return [[values[col * rows + row] for col in range(cols)] for row in range(rows)]
+
+
+def _common_units(units_list) -> str:
+    """Returns the units shared by every element of a matrix, or "" if they differ"""
+    units = set(units_list)
+    return units.pop() if len(units) == 1 else ""
+
+
+def _definition_value(element):
+    """Converts the value expression of an input definition to (value, units)"""
+    tag = _local_name(element.tag)
+    if tag == "real":
+        return float(element.text), ""
+    if tag == "str":
+        return element.text or "", ""
+    if tag == "parens":
+        return _definition_value(_children(element)[0])
+    if tag == "matrix":
+        values = [_definition_value(child) for child in _children(element)]
+        rows = _matrix_rows(element, [value for value, _units in values])
+        return rows, _common_units(units for _value, units in values)
+    if tag == "apply":
+        operator, *operands = _children(element)
+        operator = _local_name(operator.tag)
+        if operator == "neg" and len(operands) == 1:
+            value, units = _definition_value(operands[0])
+            return (-value if isinstance(value, float) else None), units
+        if operator in ["scale", "mult", "div"] and operands:
+            value, units = _definition_value(operands[0])
+            if isinstance(value, (float, list)):
+                separator = "/" if operator == "div" else "*"
+                unit_parts = [units] if units else []
+                unit_parts += [_unit_expression(operand) for operand in operands[1:]]
+                return value, separator.join(unit_parts)
+    return None, ""  # an expression, rather than a value
+
+
+def _result_value(element):
+    """Converts a saved result element (real, unitedValue, matrix, str) to (value, units)"""
+    tag = _local_name(element.tag)
+    if tag == "real":
+        return float(element.text), ""
+    if tag == "str":
+        return element.text or "", ""
+    if tag == "unitedValue":
+        value_element, *monomial = _children(element)
+        value, _units = _result_value(value_element)
+        return value, _unit_monomial(monomial[0]) if monomial else ""
+    if tag == "matrix":
+        values = [_result_value(child) for child in _children(element)]
+        rows = _matrix_rows(element, [value for value, _units in values])
+        return rows, _common_units(units for _value, units in values)
+    return None, ""
+
+
+class McdxWorksheet:
+    """
+    Offline reader for a Mathcad Prime worksheet file. The methods mirror those of the Worksheet
+    class, returning the values saved in the file
+    """
+
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        if not self.filepath.exists():
+            raise FileNotFoundError(f"The provided path does not exist: {self.filepath}")
+        if self.filepath.suffix.lower() != ".mcdx":
+            raise ValueError(f"The provided path is not a Mathcad Prime file: {self.filepath}")
+        self._aliases = None  # {"Input"/"Output": {alias: region id}}
+        self._inputs = None  # {alias: (value, units)}
+        self._outputs = None  # {alias: (value, units, error code)}
+        self._version = None
+
+    def __repr__(self):
+        return f"McdxWorksheet('{self.filepath}')"
+
+    def name(self):
+        """Returns the filename of the worksheet"""
+        return self.filepath.name
+
+    def version(self):
+        """Returns the version of Mathcad Prime that last saved the worksheet"""
+        if self._version is None:
+            with zipfile.ZipFile(self.filepath) as package:
+                root = ElementTree.fromstring(package.read(APP_PROPERTIES_PART))
+            self._version = next(
+                (element.text for element in root if _local_name(element.tag) == "appVersion"), ""
+            )
+        return self._version
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Package parsing ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _alias_index(self):
+        """Reads the designated input/output aliases from the integration part"""
+        if self._aliases is None:
+            self._aliases = {"Input": {}, "Output": {}}
+            with zipfile.ZipFile(self.filepath) as package:
+                if INTEGRATION_PART not in package.namelist():
+                    return self._aliases  # no designated inputs or outputs
+                with package.open(INTEGRATION_PART) as part:
+                    for _event, element in ElementTree.iterparse(part):
+                        if _local_name(element.tag) != "region":
+                            continue
+                        io_type = element.get("ioTagType")
+                        for alias in element.iter():
+                            if _local_name(alias.tag) == "alias" and io_type in self._aliases:
+                                self._aliases[io_type][alias.text] = element.get("region-id")
+                        element.clear()
+        return self._aliases
+
+    def _read_values(self):
+        """Reads the saved input and output values from the worksheet and result parts"""
+        aliases = self._alias_index()
+        regions = {region_id: alias for alias, region_id in aliases["Input"].items()}
+        regions.update({region_id: alias for alias, region_id in aliases["Output"].items()})
+        self._inputs, self._outputs = {}, {}
+        output_refs = {}  # {result id: (alias, unit override)}
+        with zipfile.ZipFile(self.filepath) as package:
+            with package.open(WORKSHEET_PART) as part:
+                for _event, element in ElementTree.iterparse(part):
+                    if _local_name(element.tag) != "region":
+                        continue
+                    alias = regions.get(element.get("region-id"))
+                    if alias is not None:
+                        self._read_region(element, alias, aliases, output_refs)
+                    element.clear()  # only the designated regions are kept in memory
+
+            results = {}
+            if output_refs and RESULT_PART in package.namelist():
+                with package.open(RESULT_PART) as part:
+                    for _event, element in ElementTree.iterparse(part):
+                        if _local_name(element.tag) != "resultData":
+                            continue
+                        result_id = element.get("result-id")
+                        result = next(
+                            (child for child in element if _local_name(child.tag) == "result"), None
+                        )
+                        if result_id in output_refs and result is not None and len(result):
+                            results[result_id] = _result_value(result[0])
+                        element.clear()
+
+        for result_id, (alias, unit_override) in output_refs.items():
+            if result_id in results:
+                value, units = results[result_id]
+                self._outputs[alias] = (value, unit_override or units, 0)
+            else:
+                self._outputs[alias] = (None, "", 1)  # no saved result (e.g. an error)
+
+    def _read_region(self, element, alias, aliases, output_refs):
+        """Reads one designated math region"""
+        math = next((child for child in element if _local_name(child.tag) == "math"), None)
+        define = None if math is None else next(
+            (child for child in math if _local_name(child.tag) == "define"), None
+        )
+        if define is None:
+            return
+        _name, expression, *_rest = _children(define) + [None]
+        if alias in aliases["Input"] and expression is not None:
+            self._inputs[alias] = _definition_value(expression)
+        if alias in aliases["Output"]:
+            unit_override = ""
+            if expression is not None and _local_name(expression.tag) == "eval":
+                for child in expression:
+                    if _local_name(child.tag) == "unitOverride" and _children(child):
+                        unit_override = _unit_expression(_children(child)[0])
+            output_refs[math.get("resultRef")] = (alias, unit_override)
+
+    def _input_values(self):
+        if self._inputs is None:
+            self._read_values()
+        return self._inputs
+
+    def _output_values(self):
+        if self._outputs is None:
+            self._read_values()
+        return self._outputs
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Worksheet API ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def inputs(self):
+        """returns a list of the designated input fields in the worksheet"""
+        return list(self._alias_index()["Input"])
+
+    def outputs(self):
+        """returns a list of the designated output fields in the worksheet"""
+        return list(self._alias_index()["Output"])
+
+    def get_input(self, input_alias):
+        """Returns the saved (value, units, error code) of a specific input"""
+        if input_alias in self._alias_index()["Input"]:
+            value, units = self._input_values().get(input_alias, (None, ""))
+            return value, units, 0 if value is not None else 1
+        # else
+        raise ValueError(f"{input_alias} is not a designated input field")
+
+    def get_output(self, output_alias):
+        """Returns the saved (value, units, error code) of a designated output"""
+        if output_alias in self._alias_index()["Output"]:
+            return self._output_values().get(output_alias, (None, "", 1))
+        # else
+        raise ValueError(f"'{output_alias}' is not a designated output field")
+
+    def get_real_output(self, output_alias):
+        """Returns the saved (value, units, error code) of a designated output"""
+        return self.get_output(output_alias)
+
+    def get_outputs(self, aliases=None):
+        """Returns the saved values of several designated outputs as {alias: OutputResult}"""
+        aliases = self.outputs() if aliases is None else list(aliases)
+        return {alias: OutputResult(*self.get_output(alias)) for alias in aliases}
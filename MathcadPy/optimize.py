@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+optimize.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+An adapter that presents a worksheet as an objective function (with constraints and gradients)
+for scipy.optimize. Each element of the parameter vector is sent to a designated input, and the
+objective and constraints are designated outputs:
+
+>>> from scipy.optimize import minimize
+>>> from MathcadPy.optimize import WorksheetFunction
+>>> beam = WorksheetFunction(
+...     worksheet,
+...     parameters={"width": "mm", "depth": "mm"},
+...     objective="mass",
+...     constraints={"stress": (None, 250.0), "deflection": (None, 5.0)},
+... )
+>>> result = minimize(
+...     beam, x0=[50.0, 100.0], jac=beam.jac, constraints=beam.scipy_constraints(),
+...     method="SLSQP",
+... )
+>>> beam.summary()
+{'calls': {'objective': 12, 'gradient': 9, 'constraint': 40}, 'evaluations': 30, ...}
+
+Every output is fetched each time the worksheet is calculated, and the results are memoized by
+parameter vector (and the values of the worksheet's other inputs), so an optimizer asking for the
+objective and then each constraint at the same point costs one calculation. Finite difference
+gradients need one calculation per parameter; if a MathcadPool (created with the same worksheet
+and outputs) is supplied they are calculated in parallel across the pool.
+"""
+
+from collections import namedtuple
+from time import perf_counter
+
+from ._application import MathcadOutputError
+from .cache import ResultCache, file_hash, result_key
+
+# One call made by the optimizer. evaluations is the number of worksheet calculations it needed
+CallRecord = namedtuple("CallRecord", ["kind", "point", "seconds", "evaluations"])
+
+
+class WorksheetFunction:
+    """
+    A worksheet as a function of a parameter vector.
+
+    parameters is a list of input aliases, or an {input alias: units} dictionary, in the order of
+    the parameter vector. objective is the output alias to minimise. constraints is an optional
+    {output alias: (lower, upper)} dictionary of bounds (None for no bound). units is an optional
+    {output alias: units} dictionary.
+    pool is an optional MathcadPool used to calculate the points of finite difference gradients
+    in parallel; worksheet may be None if a pool is given, in which case every point is
+    calculated by the pool. step is the relative finite difference step and scheme is either
+    "forward" (one calculation per parameter) or "central" (two).
+    cache is an optional ResultCache for the memoized results. If it is shared between functions
+    or persisted, the keys include the worksheet's content hash. With a worksheet, the keys also
+    include the values of its inputs that are not parameters, so results are not reused after
+    one of those is changed (e.g. by set_inputs).
+    """
+
+    def __init__(self, worksheet, parameters, objective, constraints=None, units=None, pool=None,
+                 step=1e-6, scheme="forward", cache=None):
+        if worksheet is None and pool is None:
+            raise ValueError("Either a worksheet or a pool is required")
+        if scheme not in ["forward", "central"]:
+            raise ValueError("scheme must be either 'forward' or 'central'")
+        self.worksheet = worksheet
+        self.pool = pool
+        if isinstance(parameters, dict):
+            self.parameters = list(parameters)
+            self.parameter_units = dict(parameters)
+        else:
+            self.parameters = list(parameters)
+            self.parameter_units = {}
+        self.objective = objective
+        self.constraints = dict(constraints or {})
+        self.outputs = list(dict.fromkeys([objective, *self.constraints]))
+        self.units = units
+        self.step = step
+        self.scheme = scheme
+        self.cache = ResultCache(maxsize=4096) if cache is None else cache
+        self.evaluations = 0  # no. of times the worksheet has been calculated
+        self.log = []  # [CallRecord]
+        if worksheet is not None:
+            self._worksheet_hash = worksheet.content_hash()
+        else:
+            self._worksheet_hash = file_hash(pool.worksheet_path)
+
+    def __call__(self, x):
+        """Returns the objective at x"""
+        return self.value(x)
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Evaluation ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _point(self, x) -> tuple:
+        point = tuple(float(value) for value in x)
+        if len(point) != len(self.parameters):
+            raise ValueError(
+                f"Expected {len(self.parameters)} parameters ({', '.join(self.parameters)}), "
+                f"got {len(point)}"
+            )
+        return point
+
+    def _inputs(self, point) -> dict:
+        """Converts a point to {input alias: value | (value, units)}"""
+        inputs = {}
+        for input_alias, value in zip(self.parameters, point):
+            units = self.parameter_units.get(input_alias)
+            inputs[input_alias] = (value, units) if units else value
+        return inputs
+
+    def _key(self, point) -> str:
+        """
+        Returns the cache key of a point: the worksheet's full input state with the point applied
+        (only the parameters when every point is calculated by a pool)
+        """
+        if self.worksheet is None:
+            inputs = self._inputs(point)
+        else:
+            inputs = self.worksheet._full_input_state({})  # pylint: disable=protected-access
+            inputs.update(self._inputs(point))
+        return result_key(self._worksheet_hash, inputs, self.outputs, self.units)
+
+    def _calculate(self, point) -> dict:
+        """Calculates one point on the worksheet, returning {output alias: value}"""
+        self.worksheet.set_inputs(self._inputs(point), synchronize=True)
+        results = self.worksheet.get_outputs(self.outputs, units=self.units)
+        failed = {
+            output_alias: result.error_code
+            for output_alias, result in results.items() if result.error_code
+        }
+        if failed:
+            raise MathcadOutputError(failed, inputs=dict(zip(self.parameters, point)))
+        return {output_alias: result.value for output_alias, result in results.items()}
+
+    def _calculate_on_pool(self, points) -> list:
+        """Calculates several points in parallel across the pool"""
+        values = []
+        for _case_number, row in self.pool.map([self._inputs(point) for point in points]):
+            if row["error"]:
+                raise ValueError(f"Calculation failed: {row['error']}")
+            values.append({output_alias: row[output_alias] for output_alias in self.outputs})
+        return values
+
+    def _values(self, points) -> list:
+        """
+        Returns the {output alias: value} of each point, calculating (in parallel if there is a
+        pool) only those points that are not memoized
+        """
+        keys = [self._key(point) for point in points]
+        found = {}
+        missing = {}  # {key: point}, so a point repeated within the call is calculated once
+        for key, point in zip(keys, points):
+            if key not in found and key not in missing:
+                value = self.cache.get(key)
+                if value is None:
+                    missing[key] = point
+                else:
+                    found[key] = value
+        if missing:
+            if self.pool is not None and (self.worksheet is None or len(missing) > 1):
+                calculated = self._calculate_on_pool(list(missing.values()))
+            else:
+                calculated = [self._calculate(point) for point in missing.values()]
+            self.evaluations += len(missing)
+            for key, value in zip(missing, calculated):
+                self.cache.put(key, value)
+                found[key] = value
+        return [found[key] for key in keys]
+
+    def _record(self, kind, point, start, evaluations_before):
+        self.log.append(CallRecord(
+            kind, point, perf_counter() - start, self.evaluations - evaluations_before
+        ))
+
+    def outputs_at(self, x) -> dict:
+        """Returns every tracked output ({output alias: value}) at x"""
+        point = self._point(x)
+        return dict(self._values([point])[0])
+
+    def value(self, x, output_alias=None):
+        """Returns an output (by default the objective) at x"""
+        start, before = perf_counter(), self.evaluations
+        point = self._point(x)
+        output_alias = self.objective if output_alias is None else output_alias
+        value = self._values([point])[0][output_alias]
+        self._record("objective" if output_alias == self.objective else "constraint", point, start,
+                     before)
+        return value
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Gradients ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _steps(self, point) -> list:
+        return [self.step * max(1.0, abs(value)) for value in point]
+
+    def gradients(self, x) -> dict:
+        """
+        Returns the finite difference gradient of every tracked output at x, as
+        {output alias: [d output / d parameter, ...]}. All the points needed are calculated
+        together (in parallel if there is a pool)
+        """
+        start, before = perf_counter(), self.evaluations
+        point = self._point(x)
+        steps = self._steps(point)
+        points = [] if self.scheme == "central" else [point]  # central differences skip x
+        for index, step in enumerate(steps):
+            points.append(point[:index] + (point[index] + step,) + point[index + 1:])
+            if self.scheme == "central":
+                points.append(point[:index] + (point[index] - step,) + point[index + 1:])
+        values = self._values(points)
+
+        gradients = {output_alias: [] for output_alias in self.outputs}
+        for index, step in enumerate(steps):
+            for output_alias, gradient in gradients.items():
+                if self.scheme == "central":
+                    upper = values[2 * index][output_alias]
+                    lower = values[2 * index + 1][output_alias]
+                    gradient.append((upper - lower) / (2 * step))
+                else:
+                    upper = values[index + 1][output_alias]
+                    gradient.append((upper - values[0][output_alias]) / step)
+        self._record("gradient", point, start, before)
+        return gradients
+
+    def jac(self, x, output_alias=None):
+        """Returns the gradient of an output (by default the objective) at x as a numpy array"""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        output_alias = self.objective if output_alias is None else output_alias
+        return np.array(self.gradients(x)[output_alias], dtype=np.float64)
+
+    def value_and_jac(self, x):
+        """Returns (objective, gradient) at x, for use with minimize(..., jac=True)"""
+        return self.value(x), self.jac(x)
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Constraints ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def scipy_constraints(self) -> list:
+        """
+        Returns the constraints as a list of scipy.optimize "ineq" constraint dictionaries (each
+        non-negative when satisfied), with their gradients
+        """
+        constraints = []
+        for output_alias, (lower, upper) in self.constraints.items():
+            if lower is not None:
+                constraints.append({
+                    "type": "ineq",
+                    "fun": lambda x, alias=output_alias, bound=lower: self.value(x, alias) - bound,
+                    "jac": lambda x, alias=output_alias: self.jac(x, alias),
+                })
+            if upper is not None:
+                constraints.append({
+                    "type": "ineq",
+                    "fun": lambda x, alias=output_alias, bound=upper: bound - self.value(x, alias),
+                    "jac": lambda x, alias=output_alias: -self.jac(x, alias),
+                })
+        return constraints
+
+    # ~~~~~~~~~~~~~~~~~~~~~ Call log ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def summary(self) -> dict:
+        """Returns the number of calls by kind, worksheet calculations, cache hits and timings"""
+        calls = {}
+        seconds = {}
+        for record in self.log:
+            calls[record.kind] = calls.get(record.kind, 0) + 1
+            seconds[record.kind] = seconds.get(record.kind, 0.0) + record.seconds
+        return {
+            "calls": calls,
+            "evaluations": self.evaluations,
+            "cache_hits": self.cache.hits,
+            "seconds": seconds,
+            "seconds_per_evaluation": (
+                sum(seconds.values()) / self.evaluations if self.evaluations else 0.0
+            ),
+        }
+
+    def reset_log(self):
+        """Clears the call log and the calculation count (the memoized results are kept)"""
+        self.log = []
+        self.evaluations = 0
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+pool.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A pool of worker processes, each running its own Mathcad instance on a private copy of a
+worksheet, so that independent cases can be evaluated in parallel:
+
+>>> from MathcadPy.pool import MathcadPool
+>>> from MathcadPy.sweep import grid
+>>> with MathcadPool("beam.mcdx", processes=8, outputs=["deflection"]) as pool:
+...     for case_number, row in pool.map(grid(length=[1, 2, 3], width=[0.1, 0.2])):
+...         print(case_number, row["deflection"])
+
+A single Mathcad Prime instance only calculates one worksheet at a time, so this is the way to use
+more than one core. Workers that crash, or that take longer than the timeout on a single case,
+are terminated and replaced, and their Mathcad instance is stopped with them.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from time import monotonic
+
+from . import _com
+from .sweep import Sweep
+from .watchdog import kill_process, mathcad_process_ids, started_process_id
+
+_START_LOCK_TIMEOUT = 120  # longest a worker waits for another to finish starting Mathcad
+
+
+def new_instance():
+    """Default worker backend: starts a new (rather than attaching to a running) Mathcad instance"""
+    return _com.dispatch_ex()
+
+
+def _worker(worksheet_path, settings, task_queue, connection, start_lock):
+    """
+    Worker process main loop. Starts Mathcad, reports the id of its process, then runs cases from
+    task_queue until it receives None. Results are sent on the worker's own pipe, so terminating
+    a worker cannot corrupt the results of the others. Each result is sent with the tag of its
+    task, (map id, case number)
+    """
+    if settings["backend"] is new_instance:
+        import pythoncom  # pylint: disable=import-outside-toplevel
+
+        pythoncom.CoInitialize()  # each process has its own (single threaded) COM apartment
+    sweep = Sweep(worksheet_path, None, None, **settings)
+    try:
+        # one Mathcad starts at a time, so that its new process can be identified. The wait is
+        # limited in case another worker was killed while holding the lock
+        locked = start_lock.acquire(timeout=_START_LOCK_TIMEOUT)
+        try:
+            process_ids = mathcad_process_ids()
+            try:
+                sweep._start()  # pylint: disable=protected-access
+            except Exception:  # pylint: disable=broad-except
+                pass  # the first case records the error (and tries to start Mathcad again)
+            connection.send(("started", started_process_id(process_ids)))
+        finally:
+            if locked:
+                start_lock.release()
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            tag, case_inputs = task
+            connection.send(("result", tag, sweep.evaluate(case_inputs)))
+    finally:
+        sweep.close(quit_app=True)
+
+
+class _Worker:
+    """Parent side record of a worker process"""
+
+    def __init__(self, context, worksheet_copy, settings, start_lock):
+        self.task_queue = context.Queue()
+        self.connection, child_connection = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=_worker,
+            args=(str(worksheet_copy), settings, self.task_queue, child_connection, start_lock),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()  # so the pipe reports EOF if the worker dies
+        self.mathcad_pid = None  # the worker's Mathcad process, once it has started
+        self.task = None  # (case_number, case_inputs, attempt) currently being run
+        self.map_id = None  # the MathcadPool.map call that task belongs to
+        self.started = 0.0
+
+    def submit(self, task, map_id):
+        self.task = task
+        self.map_id = map_id
+        self.started = monotonic()
+        case_number, case_inputs, _attempt = task
+        self.task_queue.put(((map_id, case_number), case_inputs))
+
+    def stop(self, terminate=False):
+        """
+        Stops the worker. If terminate is True the worker is killed along with its Mathcad
+        instance, which may be hung (e.g. on a modal dialog) and would otherwise be left running
+        """
+        if terminate:
+            self.process.terminate()
+        else:
+            self.task_queue.put(None)
+        self.process.join(timeout=None if terminate else 30)
+        if self.process.is_alive():
+            self.process.kill()
+        if terminate and (self.mathcad_pid is not None or sys.platform == "win32"):
+            kill_process(self.mathcad_pid)  # logs an error if the process is not known
+        self.connection.close()
+
+
+class MathcadPool:
+    """
+    A pool of worker processes, each with its own Mathcad instance and private copy of the
+    worksheet.
+
+    processes defaults to the number of CPUs. outputs, units and preserve_worksheet_units have the
+    same meaning as for Sweep. backend is the callable each worker uses to create its Mathcad
+    application object; by default every worker starts a new instance of Mathcad. To use a
+    pure-Python stand-in (e.g. MathcadPy.fake.FakeApplication) the backend must be picklable.
+    timeout is the maximum number of seconds a single case may take before its worker is
+    considered hung. A case whose worker hangs or crashes is retried up to retries times before
+    it is recorded as failed.
+    """
+
+    def __init__(self, worksheet_path, processes=None, outputs=None, units=None,
+                 preserve_worksheet_units=True, visible=False, backend=new_instance, timeout=None,
+                 retries=1, start_method=None):
+        self.worksheet_path = Path(worksheet_path).resolve()
+        if not self.worksheet_path.exists():
+            raise FileNotFoundError(f"The provided path does not exist: {self.worksheet_path}")
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        self.retries = retries
+        self.restarts = 0  # no. of workers replaced after hanging or crashing
+        self._settings = {
+            "outputs": outputs,
+            "units": units,
+            "preserve_worksheet_units": preserve_worksheet_units,
+            "visible": visible,
+            "backend": backend,
+        }
+        self._context = multiprocessing.get_context(start_method)
+        self._start_lock = self._context.Lock()
+        self._temp_dir = Path(tempfile.mkdtemp(prefix="mathcadpy_pool_"))
+        self._worker_count = 0
+        self._map_count = 0  # no. of map calls, which number their tasks
+        self._workers = {}  # {pid: _Worker}
+        for _ in range(self.processes):
+            self._start_worker()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start_worker(self):
+        """Starts a worker process on its own copy of the worksheet"""
+        worker_dir = self._temp_dir / f"worker_{self._worker_count}"
+        worker_dir.mkdir()
+        self._worker_count += 1
+        worksheet_copy = shutil.copy2(self.worksheet_path, worker_dir / self.worksheet_path.name)
+        worker = _Worker(self._context, worksheet_copy, self._settings, self._start_lock)
+        self._workers[worker.process.pid] = worker
+
+    def _replace_worker(self, worker, error):
+        """
+        Terminates a hung or crashed worker and starts a new one. Returns (failed task, error,
+        seconds the task ran for)
+        """
+        seconds = monotonic() - worker.started
+        del self._workers[worker.process.pid]
+        worker.stop(terminate=True)
+        self.restarts += 1
+        self._start_worker()
+        return worker.task, error, seconds
+
+    def _receive(self, timeout):
+        """Returns the results sent by the workers, waiting up to timeout seconds for the first"""
+        workers = {worker.connection: worker for worker in self._workers.values()}
+        results = []
+        for connection in multiprocessing.connection.wait(list(workers), timeout=timeout):
+            worker = workers[connection]
+            try:
+                while connection.poll():
+                    message = connection.recv()
+                    if message[0] == "started":
+                        worker.mathcad_pid = message[1]
+                    else:
+                        results.append((worker, *message[1:]))
+            except (EOFError, OSError):
+                pass  # the worker has died, which is handled as a crash
+        return results
+
+    def map(self, cases, ordered=True):
+        """
+        Evaluates every case ({alias: value | (value, units)} dictionaries) across the pool.
+        Yields (case_number, row) tuples, in case order if ordered is True, otherwise as soon as
+        each case completes. Rows have the same columns as Sweep result rows.
+
+        A map that is not run to the end (or whose cases raise) may leave workers running its
+        cases. Their results are discarded by the next map, which only hands those workers new
+        cases once they have finished
+        """
+        self._map_count += 1
+        map_id = self._map_count
+        cases = iter(enumerate(cases))
+        retry = []  # tasks to re-run after their worker hung or crashed
+        completed = {}  # results held back to be yielded in order
+        next_case = 0
+        running = True
+        while running or retry or any(
+            worker.task and worker.map_id == map_id for worker in self._workers.values()
+        ):
+            # hand out work to idle workers
+            for worker in self._workers.values():
+                if worker.task is None:
+                    if retry:
+                        worker.submit(retry.pop(0), map_id)
+                    elif running:
+                        try:
+                            case_number, case_inputs = next(cases)
+                            worker.submit((case_number, case_inputs, 0), map_id)
+                        except StopIteration:
+                            running = False
+
+            for worker, tag, row in self._receive(timeout=0.1):
+                if worker.task and tag == (worker.map_id, worker.task[0]):
+                    worker.task = None
+                    if tag[0] == map_id:  # not a case left running by an earlier map
+                        completed[tag[1]] = row
+
+            # look for workers that have crashed or hung
+            failures = []
+            for worker in list(self._workers.values()):
+                if worker.task is None:
+                    continue
+                if not worker.process.is_alive():
+                    failure = self._replace_worker(worker, "worker process crashed")
+                elif self.timeout and monotonic() - worker.started > self.timeout:
+                    failure = self._replace_worker(
+                        worker, f"case timed out after {self.timeout} seconds"
+                    )
+                else:
+                    continue
+                if worker.map_id == map_id:  # earlier maps' cases are neither retried nor recorded
+                    failures.append(failure)
+            for (case_number, case_inputs, attempt), error, seconds in failures:
+                if attempt < self.retries:
+                    retry.append((case_number, case_inputs, attempt + 1))
+                else:
+                    completed[case_number] = {"error": error, "seconds": seconds}
+
+            if ordered:
+                while next_case in completed:
+                    yield next_case, completed.pop(next_case)
+                    next_case += 1
+            else:
+                for case_number in list(completed):
+                    yield case_number, completed.pop(case_number)
+
+    def close(self):
+        """Stops every worker (quitting its Mathcad instance) and removes the worksheet copies"""
+        for worker in self._workers.values():
+            worker.stop(terminate=worker.task is not None)
+        self._workers = {}
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
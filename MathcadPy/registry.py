@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+registry.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A process level registry of warm Mathcad instances. Starting Mathcad Prime takes 10-20 seconds, so
+rather than starting and quitting it for every job, scripts can take the registry's instance,
+which the registry starts (as a new, hidden instance) the first time and keeps alive between jobs:
+
+>>> from MathcadPy.registry import get_mathcad
+>>> mathcad_app = get_mathcad()  # starts Mathcad the first time
+>>> worksheet = mathcad_app.open("beam.mcdx")
+>>> mathcad_app is get_mathcad()  # later jobs reuse the same instance
+True
+
+get_mathcad(attach=True) uses the Mathcad instance that is already running, if there is one. An
+instance the registry did not start is left visible and is never quit or recycled by the registry.
+
+Mathcad Prime leaks memory over long runs, so a registry can recycle (quit and restart) its
+instances after a number of cases (reported with case_done) or minutes. Recycling happens in
+get(), so Worksheet objects from before a recycle must be opened again from the new instance.
+"""
+
+from time import monotonic
+
+from . import _com
+from ._application import Mathcad, MathcadComError
+
+
+class _Entry:
+    """
+    A registered Mathcad instance, with its age and the number of cases it has run. owned is False
+    for a running instance the registry attached to
+    """
+
+    def __init__(self, app, owned=True):
+        self.app = app
+        self.owned = owned
+        self.started = monotonic()
+        self.cases = 0
+
+
+class MathcadRegistry:
+    """
+    Holds one warm Mathcad instance per backend (and profiler and watchdog).
+
+    max_cases and max_minutes (None for no limit) set when an instance is recycled.
+    """
+
+    def __init__(self, max_cases=None, max_minutes=None):
+        self.max_cases = max_cases
+        self.max_minutes = max_minutes
+        self.recycled = 0  # no. of instances that have been recycled
+        self._entries = {}  # {(backend, profiler, watchdog): _Entry}
+
+    def _due(self, entry) -> bool:
+        """Returns True if an instance should be recycled"""
+        if self.max_cases is not None and entry.cases >= self.max_cases:
+            return True
+        if self.max_minutes is not None and monotonic() - entry.started >= self.max_minutes * 60:
+            return True
+        return False
+
+    @staticmethod
+    def _alive(app) -> bool:
+        try:
+            app.get_version()
+            return True
+        except (_com.com_error, MathcadComError):
+            return False
+
+    def _entry(self, app):
+        for entry in self._entries.values():
+            if entry.app is app:
+                return entry
+        raise ValueError("The Mathcad instance is not held by this registry")
+
+    def get(self, visible=False, backend=None, attach=False, profiler=None,
+            watchdog=None) -> Mathcad:
+        """
+        Returns the warm Mathcad instance for backend, profiler and watchdog, starting it if there
+        is not one (or the previous one has stopped) and recycling it if it is due.
+
+        By default the registry starts a new Mathcad instance, leaving any Mathcad the user is
+        working in alone. attach=True instead uses the running Mathcad instance if there is one,
+        which the registry neither hides nor quits: when it is due to be recycled it is released
+        and a new instance is started in its place. backend, profiler and watchdog are otherwise
+        passed to the Mathcad class; an attached instance is not given the watchdog, as it must
+        not be restarted by the registry
+        """
+        key = (backend, profiler, watchdog)
+        entry = self._entries.get(key)
+        if entry is not None and self._due(entry):
+            if entry.owned:
+                self._quit(entry)
+            self.recycled += 1
+            entry = None
+            attach = False  # the replacement for an attached instance is the registry's own
+        elif entry is not None and not self._alive(entry.app):
+            entry = None
+        if entry is None:
+            entry = self._entries[key] = self._start(visible, backend, attach, profiler, watchdog)
+        return entry.app
+
+    @staticmethod
+    def _start(visible, backend, attach, profiler=None, watchdog=None) -> _Entry:
+        """Starts a Mathcad instance, or attaches to the running one if attach is True"""
+        if backend is None and Mathcad.default_backend is None:
+            if attach and _com.get_active() is not None:
+                app = Mathcad(visible=True, backend=_com.attach, profiler=profiler)
+                return _Entry(app, owned=False)
+            backend = _com.dispatch_ex
+        app = Mathcad(visible=visible, backend=backend, profiler=profiler, watchdog=watchdog)
+        return _Entry(app)
+
+    def case_done(self, app, cases=1) -> bool:
+        """
+        Records that app has run a number of cases. Returns True if it is now due to be
+        recycled (which happens at the next get())
+        """
+        entry = self._entry(app)
+        entry.cases += cases
+        return self._due(entry)
+
+    @staticmethod
+    def _quit(entry):
+        try:
+            entry.app.quit("Discard")
+        except (_com.com_error, MathcadComError):
+            pass  # Mathcad has already gone
+
+    def release(self, app):
+        """Removes an instance from the registry without quitting it"""
+        entry = self._entry(app)
+        self._entries = {key: other for key, other in self._entries.items() if other is not entry}
+
+    def quit_all(self):
+        """Quits every instance started by the registry, and releases those it attached to"""
+        for entry in self._entries.values():
+            if entry.owned:
+                self._quit(entry)
+        self._entries = {}
+
+
+default_registry = MathcadRegistry()
+
+
+def get_mathcad(visible=False, backend=None, attach=False, profiler=None,
+                watchdog=None) -> Mathcad:
+    """Returns the warm Mathcad instance held by the process level registry"""
+    return default_registry.get(visible, backend, attach, profiler, watchdog)
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+replay.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Recording and replay of the COM sessions of the Mathcad and Worksheet classes. A SessionRecorder
+is used as the Mathcad backend on a machine with Mathcad Prime, and captures every call made
+through the application object (and the worksheets, alias collections, results and matrices
+reached through it), with its arguments, result and wall time:
+
+>>> from MathcadPy import Mathcad
+>>> from MathcadPy.replay import SessionRecorder
+>>> recorder = SessionRecorder()
+>>> mathcad_app = Mathcad(visible=False, backend=recorder)
+>>> run_job(mathcad_app)
+>>> recorder.save("job.trace.gz")
+
+The trace can then be served by a ReplayBackend, without Mathcad (e.g. on Linux). The same job
+makes the same calls, and gets the recorded results after the recorded time (scaled by
+time_scale; 0 replays as fast as possible):
+
+>>> from MathcadPy.instrument import ComProfiler
+>>> from MathcadPy.replay import ReplayBackend
+>>> replay = ReplayBackend("job.trace.gz", time_scale=1.0)
+>>> run_job(Mathcad(visible=False, backend=replay, profiler=ComProfiler()))
+>>> replay.remaining()  # calls in the trace that the job did not make
+0
+
+Calls are matched by the object they are made on, their name and their arguments, and each
+recorded call is served once, in the order it was recorded. With strict=True every call must
+also be made in exactly the recorded order. A call that was not recorded raises ReplayError.
+COM errors are replayed as _com.com_error, so they are handled as they were when recorded.
+The worksheets must exist locally (Mathcad.open checks them), and paths={recorded directory:
+local directory} moves the file paths in the trace to where they are on the replaying machine.
+
+Trace files are JSON lines (gzip compressed if the name ends in .gz): a header, then one
+[object id, kind, name, arguments, result, seconds, error] array per call, where COM objects in
+the arguments and result are written as {"$obj": id}.
+"""
+
+import builtins
+import gzip
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from time import perf_counter, sleep
+
+from . import _com
+from .fake import _wait
+from .instrument import _CALLABLE_TYPES, _PLAIN_TYPES
+
+TRACE_FORMAT = "MathcadPy COM trace"
+TRACE_VERSION = 1
+
+# Event kinds. A start event is the creation of an application object by the backend
+START, GET, CALL, SET = "start", "get", "call", "set"
+
+
+class ReplayError(Exception):
+    """A call was made during replay that is not in the trace"""
+
+
+def _open_trace(filepath, mode):
+    if str(filepath).endswith(".gz"):
+        return gzip.open(filepath, mode + "t", encoding="utf-8")
+    return open(filepath, mode, encoding="utf-8")  # pylint: disable=consider-using-with
+
+
+def save_trace(events, filepath):
+    """Writes a list of events to a trace file"""
+    with _open_trace(filepath, "w") as file:
+        file.write(json.dumps({"format": TRACE_FORMAT, "version": TRACE_VERSION}) + "\n")
+        for event in events:
+            file.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+def load_trace(filepath) -> list:
+    """Reads the events from a trace file"""
+    with _open_trace(filepath, "r") as file:
+        header = json.loads(file.readline() or "{}")
+        if header.get("format") != TRACE_FORMAT:
+            raise ValueError(f"{filepath} is not a MathcadPy COM trace")
+        if header.get("version", 0) > TRACE_VERSION:
+            raise ValueError(f"{filepath} was written by a newer version of MathcadPy")
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _error_record(exc) -> dict:
+    """Returns the trace form of an exception raised by a COM call"""
+    is_com_error = isinstance(exc, _com.com_error)
+    args = exc.args if is_com_error else [str(exc)]
+    try:
+        args = json.loads(json.dumps(args))
+    except (TypeError, ValueError):
+        args = [str(arg) for arg in args]
+    return {"type": type(exc).__name__, "args": args, "com": is_com_error}
+
+
+def _raise_error(error):
+    """Raises a recorded exception"""
+    if error["com"]:
+        raise _com.com_error(*error["args"])
+    exception_type = getattr(builtins, error["type"], None)
+    if not (isinstance(exception_type, type) and issubclass(exception_type, Exception)):
+        raise ReplayError(f"{error['type']}: {' '.join(map(str, error['args']))}")
+    raise exception_type(*error["args"])
+
+
+def _encode(value):
+    """Returns the trace form of an argument or result"""
+    if isinstance(value, (RecordingProxy, ReplayObject)):
+        return {"$obj": object.__getattribute__(value, "_object_id")}
+    if isinstance(value, tuple):
+        return {"$tuple": [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    if isinstance(value, os.PathLike):  # recorded as text, so replays can move it (see paths)
+        return os.fsdecode(value)
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return {"$repr": repr(value)}
+
+
+def _map_paths(value, paths):
+    """Moves the recorded file paths in an argument or result to their local directories"""
+    if isinstance(value, list):
+        return [_map_paths(item, paths) for item in value]
+    if isinstance(value, dict):
+        return {key: _map_paths(item, paths) for key, item in value.items()}
+    if isinstance(value, str):
+        for recorded, local in paths.items():
+            recorded = str(recorded).rstrip("\\/")
+            if value.lower().startswith(recorded.lower()) and value[len(recorded):][:1] in [
+                "", "\\", "/"
+            ]:
+                rest = value[len(recorded):].replace("\\", "/").lstrip("/")
+                return str(Path(local, rest)) if rest else str(Path(local))
+    return value
+
+
+def _delay(seconds):
+    """Waits for a recorded call time (sleeping for most of it, so replays can run in parallel)"""
+    end = perf_counter() + seconds
+    if seconds > 0.002:
+        sleep(seconds - 0.001)
+    _wait(end - perf_counter())
+
+
+# ~~~~~~~~~~~~~~~~~~~~~ Recording ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class SessionRecorder:
+    """
+    A Mathcad backend that records the COM session of the application object created by
+    backend (by default the "MathcadPrime.Application" COM server)
+    """
+
+    def __init__(self, backend=None):
+        self._backend = _com.dispatch if backend is None else backend
+        self.events = []  # [object id, kind, name, arguments, result, seconds, error]
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """Starts the application, returning it wrapped in a recording proxy"""
+        start = perf_counter()
+        try:
+            app = self._backend()
+        except Exception as exc:
+            self.record(None, START, "", [], None, perf_counter() - start, exc)
+            raise
+        proxy = self.wrap(app)
+        self.record(None, START, "", [], _encode(proxy), perf_counter() - start)
+        return proxy
+
+    def wrap(self, value):
+        """Wraps a COM object in a RecordingProxy with a new object id"""
+        if type(value) in _PLAIN_TYPES or isinstance(value, RecordingProxy):
+            return value
+        with self._lock:
+            object_id = self._next_id
+            self._next_id += 1
+        return RecordingProxy(value, self, object_id)
+
+    def record(self, object_id, kind, name, args, result, seconds, error=None):
+        """Adds an event to the trace"""
+        event = [
+            object_id, kind, name, args, result, round(seconds, 7),
+            None if error is None else _error_record(error),
+        ]
+        with self._lock:
+            self.events.append(event)
+
+    def save(self, filepath):
+        """Writes the recorded events to a trace file"""
+        with self._lock:
+            events = list(self.events)
+        save_trace(events, filepath)
+
+    def clear(self):
+        """Discards the recorded events"""
+        with self._lock:
+            self.events = []
+
+
+def _unwrap(value):
+    """Returns the underlying COM object of a recording proxy"""
+    if isinstance(value, RecordingProxy):
+        return object.__getattribute__(value, "_com_object")
+    return value
+
+
+class RecordingProxy:
+    """Wraps a COM object, recording every method call and property access"""
+
+    __slots__ = ("_com_object", "_recorder", "_object_id")
+
+    def __init__(self, com_object, recorder, object_id):
+        object.__setattr__(self, "_com_object", com_object)
+        object.__setattr__(self, "_recorder", recorder)
+        object.__setattr__(self, "_object_id", object_id)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):  # python and pywin32 internals are not part of the session
+            raise AttributeError(name)
+        recorder = object.__getattribute__(self, "_recorder")
+        object_id = object.__getattribute__(self, "_object_id")
+        start = perf_counter()
+        try:
+            value = getattr(object.__getattribute__(self, "_com_object"), name)
+        except Exception as exc:
+            recorder.record(object_id, GET, name, [], None, perf_counter() - start, exc)
+            raise
+        if isinstance(value, _CALLABLE_TYPES):
+            return _recording_method(name, value, recorder, object_id)
+        seconds = perf_counter() - start
+        value = recorder.wrap(value)
+        recorder.record(object_id, GET, name, [], _encode(value), seconds)
+        return value
+
+    def __setattr__(self, name, value):
+        recorder = object.__getattribute__(self, "_recorder")
+        object_id = object.__getattribute__(self, "_object_id")
+        start = perf_counter()
+        error = None
+        try:
+            setattr(object.__getattribute__(self, "_com_object"), name, _unwrap(value))
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            recorder.record(
+                object_id, SET, name, [_encode(value)], None, perf_counter() - start, error
+            )
+
+    def __repr__(self):
+        return f"RecordingProxy({object.__getattribute__(self, '_com_object')!r})"
+
+
+def _recording_method(name, method, recorder, object_id):
+    """
+    Returns a COM method that records its calls (a plain function, so that it is recognised as
+    a method when the session is also profiled by MathcadPy.instrument)
+    """
+
+    def recorded_call(*args):
+        encoded_args = [_encode(arg) for arg in args]
+        start = perf_counter()
+        try:
+            result = method(*[_unwrap(arg) for arg in args])
+        except Exception as exc:
+            recorder.record(object_id, CALL, name, encoded_args, None, perf_counter() - start, exc)
+            raise
+        seconds = perf_counter() - start
+        result = recorder.wrap(result)
+        recorder.record(object_id, CALL, name, encoded_args, _encode(result), seconds)
+        return result
+
+    return recorded_call
+
+
+# ~~~~~~~~~~~~~~~~~~~~~ Replay ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class ReplayBackend:
+    """
+    A Mathcad backend that serves a recorded trace (a trace file path, or a list of events).
+    Each recorded call is delayed by time_scale times its recorded wall time. If strict is True
+    the calls must be made in the recorded order. paths is an optional {recorded directory:
+    local directory} dictionary, for replaying a trace recorded with worksheets in another
+    location (e.g. {"C:\\jobs": "/home/me/jobs"} to replay a Windows trace on Linux)
+    """
+
+    def __init__(self, trace, time_scale=1.0, strict=False, paths=None):
+        self.events = load_trace(trace) if isinstance(trace, (str, os.PathLike)) else list(trace)
+        if paths:
+            self.events = [
+                [object_id, kind, name, _map_paths(args, paths), _map_paths(result, paths),
+                 *rest]
+                for object_id, kind, name, args, result, *rest in self.events
+            ]
+        self.time_scale = time_scale
+        self.strict = strict
+        self.calls = 0  # no. of calls served
+        self._queues = {}  # {call key: deque of event indices, in recorded order}
+        self._methods = set()  # names of the COM methods (as opposed to properties)
+        self._names = set()  # names of every method and property in the trace
+        self._served = [False] * len(self.events)
+        self._cursor = 0  # first event not yet served (for strict replay)
+        self._lock = threading.Lock()
+        for index, (object_id, kind, name, args, *_rest) in enumerate(self.events):
+            self._queues.setdefault(self._key(object_id, kind, name, args), deque()).append(index)
+            self._names.add(name)
+            if kind == CALL:
+                self._methods.add(name)
+
+    @staticmethod
+    def _key(object_id, kind, name, args):
+        return object_id, kind, name, json.dumps(args, separators=(",", ":"))
+
+    def __call__(self):
+        """Returns the next recorded application object"""
+        return self.serve(None, START, "", [])
+
+    def remaining(self) -> int:
+        """Returns the number of recorded calls that have not been served"""
+        with self._lock:
+            return self._served.count(False)
+
+    def recorded_seconds(self) -> float:
+        """Returns the total recorded wall time of the COM calls"""
+        return sum(event[5] for event in self.events)
+
+    def is_method(self, name) -> bool:
+        """Returns True if name was recorded as a COM method"""
+        return name in self._methods
+
+    def is_recorded(self, name) -> bool:
+        """Returns True if name was recorded as a COM method or property (of any object)"""
+        return name in self._names
+
+    def decode(self, value):
+        """Returns a recorded result, with its COM objects as ReplayObjects"""
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if isinstance(value, dict):
+            if "$obj" in value:
+                return ReplayObject(self, value["$obj"])
+            if "$tuple" in value:
+                return tuple(self.decode(item) for item in value["$tuple"])
+            if "$repr" in value:
+                return value["$repr"]
+        return value
+
+    def serve(self, object_id, kind, name, args):
+        """Returns (or raises) the recorded outcome of a call, after its recorded time"""
+        key = self._key(object_id, kind, name, args)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                reason = "is not in the trace" if queue is None else "was made too many times"
+                raise ReplayError(
+                    f"{kind} {name}({', '.join(map(json.dumps, args))}) on object {object_id} "
+                    f"{reason}"
+                )
+            if self.strict and queue[0] != self._cursor:
+                expected = self.events[self._cursor]
+                raise ReplayError(
+                    f"{kind} {name} on object {object_id} was called out of order (the trace "
+                    f"expects {expected[1]} {expected[2]} on object {expected[0]})"
+                )
+            index = queue.popleft()
+            self._served[index] = True
+            while self._cursor < len(self._served) and self._served[self._cursor]:
+                self._cursor += 1
+            self.calls += 1
+        *_call, result, seconds, error = self.events[index]
+        if self.time_scale:
+            _delay(seconds * self.time_scale)
+        if error is not None:
+            _raise_error(error)
+        return self.decode(result)
+
+
+class ReplayObject:
+    """Stands in for a recorded COM object, serving its calls from the trace"""
+
+    __slots__ = ("_backend", "_object_id")
+
+    def __init__(self, backend, object_id):
+        object.__setattr__(self, "_backend", backend)
+        object.__setattr__(self, "_object_id", object_id)
+
+    def __getattr__(self, name):
+        backend = object.__getattribute__(self, "_backend")
+        if name.startswith("_") or not backend.is_recorded(name):
+            raise AttributeError(name)  # e.g. a hasattr probe for a name Mathcad does not have
+        object_id = object.__getattribute__(self, "_object_id")
+        if backend.is_method(name):
+            return _replay_method(backend, object_id, name)
+        return backend.serve(object_id, GET, name, [])
+
+    def __setattr__(self, name, value):
+        backend = object.__getattribute__(self, "_backend")
+        object_id = object.__getattribute__(self, "_object_id")
+        backend.serve(object_id, SET, name, [_encode(value)])
+
+    def __repr__(self):
+        return f"ReplayObject({object.__getattribute__(self, '_object_id')})"
+
+
+def _replay_method(backend, object_id, name):
+    """Returns a recorded COM method, which serves its calls from the trace"""
+
+    def replayed_call(*args):
+        return backend.serve(object_id, CALL, name, [_encode(arg) for arg in args])
+
+    return replayed_call
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+results.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Result records shared by the live (COM) and offline worksheet readers, and result sinks that
+output fetches can be streamed into, so long runs do not hold every result in memory:
+
+>>> from MathcadPy.results import open_sink
+>>> with open_sink("beam_results.sqlite", batch_size=200) as sink:
+...     for case_number, length in enumerate(lengths):
+...         worksheet.set_inputs({"length": length})
+...         worksheet.get_outputs(sink=sink, case=case_number)  # also returns the results
+
+A sink buffers at most batch_size cases before writing them, so memory use does not grow with
+the number of cases. Each batch is written atomically (a committed transaction, or a complete
+file renamed into place), so the batches written before a job dies can still be read. Matrix
+outputs are stored as typed float64 arrays rather than text.
+"""
+
+import abc
+import itertools
+import os
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+
+# The value, units and error code of a designated output, as returned by Worksheet.get_outputs
+OutputResult = namedtuple("OutputResult", ["value", "units", "error_code"])
+
+
+def _is_matrix(value) -> bool:
+    """Returns True for a matrix value (a list of lists or a 2D array)"""
+    if hasattr(value, "ndim"):
+        return value.ndim == 2
+    return isinstance(value, (list, tuple))
+
+
+def _matrix_bytes(value):
+    """Returns (rows, cols, bytes) of a matrix value as native float64"""
+    if hasattr(value, "tobytes"):  # numpy arrays
+        return value.shape[0], value.shape[1], value.astype("=f8").tobytes()
+    rows = len(value)
+    cols = len(value[0]) if rows else 0
+    return rows, cols, array("d", itertools.chain.from_iterable(value)).tobytes()
+
+
+def _matrix_from_bytes(rows, cols, data, as_numpy=False):
+    """Converts float64 bytes back to a matrix (a list of lists, or a numpy array)"""
+    if as_numpy:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return np.frombuffer(data, dtype="=f8").reshape((rows, cols))
+    values = array("d")
+    values.frombytes(data)
+    return [values[row * cols:(row + 1) * cols].tolist() for row in range(rows)]
+
+
+def _split_input(value):
+    """Splits an input value given as value or (value, units)"""
+    if isinstance(value, tuple) and len(value) == 2 and isinstance(value[1], str):
+        return value
+    return value, ""
+
+
+class ResultSink(abc.ABC):
+    """
+    Base class of the result sinks. Cases are buffered and passed to _write_batch in batches of
+    batch_size cases
+    """
+
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+        self.cases_written = 0
+        self._batch = []  # [(case, {input alias: (value, units)}, {output alias: OutputResult})]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, results: dict, case=None, inputs=None):
+        """
+        Adds a case's {output alias: OutputResult} (and optionally its {input alias: value or
+        (value, units)}) to the sink. Cases are numbered in order if case is None
+        """
+        if case is None:
+            case = self.cases_written + len(self._batch)
+        inputs = {alias: _split_input(value) for alias, value in (inputs or {}).items()}
+        results = {alias: OutputResult(*result) for alias, result in results.items()}
+        self._batch.append((case, inputs, results))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered cases. The buffer is emptied even if writing fails, so a batch that
+        cannot be written is not retried (and raised again) by every later write and close
+        """
+        if self._batch:
+            try:
+                self._write_batch(self._batch)
+                self.cases_written += len(self._batch)
+            finally:
+                self._batch = []
+
+    def close(self):
+        """Writes the buffered cases and closes the sink"""
+        self.flush()
+
+    @abc.abstractmethod
+    def completed_cases(self) -> set:
+        """Returns the set of case numbers already written"""
+
+    @abc.abstractmethod
+    def _write_batch(self, batch):
+        """Writes a batch of (case, inputs, results) records"""
+
+
+class SqliteSink(ResultSink):
+    """
+    Writes results to a SQLite database, one row per input/output value and one transaction per
+    batch. Matrix values are stored as float64 blobs with their shape
+    """
+
+    def __init__(self, path, batch_size=100, table="results"):
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        super().__init__(batch_size)
+        self.path = Path(path)
+        self.table = table
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.table}" ("case" INTEGER, io TEXT, alias TEXT, '
+            "value, units TEXT, error_code INTEGER, rows INTEGER, cols INTEGER, data BLOB)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _record(case, io_type, alias, value, units, error_code):
+        if value is not None and _is_matrix(value):
+            return (case, io_type, alias, None, units, error_code, *_matrix_bytes(value))
+        if hasattr(value, "item"):  # numpy scalars
+            value = value.item()
+        return (case, io_type, alias, value, units, error_code, None, None, None)
+
+    def _write_batch(self, batch):
+        records = []
+        for case, inputs, results in batch:
+            for alias, (value, units) in inputs.items():
+                records.append(self._record(case, "input", alias, value, units, 0))
+            for alias, result in results.items():
+                records.append(self._record(case, "output", alias, *result))
+        with self._connection:  # one transaction per batch
+            self._connection.executemany(
+                f'INSERT INTO "{self.table}" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', records
+            )
+
+    def completed_cases(self) -> set:
+        return {case for (case,) in self._connection.execute(
+            f'SELECT DISTINCT "case" FROM "{self.table}"'
+        )}
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self.flush()
+            finally:
+                self._connection.close()
+        self._connection = None
+
+    @staticmethod
+    def read(path, table="results", as_numpy=False):
+        """Yields (case, {output alias: OutputResult}) for every case written to a database"""
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        connection = sqlite3.connect(str(path))
+        try:
+            rows = connection.execute(
+                f'SELECT "case", alias, value, units, error_code, rows, cols, data FROM "{table}" '
+                "WHERE io = 'output' ORDER BY \"case\", rowid"
+            )
+            for case, case_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                results = {}
+                for _case, alias, value, units, error_code, rows_, cols, data in case_rows:
+                    if data is not None:
+                        value = _matrix_from_bytes(rows_, cols, data, as_numpy)
+                    results[alias] = OutputResult(value, units, error_code)
+                yield case, results
+        finally:
+            connection.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    Writes results to a directory of Parquet files, one file per batch, with a column per input
+    and output value plus "<alias> units" and "<alias> error_code" columns for each output.
+    Matrix values are stored as nested lists of float64. Requires pyarrow
+    """
+
+    def __init__(self, path, batch_size=100):
+        super().__init__(batch_size)
+        self.path = Path(path)
+        self._parts_written = len(self._parts())
+
+    def _parts(self):
+        return sorted(self.path.glob("part-*.parquet")) if self.path.is_dir() else []
+
+    @staticmethod
+    def _cell(value):
+        if hasattr(value, "tolist"):  # numpy arrays and scalars
+            value = value.tolist()
+        if value is not None and _is_matrix(value):
+            return [[float(element) for element in row] for row in value]
+        return value
+
+    def _write_batch(self, batch):
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        rows = []
+        for case, inputs, results in batch:
+            row = {"case": case}
+            row.update({alias: self._cell(value) for alias, (value, _units) in inputs.items()})
+            for alias, (value, units, error_code) in results.items():
+                row[alias] = self._cell(value)
+                row[f"{alias} units"] = units
+                row[f"{alias} error_code"] = error_code
+            rows.append(row)
+        # from_pylist takes its columns from the first row, so give every row the same columns
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+        self.path.mkdir(parents=True, exist_ok=True)
+        part = self.path / f"part-{self._parts_written:05d}.parquet"
+        temp_path = part.with_suffix(".parquet.tmp")
+        pq.write_table(pa.Table.from_pylist(rows), temp_path)
+        temp_path.replace(part)  # only complete files are read
+        self._parts_written += 1
+
+    def completed_cases(self) -> set:
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        completed = set()
+        for part in self._parts():
+            completed.update(pq.read_table(part, columns=["case"]).column("case").to_pylist())
+        return completed
+
+
+class NpySink(ResultSink):
+    """
+    Writes results to a directory of numpy .npz chunks, one per batch. In each chunk "case" holds
+    the case numbers and, for every output, "<alias>" holds the values (a float64 array for real
+    outputs, stacked into a (cases, rows, cols) float64 array for equally sized matrices),
+    "<alias>:units" the units and "<alias>:error_code" the error codes. Input values are stored as
+    "input:<alias>". Values that cannot be stacked into one typed array (e.g. strings mixed with
+    missing values, or matrices of different sizes) are stored per case, as "<alias>[<case>]" or
+    "input:<alias>[<case>]". Requires numpy
+    """
+
+    def __init__(self, path, batch_size=100):
+        super().__init__(batch_size)
+        self.path = Path(path)
+        self._chunks_written = len(self._chunks())
+
+    def _chunks(self):
+        return sorted(self.path.glob("chunk-*.npz")) if self.path.is_dir() else []
+
+    @staticmethod
+    def _stack(values):
+        """Converts one output's values across a batch to a typed array"""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        if all(isinstance(value, str) for value in values):
+            return np.array(values, dtype=str)
+        if any(isinstance(value, str) for value in values):
+            return None  # strings mixed with missing or numeric values - stored per case
+        try:
+            if all(value is None or not _is_matrix(value) for value in values):
+                return np.array(
+                    [np.nan if value is None else value for value in values], dtype="f8"
+                )
+            shapes = {np.shape(value) for value in values}
+            if len(shapes) == 1:
+                return np.array(values, dtype="f8")
+        except (TypeError, ValueError):
+            pass  # e.g. complex values
+        return None  # mixed types or shapes - stored per case
+
+    def _add_values(self, arrays, name, batch, values):
+        """Adds one value's array (or its per case arrays) across a batch to arrays"""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        stacked = self._stack(values)
+        if stacked is not None:
+            arrays[name] = stacked
+            return
+        for (case, _inputs, _results), value in zip(batch, values):
+            if value is not None:
+                arrays[f"{name}[{case}]"] = np.asarray(value)
+
+    def _write_batch(self, batch):
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        arrays = {"case": np.array([case for case, _inputs, _results in batch], dtype="i8")}
+        for alias in dict.fromkeys(alias for _case, inputs, _results in batch for alias in inputs):
+            values = [inputs.get(alias, (None, ""))[0] for _case, inputs, _results in batch]
+            self._add_values(arrays, f"input:{alias}", batch, values)
+        aliases = dict.fromkeys(alias for _case, _inputs, results in batch for alias in results)
+        for alias in aliases:
+            results = [case_results.get(alias) for _case, _inputs, case_results in batch]
+            values = [None if result is None else result.value for result in results]
+            self._add_values(arrays, alias, batch, values)
+            arrays[f"{alias}:units"] = np.array(
+                ["" if result is None else result.units or "" for result in results], dtype=str
+            )
+            arrays[f"{alias}:error_code"] = np.array(
+                [1 if result is None else result.error_code or 0 for result in results], dtype="i8"
+            )
+        self.path.mkdir(parents=True, exist_ok=True)
+        chunk = self.path / f"chunk-{self._chunks_written:05d}.npz"
+        temp_path = self.path / f"chunk-{self._chunks_written:05d}.tmp"
+        with open(temp_path, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temp_path, chunk)  # only complete files are read
+        self._chunks_written += 1
+
+    def completed_cases(self) -> set:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        completed = set()
+        for chunk in self._chunks():
+            with np.load(chunk) as arrays:
+                completed.update(arrays["case"].tolist())
+        return completed
+
+
+def open_sink(path, batch_size=100) -> ResultSink:
+    """Returns a result sink for a path, chosen by its file extension"""
+    suffix = Path(path).suffix.lower()
+    if suffix in [".sqlite", ".sqlite3", ".db"]:
+        return SqliteSink(path, batch_size)
+    if suffix == ".parquet":
+        return ParquetSink(path, batch_size)
+    if suffix == ".npy":
+        return NpySink(path, batch_size)
+    raise ValueError(
+        "Result sink must have one of the following file extensions: "
+        "'.sqlite', '.sqlite3', '.db', '.parquet', '.npy'"
+    )
@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+"""
+sweep.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Runs a single worksheet over many sets of input values (a parameter sweep), writing the results
+to a CSV, SQLite or Parquet store as each case completes:
+
+>>> from MathcadPy.sweep import Sweep, grid
+>>> sweep = Sweep(
+...     "beam.mcdx",
+...     grid(length=[1, 2, 3], width=[0.1, 0.2]),
+...     store="beam_results.csv",
+...     outputs=["deflection", "stress"],
+... )
+>>> report = sweep.run()
+>>> print(f"{report.cases_run} cases at {report.cases_per_minute:.1f} cases/min")
+
+Every case is numbered by its position in the design space. If a sweep is re-run against an
+existing store, the cases already recorded in the store are skipped, so a sweep that stopped
+part way through (e.g. because Mathcad crashed) resumes where it left off. For this to work the
+design space must produce the same cases in the same order each time it is iterated.
+"""
+
+import csv
+import itertools
+import json
+import sqlite3
+from pathlib import Path
+from time import perf_counter
+
+from . import _com
+from ._application import Mathcad, MathcadAliasError, MathcadComError, MathcadTimeoutError
+
+
+def grid(**axes):
+    """Yields every combination of the supplied input values as {alias: value} dictionaries"""
+    aliases = list(axes)
+    for values in itertools.product(*axes.values()):
+        yield dict(zip(aliases, values))
+
+
+def _cases(design_space):
+    """
+    Returns an iterable of {alias: value} dictionaries from a design space. A dictionary of
+    {alias: list of values} is expanded into a full factorial grid, anything else (a list of
+    dictionaries, a generator etc.) is used as-is
+    """
+    if isinstance(design_space, dict):
+        return grid(**design_space)
+    return design_space
+
+
+class Sweep:
+    """
+    Runs a worksheet over a design space, recording the inputs, outputs, any error and the
+    elapsed time of each case in a result store.
+
+    Each case is a {alias: value | (value, units)} dictionary, which is sent with
+    Worksheet.set_inputs. outputs is the list of output aliases to record (defaults to every
+    designated output) and units is an optional {output alias: units} dictionary.
+    store is either a file path (.csv, .sqlite/.db or .parquet) or a store object.
+    cache is an optional ResultCache; if given, repeated cases are served from it rather than
+    being recalculated (see Worksheet.evaluate).
+    visible and backend are passed to the Mathcad application class.
+    progress is an optional callable, called with the SweepReport after every case.
+    profiler is an optional MathcadPy.instrument.ComProfiler; if given, the COM calls made by
+    each case are recorded and logged.
+    registry is an optional MathcadPy.registry.MathcadRegistry. If given, the sweep uses the
+    registry's warm Mathcad instance (which is left running when the sweep finishes) and reports
+    each case to it, so that the instance is recycled when it is due.
+    sink is an optional MathcadPy.results.ResultSink. If given, every case's inputs and outputs
+    are also streamed to it, with matrix outputs stored as typed arrays (a failed case is written
+    with its inputs only). A resumed sweep runs the cases that are in the store but not the sink
+    (e.g. a batch the sink had not yet written when the job died) again for the sink.
+    watchdog is an optional MathcadPy.watchdog.Watchdog. If a case hangs, Mathcad is stopped and
+    restarted, and the case is retried up to retries times before it is recorded as failed.
+    """
+
+    def __init__(self, worksheet_path, design_space, store, outputs=None, units=None,
+                 preserve_worksheet_units=True, visible=False, backend=None, progress=None,
+                 cache=None, profiler=None, registry=None, sink=None, watchdog=None, retries=1):
+        self.worksheet_path = Path(worksheet_path)
+        self.design_space = design_space
+        self.store = open_store(store) if isinstance(store, (str, Path)) else store
+        self.outputs = outputs
+        self.units = units
+        self.preserve_worksheet_units = preserve_worksheet_units
+        self.visible = visible
+        self.backend = backend
+        self.progress = progress
+        self.cache = cache
+        self.profiler = profiler
+        self.registry = registry
+        self.sink = sink
+        self.watchdog = watchdog
+        self.retries = retries
+        self._app = None
+        self._worksheet = None
+        self._sink_completed = set()  # cases already in the sink when the run started
+
+    def _start(self):
+        """Starts Mathcad and opens the worksheet"""
+        if self.registry is not None:
+            self._app = self.registry.get(
+                self.visible, self.backend, profiler=self.profiler, watchdog=self.watchdog
+            )
+        else:
+            self._app = Mathcad(
+                visible=self.visible, backend=self.backend, profiler=self.profiler,
+                watchdog=self.watchdog,
+            )
+        self._worksheet = self._app.open(self.worksheet_path)
+        if self.cache is not None:
+            self._worksheet.enable_result_cache(self.cache)
+
+    def close(self, quit_app=False):
+        """
+        Closes the worksheet (discarding changes). The Mathcad application is left running unless
+        quit_app is True (and it is not owned by a registry)
+        """
+        try:
+            if self._worksheet is not None:
+                self._worksheet.close("Discard")
+            if quit_app and self._app is not None and self.registry is None:
+                self._app.quit("Discard")
+        except (_com.com_error, MathcadComError):
+            pass  # Mathcad has already gone
+        self._app = self._worksheet = None
+
+    def _abandon(self):
+        """
+        Drops a Mathcad instance that raised a COM error, so that the next case starts a new one.
+        An instance the sweep started is quit rather than left running (holding a licence), or
+        killed if it does not respond and the watchdog knows its process
+        """
+        app, self._app, self._worksheet = self._app, None, None
+        if app is None or self.registry is not None:  # the registry replaces instances that died
+            return
+        try:
+            app.quit("Discard")
+        except (_com.com_error, MathcadComError):
+            if self.watchdog is not None and self.watchdog.pid is not None:
+                self.watchdog.kill(self.watchdog.pid)
+
+    def run_case(self, case_inputs: dict, case=None) -> dict:
+        """Runs a single case and returns its result row (without the case number or timing)"""
+        if self._worksheet is None:
+            self._start()
+        row = {}
+        for input_alias, value in case_inputs.items():
+            row[input_alias] = value[0] if isinstance(value, tuple) else value
+        if self.cache is not None:
+            results = self._worksheet.evaluate(
+                case_inputs, self.outputs, self.units, self.preserve_worksheet_units
+            )
+            input_errors = self._worksheet.last_input_errors
+        else:
+            input_errors = self._worksheet.set_inputs(
+                case_inputs, preserve_worksheet_units=self.preserve_worksheet_units,
+                synchronize=True,
+            )
+            results = self._worksheet.get_outputs(self.outputs, units=self.units)
+        self._sink_write(results, case, case_inputs)
+        errors = [alias for alias, error in input_errors.items() if error > 0]
+        for output_alias, result in results.items():
+            row[output_alias] = result.value
+            row[f"{output_alias} units"] = result.units
+            if result.error_code:
+                errors.append(output_alias)
+        row["error"] = f"error code(s) for: {', '.join(errors)}" if errors else ""
+        return row
+
+    def _sink_write(self, results, case, case_inputs):
+        """Writes a case to the sink, if there is one and the case is not already in it"""
+        if self.sink is not None and case not in self._sink_completed:
+            self.sink.write(results, case, case_inputs)
+
+    def _failure(self, exc, case_inputs, case) -> dict:
+        """Returns the result row of a case that raised exc, and records its inputs in the sink"""
+        self._sink_write({}, case, case_inputs)
+        return {"error": f"{type(exc).__name__}: {exc}"}
+
+    def evaluate(self, case_inputs: dict, case=None) -> dict:
+        """
+        Runs a single case, returning its result row including the elapsed "seconds". Any
+        exception is recorded in the "error" column of the row rather than raised
+        """
+        case_start = perf_counter()
+        try:
+            for attempt in itertools.count():
+                try:
+                    row = self.run_case(case_inputs, case)
+                    break
+                except MathcadTimeoutError:
+                    if attempt >= self.retries:
+                        raise
+                    # else Mathcad has been restarted and the worksheet reopened - try again
+        except (MathcadTimeoutError, MathcadAliasError) as exc:  # Mathcad is still running
+            row = self._failure(exc, case_inputs, case)
+        except (_com.com_error, MathcadComError) as exc:
+            # Mathcad has most likely crashed - record the failure and restart it for the next case
+            row = self._failure(exc, case_inputs, case)
+            self._abandon()
+        except Exception as exc:  # pylint: disable=broad-except
+            row = self._failure(exc, case_inputs, case)
+        if self.registry is not None and self._app is not None:
+            if self.registry.case_done(self._app):
+                self.close()  # the registry recycles the instance when the next case starts it
+        row["seconds"] = perf_counter() - case_start
+        return row
+
+    def run(self):
+        """Runs every case not already present in the store. Returns a SweepReport"""
+        report = SweepReport()
+        completed = self.store.completed_cases()
+        if self.sink is not None:
+            self._sink_completed = self.sink.completed_cases()
+        start = perf_counter()
+        try:
+            for case_number, case_inputs in enumerate(_cases(self.design_space)):
+                stored = case_number in completed
+                if stored and (self.sink is None or case_number in self._sink_completed):
+                    report.cases_skipped += 1
+                    continue
+                if self.profiler is not None:
+                    with self.profiler.case(case_number):
+                        row = self.evaluate(case_inputs, case_number)
+                else:
+                    row = self.evaluate(case_inputs, case_number)
+                seconds = row["seconds"]
+                if not stored:  # else the case was only run again for the sink
+                    self.store.append({"case": case_number, **row})
+                report._add_case(seconds, failed=bool(row["error"]))
+                report.elapsed = perf_counter() - start
+                if self.progress is not None:
+                    self.progress(report)
+        finally:
+            self.store.close()
+            if self.sink is not None:
+                self.sink.close()
+            self.close()
+        report.elapsed = perf_counter() - start
+        return report
+
+
+class SweepReport:
+    """Timing and throughput statistics for a sweep"""
+
+    def __init__(self):
+        self.cases_run = 0
+        self.cases_failed = 0
+        self.cases_skipped = 0  # cases already in the store when the sweep started
+        self.elapsed = 0.0  # wall time of the whole sweep in seconds
+        self.case_seconds_total = 0.0
+        self.case_seconds_max = 0.0
+
+    def _add_case(self, seconds, failed=False):
+        self.cases_run += 1
+        self.cases_failed += int(failed)
+        self.case_seconds_total += seconds
+        self.case_seconds_max = max(self.case_seconds_max, seconds)
+
+    @property
+    def case_seconds_mean(self):
+        """Mean time per case in seconds"""
+        return self.case_seconds_total / self.cases_run if self.cases_run else 0.0
+
+    @property
+    def cases_per_minute(self):
+        """Throughput of the sweep in cases per minute"""
+        return 60.0 * self.cases_run / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (
+            f"SweepReport(cases_run={self.cases_run}, cases_failed={self.cases_failed}, "
+            f"cases_skipped={self.cases_skipped}, elapsed={self.elapsed:.3f}, "
+            f"cases_per_minute={self.cases_per_minute:.1f})"
+        )
+
+
+# ~~~~~~~~~~~~~~~~~~~~~ Result stores ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def open_store(path):
+    """Returns the result store for a file path, chosen by its file extension"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return CsvStore(path)
+    if suffix in [".sqlite", ".sqlite3", ".db"]:
+        return SqliteStore(path)
+    if suffix == ".parquet":
+        return ParquetStore(path)
+    raise ValueError(
+        "Result store must have one of the following file extensions: "
+        "'.csv', '.sqlite', '.sqlite3', '.db', '.parquet'"
+    )
+
+
+def _cell(value):
+    """Converts a result value to something a flat table can store (matrices are stored as JSON)"""
+    if hasattr(value, "tolist"):  # numpy arrays and scalars
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return json.dumps(value)
+    return value
+
+
+class CsvStore:
+    """
+    Appends result rows to a CSV file, flushing after every row. If a row has columns that are
+    not yet in the file (e.g. the first case failed, so its row has no outputs) the file is
+    rewritten with the extra columns
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self._writer = None
+        self._fieldnames = None
+
+    def completed_cases(self) -> set:
+        """Returns the set of case numbers already in the file"""
+        if not self.path.exists():
+            return set()
+        with open(self.path, "rb+") as file:
+            data = file.read()
+            if data and not data.endswith(b"\n"):  # drop a row that was only partly written
+                file.truncate(data.rfind(b"\n") + 1)
+        with open(self.path, newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            self._fieldnames = reader.fieldnames
+            return {int(row["case"]) for row in reader if row.get("case")}
+
+    def append(self, row: dict):
+        """Writes a single result row"""
+        if self._writer is None:
+            new_file = not self.path.exists() or self.path.stat().st_size == 0
+            if new_file:
+                self._fieldnames = list(row)
+            elif self._fieldnames is None:
+                self.completed_cases()  # reads the existing header
+            self._open(write_header=new_file)
+        new_columns = [column for column in row if column not in self._fieldnames]
+        if new_columns:
+            self._add_columns(new_columns)
+        self._writer.writerow({key: _cell(value) for key, value in row.items()})
+        self._file.flush()
+
+    def _open(self, write_header=False):
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self._fieldnames, restval="")
+        if write_header:
+            self._writer.writeheader()
+
+    def _add_columns(self, columns):
+        """Rewrites the file with extra columns (replacing it only once the copy is complete)"""
+        self.close()
+        with open(self.path, newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        self._fieldnames = [*self._fieldnames, *columns]
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=self._fieldnames, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+        temp_path.replace(self.path)
+        self._open()
+
+    def close(self):
+        """Closes the file"""
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._writer = None
+
+
+class SqliteStore:
+    """
+    Appends result rows to a table in a SQLite database, committing after every row. Columns are
+    added to the table as new ones appear
+    """
+
+    def __init__(self, path, table="results"):
+        self.path = Path(path)
+        self.table = table
+        self._connection = None
+        self._columns = None
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(str(self.path))
+            columns = self._connection.execute(f'PRAGMA table_info("{self.table}")').fetchall()
+            self._columns = [column[1] for column in columns] or None
+        return self._connection
+
+    def completed_cases(self) -> set:
+        """Returns the set of case numbers already in the table"""
+        connection = self._connect()
+        if self._columns is None:
+            return set()
+        return {case for (case,) in connection.execute(f'SELECT "case" FROM "{self.table}"')}
+
+    def append(self, row: dict):
+        """Writes a single result row"""
+        connection = self._connect()
+        if self._columns is None:
+            self._columns = list(row)
+            column_sql = ", ".join(f'"{column}"' for column in self._columns)
+            connection.execute(f'CREATE TABLE "{self.table}" ({column_sql})')
+        for column in row:
+            if column not in self._columns:
+                connection.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{column}"')
+                self._columns.append(column)
+        columns = [column for column in self._columns if column in row]
+        column_sql = ", ".join(f'"{column}"' for column in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        connection.execute(
+            f'INSERT INTO "{self.table}" ({column_sql}) VALUES ({placeholders})',
+            [_cell(row[column]) for column in columns],
+        )
+        connection.commit()
+
+    def close(self):
+        """Closes the database connection"""
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+
+
+class ParquetStore:
+    """
+    Writes result rows to a directory of Parquet files, one file per batch of rows. Rows that had
+    not been written when a sweep stopped are simply re-run when it resumes. Requires pyarrow
+    """
+
+    def __init__(self, path, batch_size=100):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._rows = []
+
+    def _parts(self):
+        return sorted(self.path.glob("part-*.parquet")) if self.path.is_dir() else []
+
+    def completed_cases(self) -> set:
+        """Returns the set of case numbers already written"""
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        completed = set()
+        for part in self._parts():
+            completed.update(pq.read_table(part, columns=["case"]).column("case").to_pylist())
+        return completed
+
+    def append(self, row: dict):
+        """Buffers a single result row, writing a new Parquet file for each full batch"""
+        self._rows.append({key: _cell(value) for key, value in row.items()})
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes any buffered rows to a new Parquet file"""
+        if not self._rows:
+            return
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        parts = self._parts()
+        number = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        temp_path = self.path / f"part-{number:05d}.parquet.tmp"
+        columns = list(dict.fromkeys(column for row in self._rows for column in row))
+        rows = [{column: row.get(column) for column in columns} for row in self._rows]
+        pq.write_table(pa.Table.from_pylist(rows), temp_path)
+        temp_path.replace(self.path / f"part-{number:05d}.parquet")  # only complete files are read
+        self._rows = []
+
+    def close(self):
+        """Writes any buffered rows"""
+        self.flush()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+units.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A cache of unit conversion factors. The first time an output is requested in other units, the
+conversion is made by Mathcad and the factor between the two units is recorded; later requests
+for the same pair of units (for any output of the worksheet) are converted locally:
+
+>>> worksheet.get_real_output("torque", units="N*m")  # converted by Mathcad
+>>> worksheet.get_real_output("torque", units="ft*kip")  # converted by Mathcad
+>>> worksheet.get_real_output("torque", units="ft*kip")  # converted locally
+>>> worksheet.unit_converter.factors
+{('kN*m', 'N*m'): 1000.0, ('N*m', 'kN*m'): 0.001, ('kN*m', 'ft*kip'): 0.7375621492772653, ...}
+
+Only proportional conversions are cached. Conversions between temperature scales with an offset
+(e.g. degrees Celsius and Fahrenheit) are always made by Mathcad.
+"""
+
+import math
+
+_OFFSET_UNITS = ["°C", "°F", "degC", "degF"]
+
+
+def _proportional(units: str) -> bool:
+    """Returns False for units with an offset zero, which cannot be converted by a factor alone"""
+    return not any(marker in units for marker in _OFFSET_UNITS) or "Δ" in units
+
+
+def scale(value, factor):
+    """Multiplies a real or matrix (list of lists or numpy array) value by a factor"""
+    if hasattr(value, "ndim"):  # numpy arrays are rescaled in one vectorised operation
+        return value * factor
+    if isinstance(value, (list, tuple)):
+        return [[element * factor for element in row] for row in value]
+    return value * factor
+
+
+class UnitConverter:
+    """Conversion factors between pairs of units, learnt from conversions made by Mathcad"""
+
+    def __init__(self):
+        self.factors = {}  # {(from units, to units): factor}
+        self.hits = 0  # conversions made locally
+        self.misses = 0  # conversions that had to be made by Mathcad
+
+    def factor(self, from_units: str, to_units: str):
+        """Returns the factor that converts from_units to to_units, or None if it is not known"""
+        if from_units == to_units:
+            return 1.0
+        factor = self.factors.get((from_units, to_units))
+        if factor is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return factor
+
+    def learn(self, from_units: str, to_units: str, value, converted_value) -> bool:
+        """
+        Records the factor between two units from a value and the same value converted by
+        Mathcad. Returns True if the factor could be recorded
+        """
+        if not (_proportional(from_units) and _proportional(to_units)):
+            return False
+        try:
+            if value == 0 or not (math.isfinite(value) and math.isfinite(converted_value)):
+                return False
+            factor = converted_value / value
+        except TypeError:  # not real numbers
+            return False
+        if factor == 0 or not math.isfinite(factor):
+            return False
+        self.factors[(from_units, to_units)] = factor
+        self.factors[(to_units, from_units)] = 1 / factor
+        return True
+
+    def convert(self, value, from_units: str, to_units: str):
+        """
+        Converts a real or matrix value locally. Raises KeyError if the factor between the units
+        has not been learnt
+        """
+        factor = self.factor(from_units, to_units)
+        if factor is None:
+            raise KeyError(f"The conversion from {from_units} to {to_units} is not known")
+        return scale(value, factor)
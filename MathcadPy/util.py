@@ -4,19 +4,311 @@ util.py
 ~~~~~~~~~~~~~~
 MathcadPy
 Copyright 2025 Matt Woodhead
+
+Discovery of the installed versions of Mathcad Prime, from the uninstall, App Paths and COM
+registration keys of the Windows registry:
+
+>>> from MathcadPy.util import list_installations
+>>> list_installations()
+[Installation(name='PTC Mathcad Prime 9.0.0.0', version='9.0.0.0',
+              path='C:\\Program Files\\PTC\\Mathcad Prime 9.0.0.0', prog_id=None),
+ Installation(name='PTC Mathcad Prime 10.0.0.0', version='10.0.0.0',
+              path='C:\\Program Files\\PTC\\Mathcad Prime 10.0.0.0',
+              prog_id='MathcadPrime.Application')]
+>>> mathcad_app = Mathcad(version="10")  # starts that installation
+
+prog_id is the COM ProgID that starts the installation, or None if it cannot be started through
+COM (only the most recently registered version answers to "MathcadPrime.Application").
+The results are cached on disk, and the cache is discarded when the last-modified time of any of
+the registry keys discovery read changes (an installation was added, removed or re-registered,
+including its versioned ProgID and COM local server), or after max_age seconds. The registry is
+read through a RegistryReader, so discovery can be exercised on other platforms with
+MathcadPy.fake.FakeRegistry.
 """
 
-import subprocess
+import abc
+import json
+import logging
+import ntpath
+import os
+import re
+import sys
+from collections import namedtuple
+from pathlib import Path
+from time import time
+
+from ._com import PROG_ID
+
+logger = logging.getLogger(__name__)
+
+Installation = namedtuple("Installation", ["name", "version", "path", "prog_id"])
+
+UNINSTALL_KEYS = [
+    r"HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"HKLM\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"HKCU\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+]
+APP_PATHS_KEY = r"HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths\MathcadPrime.exe"
+CLSID_KEY = rf"HKCR\{PROG_ID}\CLSID"
+_DISCOVERY_KEYS = [*UNINSTALL_KEYS, APP_PATHS_KEY, CLSID_KEY]  # read for every discovery
+_CACHE_FORMAT = 2
+
+
+class RegistryReader(abc.ABC):
+    """
+    Read access to the Windows registry. Keys are given as full paths with an abbreviated hive,
+    e.g. r"HKLM\\SOFTWARE\\Microsoft". Missing keys are not an error
+    """
+
+    @abc.abstractmethod
+    def subkeys(self, key) -> list:
+        """Returns the names of the subkeys of a key (empty if the key does not exist)"""
+
+    @abc.abstractmethod
+    def values(self, key) -> dict:
+        """
+        Returns {value name: data} of a key (empty if the key does not exist). The default
+        value is named ""
+        """
+
+    @abc.abstractmethod
+    def modified(self, key):
+        """
+        Returns the last-modified time of a key, which changes when its values or subkeys are
+        added or removed, or None if the key does not exist
+        """
+
+
+class WindowsRegistryReader(RegistryReader):
+    """Reads the registry with winreg (the 64-bit view, even from 32-bit Python)"""
+
+    _HIVES = {
+        "HKLM": "HKEY_LOCAL_MACHINE", "HKCU": "HKEY_CURRENT_USER", "HKCR": "HKEY_CLASSES_ROOT"
+    }
+
+    def _open(self, key):
+        """Opens a key for reading, raising OSError if it does not exist"""
+        import winreg  # pylint: disable=import-outside-toplevel
+
+        hive, _, subkey = key.partition("\\")
+        return winreg.OpenKey(
+            getattr(winreg, self._HIVES[hive]), subkey, 0,
+            winreg.KEY_READ | winreg.KEY_WOW64_64KEY,
+        )
+
+    def subkeys(self, key) -> list:
+        import winreg  # pylint: disable=import-outside-toplevel
+
+        try:
+            handle = self._open(key)
+        except OSError:
+            return []
+        with handle:
+            return [winreg.EnumKey(handle, i) for i in range(winreg.QueryInfoKey(handle)[0])]
+
+    def values(self, key) -> dict:
+        import winreg  # pylint: disable=import-outside-toplevel
+
+        try:
+            handle = self._open(key)
+        except OSError:
+            return {}
+        with handle:
+            values = {}
+            for i in range(winreg.QueryInfoKey(handle)[1]):
+                name, data, _value_type = winreg.EnumValue(handle, i)
+                values[name] = data
+            return values
+
+    def modified(self, key):
+        import winreg  # pylint: disable=import-outside-toplevel
+
+        try:
+            handle = self._open(key)
+        except OSError:
+            return None
+        with handle:
+            return winreg.QueryInfoKey(handle)[2]
+
+
+def default_cache_path() -> Path:
+    """Returns the location of the installation cache used with the Windows registry"""
+    base = os.environ.get("LOCALAPPDATA") or Path.home() / ".cache"
+    return Path(base) / "MathcadPy" / "installations.json"
+
+
+def version_tuple(version) -> tuple:
+    """Returns a version string as a tuple of integers for comparison, e.g. (10, 0, 0, 0)"""
+    return tuple(int(part) for part in re.findall(r"\d+", str(version)))
+
+
+def _exe_directory(command: str) -> str:
+    """
+    Returns the directory of the program in a registry command line or icon entry (registry
+    paths are Windows paths, whichever platform they are read on)
+    """
+    command = command.strip()
+    if command.startswith('"'):
+        exe = command[1:].split('"', 1)[0]
+    else:
+        exe = re.split(r"(?<=\.exe)", command, maxsplit=1, flags=re.IGNORECASE)[0]
+        exe = exe.split(",", 1)[0]  # icon index, e.g. "...\MathcadPrime.exe,0"
+    return ntpath.dirname(exe.strip())
+
+
+def _same_directory(path_a: str, path_b: str) -> bool:
+    return ntpath.normcase(ntpath.normpath(path_a)) == ntpath.normcase(ntpath.normpath(path_b))
+
+
+def _stamp(reader: RegistryReader, keys) -> list:
+    """Returns the last-modified times of a list of keys"""
+    return [reader.modified(key) for key in keys]
+
+
+def _installation_keys(reader: RegistryReader, installations) -> list:
+    """
+    Returns the keys that the ProgIDs of the discovered installations were chosen from: the COM
+    local server of the version independent ProgID, and the versioned ProgID of each version
+    """
+    keys = []
+    clsid = reader.values(CLSID_KEY).get("")
+    if clsid:
+        keys.append(rf"HKCR\CLSID\{clsid}\LocalServer32")
+    for installation in installations:
+        major = version_tuple(installation.version)[:1]
+        if major:
+            keys.append(rf"HKCR\{PROG_ID}.{major[0]}")
+    return list(dict.fromkeys(keys))
+
+
+def _discover(reader: RegistryReader) -> list:
+    """Reads the installations from the registry, oldest version first"""
+    entries = {}  # {(version, path): [name, version, path]}, as the same entry can appear twice
+    for uninstall_key in UNINSTALL_KEYS:
+        for subkey in reader.subkeys(uninstall_key):
+            values = reader.values(rf"{uninstall_key}\{subkey}")
+            name = str(values.get("DisplayName", ""))
+            if "mathcad prime" not in name.lower() or values.get("SystemComponent") == 1:
+                continue
+            version = str(values.get("DisplayVersion", "")) or ".".join(
+                str(part) for part in version_tuple(name)
+            )
+            path = str(values.get("InstallLocation", "")).rstrip("\\/")
+            if not path and values.get("DisplayIcon"):
+                path = _exe_directory(str(values["DisplayIcon"]))
+            entries.setdefault((version, path.lower()), [name, version, path])
+    records = sorted(entries.values(), key=lambda record: version_tuple(record[1]))
+
+    # App Paths registers the program of the most recently installed version
+    app_path = reader.values(APP_PATHS_KEY).get("")
+    missing = [record for record in records if not record[2]]
+    if app_path and len(missing) == 1:
+        missing[0][2] = _exe_directory(str(app_path))
+
+    # The version independent ProgID starts the program registered as its local server
+    server_directory = None
+    clsid = reader.values(CLSID_KEY).get("")
+    if clsid:
+        server = reader.values(rf"HKCR\CLSID\{clsid}\LocalServer32").get("")
+        if server:
+            server_directory = _exe_directory(str(server))
+
+    installations = []
+    for name, version, path in records:
+        major = version_tuple(version)[:1]
+        versioned = f"{PROG_ID}.{major[0]}" if major else None
+        if versioned and reader.modified(rf"HKCR\{versioned}") is not None:
+            prog_id = versioned
+        elif server_directory is not None and path and _same_directory(server_directory, path):
+            prog_id = PROG_ID
+        elif server_directory is None and clsid and len(records) == 1:
+            prog_id = PROG_ID  # registered, and there is only one installation it can start
+        else:
+            prog_id = None
+        installations.append(Installation(name, version, path, prog_id))
+    return installations
+
+
+def _read_cache(cache_path: Path, reader: RegistryReader, max_age):
+    """Returns the cached installations, or None if the cache is missing or out of date"""
+    try:
+        with open(cache_path, encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != _CACHE_FORMAT:
+        return None
+    if data.get("stamp") != _stamp(reader, [*_DISCOVERY_KEYS, *data.get("keys", [])]):
+        return None
+    if max_age is not None and time() - data.get("created", 0) > max_age:
+        return None
+    return [Installation(*record) for record in data["installations"]]
+
+
+def _write_cache(cache_path: Path, stamp, keys, installations):
+    data = {
+        "format": _CACHE_FORMAT, "created": time(), "keys": keys, "stamp": stamp,
+        "installations": [list(installation) for installation in installations],
+    }
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        os.replace(temp_path, cache_path)  # atomic, so concurrent workers never read half a file
+    except OSError as exc:
+        logger.warning("Could not write the installation cache %s: %s", cache_path, exc)
+
+
+def list_installations(reader=None, cache_path=None, refresh=False, max_age=7 * 86400) -> list:
+    """
+    Returns an Installation(name, version, path, prog_id) record for each installed version of
+    Mathcad Prime, oldest version first. The registry is read with reader (by default the Windows
+    registry; on other platforms no installations are found without a reader).
+    The results are cached in cache_path, which defaults to default_cache_path() for the Windows
+    registry (other readers are only cached if a cache_path is given). refresh=True ignores the
+    cache, and max_age (seconds, None for no limit) is the longest a cached result is used
+    """
+    if reader is None:
+        if sys.platform != "win32":
+            return []
+        reader = WindowsRegistryReader()
+        if cache_path is None:
+            cache_path = default_cache_path()
+    if cache_path is not None and not refresh:
+        installations = _read_cache(Path(cache_path), reader, max_age)
+        if installations is not None:
+            return installations
+    stamp = _stamp(reader, _DISCOVERY_KEYS)  # taken first, so a change during discovery shows
+    installations = _discover(reader)
+    if cache_path is not None:
+        keys = _installation_keys(reader, installations)
+        _write_cache(Path(cache_path), stamp + _stamp(reader, keys), keys, installations)
+    return installations
 
 
-def list_installations():
-    """returns the install location, program name, and version of all Mathcad instances"""
-    # TODO - tidy format
-    data = subprocess.check_output("wmic product where \"Name like '%mathcad%'\" get Name, Version, InstallLocation")
-    data = [dt.strip() for dt in str(data).split("\\r\\r\\n") if "Mathcad" in dt]
-    print("Warning: The output format of mathcadpy.util.list_installations() is subject to change")
-    return data
+def find_installation(version=None, **options) -> Installation:
+    """
+    Returns the newest installation of Mathcad Prime matching version (e.g. "10", "10.0" or
+    "10.0.0.0"; None for any version). Raises ValueError if there is no such installation.
+    options are passed on to list_installations
+    """
+    installations = list_installations(**options)
+    if version is None:
+        matches = installations
+    else:
+        wanted = version_tuple(version)
+        matches = [
+            installation for installation in installations
+            if version_tuple(installation.version)[:len(wanted)] == wanted
+        ]
+    if not matches:
+        installed = ", ".join(installation.version for installation in installations) or "none"
+        requested = "Mathcad Prime" if version is None else f"Mathcad Prime {version}"
+        raise ValueError(f"{requested} is not installed (installed versions: {installed})")
+    return matches[-1]
 
 
 if __name__ == "__main__":
-    print(list_installations())
+    for found in list_installations(refresh=True):
+        print(found)
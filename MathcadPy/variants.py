@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+variants.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Writes copies of a Mathcad Prime (.mcdx) worksheet with new values stamped into its designated
+inputs, without starting Mathcad. Only the definitions of the designated input regions are
+rewritten; every other part of the package is copied unchanged:
+
+>>> from MathcadPy.variants import write_variants
+>>> cases = [{"length": (2.0, "m"), "label": "A"}, {"length": (3.5, "m"), "label": "B"}]
+>>> results = write_variants("beam.mcdx", cases, out_dir="issued", processes=4)
+>>> [result.path.name for result in results]
+['beam_00000.mcdx', 'beam_00001.mcdx']
+
+Input values have the same form as for Worksheet.set_inputs (a value, or a (value, units)
+tuple, with the worksheet's units kept if none are given). The results saved in the template are
+removed from each variant and automatic recalculation is switched on, so each variant is
+calculated when it is next opened in Mathcad; until then McdxWorksheet reports its outputs as
+not calculated.
+"""
+
+import concurrent.futures
+import itertools
+import math
+import multiprocessing
+import os
+import re
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+from time import perf_counter
+from xml.sax.saxutils import escape
+
+from ._application import _array_check, _array_rows, _input_kind, _preserved_units
+from .mcdx import CALCULATION_PART, RESULT_PART, WORKSHEET_PART, McdxWorksheet
+
+# The outcome of writing a single variant. error is "" if the variant was written
+VariantResult = namedtuple("VariantResult", ["case", "path", "seconds", "error"])
+
+_REGION_START = re.compile(rb'<region\b[^>]*\bregion-id="([^"]+)"')
+_DEFINE_START = re.compile(rb"<(\w+:)?define>")
+# the prefix group always takes part in the match (possibly empty), so that \1 also matches an
+# unprefixed end tag
+_SAVED_RESULT = re.compile(rb"<((?:\w+:)?)result\b[^>]*>.*?</\1result>", re.DOTALL)
+_CALCULATION_STATUS = re.compile(rb'\s+calculation-status="[^"]*"')
+_UNIT_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([^\s*/^()]+)|(\S))")
+
+
+def _real(value, prefix) -> str:
+    """Returns the XML for a real number (negative numbers are written as a negation)"""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{value} cannot be written to a worksheet")
+    text = repr(abs(value))
+    text = text[:-2] if text.endswith(".0") else text
+    if value < 0 or (value == 0 and math.copysign(1, value) < 0):
+        return f"<{prefix}apply><{prefix}neg /><{prefix}real>{text}</{prefix}real></{prefix}apply>"
+    return f"<{prefix}real>{text}</{prefix}real>"
+
+
+def _unit_xml(units: str, prefix) -> str:
+    """Converts a units string such as N*m or kg*m/s^2 to a units expression"""
+    tokens = []  # (kind, text), where kind is "number", "name" or the symbol itself
+    for number, name, symbol in _UNIT_TOKEN.findall(units):
+        if number:
+            tokens.append(("number", number))
+        elif name:
+            tokens.append(("name", name))
+        else:
+            tokens.append((symbol, symbol))
+    position = 0
+
+    def take(kind):
+        nonlocal position
+        if position < len(tokens) and tokens[position][0] == kind:
+            position += 1
+            return tokens[position - 1][1]
+        return None
+
+    def factor():
+        name = take("name")
+        if name is not None:
+            return f'<{prefix}id labels="UNIT" xml:space="preserve">{escape(name)}</{prefix}id>'
+        if take("(") is not None:
+            inner = expression()
+            if take(")") is None:
+                raise ValueError(f"Unbalanced parentheses in units: {units}")
+            return f"<{prefix}parens>{inner}</{prefix}parens>"
+        raise ValueError(f"Units could not be read: {units}")
+
+    def power():
+        base = factor()
+        if take("^") is None:
+            return base
+        exponent = take("number")
+        if exponent is None:
+            raise ValueError(f"Only positive numeric powers are supported in units: {units}")
+        return f"<{prefix}apply><{prefix}pow />{base}{_real(exponent, prefix)}</{prefix}apply>"
+
+    def expression():
+        result = power()
+        while True:
+            if take("*") is not None:
+                operator = "mult"
+            elif take("/") is not None:
+                operator = "div"
+            else:
+                return result
+            result = f"<{prefix}apply><{prefix}{operator} />{result}{power()}</{prefix}apply>"
+
+    xml = expression()
+    if position != len(tokens):
+        raise ValueError(f"Units could not be read: {units}")
+    return xml
+
+
+def _value_xml(kind, value, units, prefix) -> str:
+    """Returns the XML for an input definition's value expression"""
+    if kind == "string":
+        return f'<{prefix}str xml:space="preserve">{escape(value)}</{prefix}str>'
+    if kind == "real":
+        xml = _real(value, prefix)
+    else:
+        rows = _array_rows(value)
+        row_count, col_count = _array_check(rows)
+        elements = "".join(  # matrices are stored column by column
+            _real(rows[row][col], prefix) for col in range(col_count) for row in range(row_count)
+        )
+        xml = f'<{prefix}matrix rows="{row_count}" cols="{col_count}">{elements}</{prefix}matrix>'
+    if units:
+        return f"<{prefix}apply><{prefix}scale />{xml}{_unit_xml(units, prefix)}</{prefix}apply>"
+    return xml
+
+
+class McdxTemplate:
+    """
+    A worksheet file used as the template for variants. The package is read once, so any number
+    of variants can then be written from it
+    """
+
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        reader = McdxWorksheet(self.filepath)  # checks the path
+        with zipfile.ZipFile(self.filepath) as package:
+            self._parts = [(info, package.read(info)) for info in package.infolist()]
+        self._input_aliases = reader._alias_index()["Input"]  # {alias: region id}
+        self._input_units = {alias: reader.get_input(alias)[1] for alias in self._input_aliases}
+        self._definitions = self._find_definitions(self._part(WORKSHEET_PART))
+
+    def __repr__(self):
+        return f"McdxTemplate('{self.filepath}')"
+
+    def _part(self, name):
+        return next(data for info, data in self._parts if info.filename == name)
+
+    def _find_definitions(self, worksheet_xml) -> dict:
+        """
+        Returns {alias: (start, end, prefix)} - the byte span of the value expression of each
+        designated input's definition in the worksheet part, and the math namespace prefix
+        """
+        regions = {region_id: alias for alias, region_id in self._input_aliases.items()}
+        definitions = {}
+        for region in _REGION_START.finditer(worksheet_xml):
+            alias = regions.get(region.group(1).decode("utf-8"))
+            if alias is None:
+                continue
+            define = _DEFINE_START.search(worksheet_xml, region.end())
+            region_end = worksheet_xml.find(b"</region>", region.end())
+            if define is None or define.start() > region_end:
+                raise ValueError(f"The input '{alias}' is not a definition")
+            prefix = (define.group(1) or b"").decode("utf-8")
+            name_end = worksheet_xml.find(f"</{prefix}id>".encode("utf-8"), define.end())
+            end = worksheet_xml.find(f"</{prefix}define>".encode("utf-8"), define.end())
+            if name_end == -1 or end == -1 or name_end > end:
+                raise ValueError(f"The input '{alias}' is not a variable definition")
+            start = name_end + len(f"</{prefix}id>")
+            definitions[alias] = (start, end, prefix)
+        return definitions
+
+    def inputs(self):
+        """returns a list of the designated input fields in the template"""
+        return list(self._input_aliases)
+
+    def render(self, input_values: dict, preserve_worksheet_units=True) -> dict:
+        """Returns {part name: contents} of the parts of a variant that differ from the template"""
+        replacements = []  # (start, end, xml)
+        for input_alias, value in input_values.items():
+            if input_alias not in self._definitions:
+                raise ValueError(f"{input_alias} is not a designated input field")
+            units = ""
+            if isinstance(value, tuple) and len(value) == 2 and isinstance(value[1], str):
+                value, units = value
+            kind = _input_kind(value)
+            if kind != "string" and preserve_worksheet_units:
+                units = _preserved_units(units, self._input_units[input_alias])
+            start, end, prefix = self._definitions[input_alias]
+            xml = _value_xml(kind, value, units, prefix).encode("utf-8")
+            replacements.append((start, end, xml))
+
+        worksheet_xml = self._part(WORKSHEET_PART)
+        pieces, position = [], 0
+        for start, end, xml in sorted(replacements):
+            pieces += [worksheet_xml[position:start], xml]
+            position = end
+        pieces.append(worksheet_xml[position:])
+        parts = {WORKSHEET_PART: b"".join(pieces)}
+
+        names = [info.filename for info, _data in self._parts]
+        if RESULT_PART in names:  # the saved results are out of date
+            results = _SAVED_RESULT.sub(b"", self._part(RESULT_PART))
+            parts[RESULT_PART] = _CALCULATION_STATUS.sub(b"", results)
+        if CALCULATION_PART in names:
+            parts[CALCULATION_PART] = self._part(CALCULATION_PART).replace(
+                b'automatic-recalculation="false"', b'automatic-recalculation="true"'
+            )
+        return parts
+
+    def write(self, destination: Path, input_values: dict, preserve_worksheet_units=True):
+        """
+        Writes a variant of the template with the given input values. The file is written under
+        a temporary name and renamed into place, so a partly written variant is never left behind
+        """
+        destination = Path(destination)
+        changed = self.render(input_values, preserve_worksheet_units)
+        temp_path = destination.with_name(f"{destination.name}.tmp")
+        with zipfile.ZipFile(temp_path, "w") as package:
+            for info, data in self._parts:  # same order, names, dates and compression
+                package.writestr(info, changed.get(info.filename, data))
+        os.replace(temp_path, destination)
+        return destination
+
+
+_PROCESS_TEMPLATE = None  # the McdxTemplate belonging to a worker process
+
+
+def _initialise_worker(template_path):
+    """Worker process initialiser: reads the template once per process"""
+    global _PROCESS_TEMPLATE  # pylint: disable=global-statement
+    _PROCESS_TEMPLATE = McdxTemplate(template_path)
+
+
+def _write_variant(template, case, destination, input_values, preserve_worksheet_units):
+    """Writes one variant. Exceptions are recorded, not raised"""
+    start = perf_counter()
+    try:
+        template.write(destination, input_values, preserve_worksheet_units)
+        error = ""
+    except Exception as exc:  # pylint: disable=broad-except
+        error = f"{type(exc).__name__}: {exc}"
+    return VariantResult(case, destination, perf_counter() - start, error)
+
+
+def _write_in_worker(jobs, preserve_worksheet_units):
+    """Writes a chunk of (case, destination, input values) variants in a worker process"""
+    return [
+        _write_variant(_PROCESS_TEMPLATE, case, destination, input_values, preserve_worksheet_units)
+        for case, destination, input_values in jobs
+    ]
+
+
+def write_variants(template_path, cases, out_dir, name="{stem}_{case:05d}.mcdx", processes=1,
+                   preserve_worksheet_units=True, chunksize=16) -> list:
+    """
+    Writes a variant of the template worksheet for each case ({alias: value | (value, units)}
+    dictionaries) in cases, returning a list of VariantResult in case order.
+
+    Variants are written to out_dir, named by formatting name with the template's stem and the
+    case number. If processes is greater than 1, the variants are shared between that many
+    worker processes in chunks of chunksize cases; cases are read from the iterable as the
+    workers need them, so it can be a generator of any length
+    """
+    template_path = Path(template_path).resolve()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def jobs():
+        for case, input_values in enumerate(cases):
+            destination = out_dir / name.format(stem=template_path.stem, case=case)
+            yield case, destination, input_values
+
+    if processes <= 1:
+        template = McdxTemplate(template_path)
+        return [
+            _write_variant(template, case, destination, input_values, preserve_worksheet_units)
+            for case, destination, input_values in jobs()
+        ]
+
+    results = []
+    futures = {}  # {future: chunk of jobs} being written
+
+    def collect(done):
+        for future in done:
+            chunk = futures.pop(future)
+            try:
+                results.extend(future.result())
+            except Exception as exc:  # pylint: disable=broad-except
+                # e.g. the worker process died
+                error = f"{type(exc).__name__}: {exc}"
+                results.extend(
+                    VariantResult(case, destination, 0.0, error) for case, destination, _ in chunk
+                )
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context(),
+        initializer=_initialise_worker,
+        initargs=(template_path,),
+    ) as executor:
+        job_iterator = jobs()
+        while True:
+            chunk = list(itertools.islice(job_iterator, chunksize))
+            if not chunk:
+                break
+            if len(futures) >= processes * 2:  # only a few chunks are queued ahead of the workers
+                done, _pending = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                collect(done)
+            futures[executor.submit(_write_in_worker, chunk, preserve_worksheet_units)] = chunk
+        collect(concurrent.futures.as_completed(list(futures)))
+    return sorted(results, key=lambda result: result.case)
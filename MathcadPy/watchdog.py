@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+watchdog.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Time limits for the Mathcad calls that can hang (Open and Synchronize - e.g. a worksheet that
+does not converge, or a modal dialog in an unattended Mathcad). A COM call cannot be interrupted,
+so when a call runs past its time limit the watchdog kills the Mathcad process, which makes the
+blocked call return. The Mathcad instance then restarts itself, reopens its worksheets (the
+existing Worksheet objects remain usable) and raises MathcadTimeoutError:
+
+>>> from MathcadPy import Mathcad
+>>> from MathcadPy.watchdog import MathcadTimeoutError, Watchdog
+>>> watchdog = Watchdog(timeout=300, timeouts={"Open": 120}, adaptive=True)
+>>> mathcad_app = Mathcad(visible=False, watchdog=watchdog)
+>>> worksheet = mathcad_app.open("beam.mcdx")
+>>> try:
+...     worksheet.set_inputs({"length": 2.0})
+... except MathcadTimeoutError:
+...     pass  # Mathcad has been restarted - retry the case, or record it as failed
+>>> watchdog.as_dict()["Synchronize"]["p95_s"]
+0.262144
+
+The duration of every guarded call is recorded, and with adaptive=True the time limit of each
+call is set from its own history (multiplier times its 95th percentile, but at least minimum
+seconds) once it has been seen a few times. Sweep(watchdog=..., retries=...) retries timed out
+cases automatically.
+"""
+
+import logging
+import subprocess
+import sys
+import threading
+from time import monotonic
+
+from ._application import MathcadComError, MathcadTimeoutError
+from .instrument import CallStats
+
+logger = logging.getLogger(__name__)
+
+PROCESS_NAME = "MathcadPrime.exe"
+_ADAPTIVE_MIN_CALLS = 5  # calls seen before an adaptive time limit is used
+
+
+def mathcad_process_ids() -> set:
+    """Returns the process ids of the running Mathcad Prime processes (empty if not on Windows)"""
+    if sys.platform != "win32":
+        return set()
+    output = subprocess.run(
+        ["tasklist", "/FO", "CSV", "/NH", "/FI", f"IMAGENAME eq {PROCESS_NAME}"],
+        capture_output=True, text=True, check=False,
+    ).stdout
+    pids = set()
+    for line in output.splitlines():
+        fields = [field.strip('"') for field in line.split('","')]
+        if len(fields) > 1 and fields[0].lower() == PROCESS_NAME.lower():
+            pids.add(int(fields[1]))
+    return pids
+
+
+def started_process_id(process_ids_before: set):
+    """
+    Returns the id of the Mathcad process started since process_ids_before was taken, or of the
+    only running Mathcad process if none was started (the caller attached to it). Returns None
+    if the process cannot be told apart from other Mathcad processes
+    """
+    running = mathcad_process_ids()
+    candidates = (running - process_ids_before) or running
+    return next(iter(candidates)) if len(candidates) == 1 else None
+
+
+def kill_process(pid):
+    """Default kill function: force-terminates a Mathcad process (and its children)"""
+    if pid is None:
+        logger.error("The Mathcad process id is not known, so the hung call cannot be stopped")
+        return
+    subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True, check=False)
+
+
+class Watchdog:
+    """
+    Applies time limits to guarded Mathcad calls.
+
+    timeout is the default time limit in seconds (None for no limit) and timeouts an optional
+    {call name: seconds} dictionary of limits for particular calls ("Open", "Synchronize").
+    If adaptive is True, calls without an explicit limit are given multiplier times their 95th
+    percentile duration (at least minimum seconds) once they have been seen a few times.
+    kill is called with the id of the Mathcad process (None if it is not known) when a call
+    runs past its limit; by default the process is terminated with taskkill.
+    """
+
+    def __init__(self, timeout=None, timeouts=None, adaptive=False, multiplier=5.0, minimum=10.0,
+                 kill=kill_process):
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.adaptive = adaptive
+        self.multiplier = multiplier
+        self.minimum = minimum
+        self.kill = kill
+        self.pid = None  # the Mathcad process being watched
+        self.stats = {}  # {call name: CallStats} of the calls that completed
+        self.stalls = 0  # no. of calls that ran past their limit
+        self._condition = threading.Condition()
+        self._call = None  # (name, deadline) of the guarded call in progress
+        self._expired = False
+        self._thread = None
+
+    def timeout_for(self, name):
+        """Returns the time limit in seconds for a call (None for no limit)"""
+        if name in self.timeouts:
+            return self.timeouts[name]
+        stats = self.stats.get(name)
+        if self.adaptive and stats is not None and stats.count >= _ADAPTIVE_MIN_CALLS:
+            return max(self.minimum, self.multiplier * stats.percentile(0.95))
+        return self.timeout
+
+    def track(self, process_ids_before: set):
+        """
+        Records the Mathcad process to watch, given the process ids from before Mathcad was
+        started. If no new process appeared (the call attached to a running instance), the only
+        running Mathcad process is watched. With the default kill function, MathcadComError is
+        raised if the process cannot be told apart from other Mathcad processes, as a hung call
+        could not then be stopped
+        """
+        self.pid = started_process_id(process_ids_before)
+        if self.pid is None and self.kill is kill_process and sys.platform == "win32":
+            raise MathcadComError(
+                "The Mathcad process to watch cannot be told apart from the other running Mathcad "
+                "processes, so a hung call could not be stopped. Close the other Mathcad "
+                "instances, start a new instance for each worker one at a time (as MathcadPool "
+                "does) or give the Watchdog a kill function"
+            )
+
+    def call(self, name, func, *args):
+        """
+        Calls func(*args) with the time limit for name. Raises MathcadTimeoutError if the call
+        did not complete in time (in which case Mathcad has been killed)
+        """
+        timeout = self.timeout_for(name)
+        if timeout is None:
+            return self._timed(name, func, *args)
+        self._start_thread()
+        with self._condition:
+            self._call = (name, monotonic() + timeout)
+            self._expired = False
+            self._condition.notify()
+        message = f"{name} did not complete within {timeout:.1f} s, so Mathcad was stopped"
+        try:
+            result = self._timed(name, func, *args)
+        except Exception as exc:  # pylint: disable=broad-except
+            if self._expired:
+                raise MathcadTimeoutError(message) from exc
+            raise
+        finally:
+            with self._condition:
+                self._call = None
+        if self._expired:  # the call completed just as Mathcad was being stopped
+            raise MathcadTimeoutError(message)
+        return result
+
+    def _timed(self, name, func, *args):
+        start = monotonic()
+        result = func(*args)
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = CallStats()
+        stats.add(monotonic() - start)
+        return result
+
+    def _start_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._watch, name="MathcadPy watchdog", daemon=True
+            )
+            self._thread.start()
+
+    def _watch(self):
+        """Watchdog thread: kills Mathcad when the guarded call in progress passes its deadline"""
+        while True:
+            with self._condition:
+                while self._call is None or self._expired:
+                    self._condition.wait()
+                name, deadline = self._call
+                remaining = deadline - monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._expired = True
+                self.stalls += 1
+                pid = self.pid
+            logger.warning("%s has stalled, stopping Mathcad (process %s)", name, pid)
+            self.kill(pid)
+
+    def as_dict(self) -> dict:
+        """Returns {call name: timing statistics dictionary}, including the current time limit"""
+        return {
+            name: {**stats.as_dict(), "timeout_s": self.timeout_for(name)}
+            for name, stats in self.stats.items()
+        }
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.py
+~~~~~~~~~~~~~~
+MathcadPy
+Copyright 2025 Matt Woodhead
+
+Benchmarks of the MathcadPy hot paths. They run against the pure-Python fake of
+MathcadPrime.Application (MathcadPy.fake), so need neither Windows nor a Mathcad installation:
+
+    python Test/benchmarks.py                          # run and print the results
+    python Test/benchmarks.py --save baseline.json     # record the results
+    python Test/benchmarks.py --compare baseline.json  # exit with 1 if any benchmark regressed
+
+--latency adds a fixed delay to every fake COM call (a real Mathcad instance takes of the order
+of 50e-6 s per call), --sizes sets the matrix sizes and --filter selects benchmarks by name.
+The minimum time per call is used for comparisons, as it is the least affected by noise.
+
+The regression check is not run by CI, as timings are only comparable on the same machine. Before
+changing a hot path, --save a baseline from the unchanged tree, then --compare against it on the
+same machine once the change is made.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from statistics import median
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # run from a source checkout
+
+from MathcadPy import Mathcad, _matrix_to_array  # noqa: E402
+from MathcadPy.fake import FakeApplication, FakeMatrix, FakeSheet  # noqa: E402
+from MathcadPy.sweep import Sweep, grid  # noqa: E402
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # the numpy benchmarks are skipped
+    np = None
+
+WORKSHEET_NAME = "benchmark.mcdx"
+
+
+def _open(sheet, args):
+    """Opens a fake worksheet defined by sheet, returning the Worksheet"""
+    backend = FakeApplication({WORKSHEET_NAME: sheet}, latency=args.latency)
+    mathcad_app = Mathcad(visible=False, backend=backend)
+    return mathcad_app.open(args.directory / WORKSHEET_NAME)
+
+
+def _matrix(size):
+    return [[float(row * size + col) for col in range(size)] for row in range(size)]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~ Benchmarks ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Each function yields (benchmark name, callable to time)
+
+
+def alias_validation(args):
+    """Reading the designated aliases (cold) and checking an alias against them (warm)"""
+    count = args.aliases
+    worksheet = _open(FakeSheet(inputs={f"input_{i}": (1.0, "m") for i in range(count)}), args)
+    last_alias = f"input_{count - 1}"
+
+    def cold():
+        worksheet.refresh()
+        return last_alias in worksheet._input_index()
+
+    def warm():
+        return last_alias in worksheet._input_index()
+
+    yield f"alias_validation_cold[{count}]", cold
+    yield f"alias_validation_warm[{count}]", warm
+
+
+def matrix_to_array(args):
+    """Reading a matrix result element by element"""
+    for size in args.sizes:
+        matrix = FakeMatrix.from_rows(_matrix(size), args.latency)
+        yield f"matrix_to_array[{size}x{size}]", lambda matrix=matrix: _matrix_to_array(matrix)
+        if np is not None:
+            yield (
+                f"matrix_to_array_numpy[{size}x{size}]",
+                lambda matrix=matrix: _matrix_to_array(matrix, as_numpy=True),
+            )
+
+
+def set_matrix_input(args):
+    """Creating and setting a matrix input from a list of lists (and a numpy array)"""
+    worksheet = _open(FakeSheet(inputs={"matrix": ([[0.0]], "m")}), args)
+    for size in args.sizes:
+        rows = _matrix(size)
+        yield (
+            f"set_matrix_input[{size}x{size}]",
+            lambda rows=rows: worksheet.set_matrix_input("matrix", rows, "m"),
+        )
+        if np is not None:
+            array = np.array(rows)
+            yield (
+                f"set_matrix_input_numpy[{size}x{size}]",
+                lambda array=array: worksheet.set_matrix_input("matrix", array, "m"),
+            )
+
+
+def set_real_input(args):
+    """Setting a real input, with and without preserving the worksheet's units"""
+    worksheet = _open(FakeSheet(inputs={"length": (1.0, "mm")}), args)
+    for preserve in [True, False]:
+        yield (
+            f"set_real_input[preserve_worksheet_units={preserve}]",
+            lambda preserve=preserve: worksheet.set_real_input(
+                "length", 2.0, "mm", preserve_worksheet_units=preserve
+            ),
+        )
+
+
+def sweep_throughput(args):
+    """An end to end sweep, writing to a CSV store"""
+    sheet = FakeSheet(
+        inputs={"length": (1.0, "m"), "width": (1.0, "m")},
+        outputs={"area": "m^2", "perimeter": "m"},
+        calculate=lambda values: {
+            "area": values["length"] * values["width"],
+            "perimeter": 2 * (values["length"] + values["width"]),
+        },
+    )
+    axis = [float(i) for i in range(1, int(args.cases ** 0.5) + 1)]
+    design_space = list(grid(length=axis, width=axis))
+    runs = iter(range(sys.maxsize))
+
+    def run():
+        store = args.directory / f"sweep_{next(runs)}.csv"  # a new store, so no case is skipped
+        Sweep(
+            args.directory / WORKSHEET_NAME, design_space, store,
+            backend=FakeApplication({WORKSHEET_NAME: sheet}, latency=args.latency),
+        ).run()
+        store.unlink()
+
+    yield f"sweep_throughput[{len(design_space)} cases]", run
+
+
+BENCHMARKS = [alias_validation, matrix_to_array, set_matrix_input, set_real_input, sweep_throughput]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~ Running and recording ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def measure(func, repeat):
+    """Times func, returning its statistics (times are seconds per call)"""
+    timer = timeit.Timer(func)
+    number, _total = timer.autorange()  # enough calls for at least 0.2 s per round
+    times = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"min_s": min(times), "median_s": median(times), "rounds": repeat, "number": number}
+
+
+def run_benchmarks(args) -> dict:
+    results = {}
+    for benchmark in BENCHMARKS:
+        for name, func in benchmark(args):
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(func, args.repeat)
+            print(f"{name:<55} {results[name]['min_s'] * 1e6:>14.1f} us")
+    return results
+
+
+def compare(results, baseline, threshold) -> bool:
+    """Prints the change from a baseline. Returns False if any benchmark is slower than allowed"""
+    passed = True
+    print(f"\nCompared with the baseline (regression threshold {threshold:.2f}x):")
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        ratio = stats["min_s"] / baseline[name]["min_s"]
+        regressed = ratio > threshold
+        passed = passed and not regressed
+        print(f"{name:<55} {ratio:>8.2f}x{'  REGRESSION' if regressed else ''}")
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per fake COM call")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--aliases", type=int, default=200, help="designated inputs")
+    parser.add_argument("--cases", type=int, default=400, help="cases in the sweep")
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per benchmark")
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this")
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="mathcadpy_benchmarks_") as directory:
+        args.directory = Path(directory)
+        (args.directory / WORKSHEET_NAME).write_bytes(b"")  # Mathcad.open checks that it exists
+        results = run_benchmarks(args)
+
+    if args.save is not None:
+        record = {
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "numpy": None if np is None else np.__version__,
+                "latency": args.latency,
+            },
+            "benchmarks": results,
+        }
+        args.save.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))["benchmarks"]
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
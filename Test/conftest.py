@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+conftest.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Shared fixtures for the behaviour tests, which run against MathcadPy.fake (no Mathcad needed).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TEST_DIR = Path(__file__).parent
+sys.path.insert(0, str(TEST_DIR.parent))  # the package under test, without installing it
+
+# units_test.py is a script that drives a real Mathcad instance, not a test module
+collect_ignore = ["units_test.py"]
+
+
+@pytest.fixture
+def worksheet_path(tmp_path):
+    """A copy of the test worksheet (the fake application only needs the file to exist)"""
+    path = tmp_path / "test.mcdx"
+    path.write_bytes((TEST_DIR / "test.mcdx").read_bytes())
+    return path
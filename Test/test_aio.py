@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+test_aio.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+The asyncio front-end driving the fake application on its STA threads.
+"""
+
+import asyncio
+from time import sleep
+
+import pytest
+
+from MathcadPy.aio import AsyncMathcad, AsyncMathcadPool
+from MathcadPy.fake import FakeApplication, FakeSheet
+
+
+def _calculate(values):
+    """Doubles length, slowly for a length of 3"""
+    if values["length"] == 3:
+        sleep(0.5)
+    return {"area": values["length"] * 2}
+
+
+def _backend():
+    sheet = FakeSheet(inputs={"length": (1.0, "m")}, outputs={"area": "m^2"}, calculate=_calculate)
+    return FakeApplication({"test.mcdx": sheet})
+
+
+def test_async_worksheet(worksheet_path):
+    async def main():
+        async with AsyncMathcad(visible=False, backend=_backend(), timeout=10) as mathcad_app:
+            worksheet = await mathcad_app.open(worksheet_path)
+            assert await worksheet.inputs() == ["length"]
+            await worksheet.set_inputs({"length": 4.0})
+            return await worksheet.get_outputs(["area"])
+
+    assert asyncio.run(main())["area"].value == 8.0
+
+
+def test_pool_quarantines_a_member_that_times_out(worksheet_path):
+    async def main():
+        async with AsyncMathcadPool(worksheet_path, size=1, backend=_backend(),
+                                    timeout=0.1) as pool:
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.evaluate({"length": 3.0})
+            assert pool.quarantined == 1
+            # the member is given the next case once its slow call has finished
+            return await pool.evaluate({"length": 2.0}, timeout=10)
+
+    assert asyncio.run(main())["area"].value == 4.0
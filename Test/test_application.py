@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+test_application.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+The Mathcad and Worksheet wrappers driving the fake application.
+"""
+
+from array import array
+from time import sleep
+
+import pytest
+
+from MathcadPy import (
+    Mathcad, MathcadComError, MathcadOutputError, MathcadTimeoutError, OutputResult,
+    _matrix_to_array,
+)
+from MathcadPy.fake import FakeApplication, FakeMatrix, FakeSheet, FakeWorksheet
+from MathcadPy.watchdog import Watchdog
+
+
+@pytest.fixture
+def sheet():
+    return FakeSheet(
+        inputs={"length": (2.0, "m"), "width": (3.0, "m")}, outputs={"area": "m^2"},
+        calculate=lambda values: {"area": values["length"] * values["width"]},
+    )
+
+
+@pytest.fixture
+def mathcad_app(sheet):
+    return Mathcad(visible=False, backend=FakeApplication({"test.mcdx": sheet}))
+
+
+def test_open_returns_the_open_worksheet(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    assert mathcad_app.open(str(worksheet_path)) is worksheet
+    assert list(mathcad_app.open_worksheets) == [worksheet_path.resolve()]
+
+
+def test_open_errors(mathcad_app, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        mathcad_app.open(tmp_path / "missing.mcdx")
+    (tmp_path / "sheet.xmcd").write_text("")
+    with pytest.raises(ValueError):
+        mathcad_app.open(tmp_path / "sheet.xmcd")
+
+
+def test_open_raises_if_mathcad_lists_another_sheet(mathcad_app, worksheet_path, monkeypatch):
+    application = mathcad_app._Mathcad__mcadapp
+    other = FakeWorksheet(application, str(worksheet_path.with_name("other.mcdx")), FakeSheet())
+    open_sheet = application.Open
+    monkeypatch.setattr(application, "Open", lambda filepath: open_sheet(filepath) and other)
+    with pytest.raises(MathcadComError):
+        mathcad_app.open(worksheet_path)
+
+
+def test_alias_lists_are_cached_until_refresh(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    assert worksheet.inputs() == ["length", "width"]
+    assert worksheet.alias_calls_saved == 0
+    worksheet.get_input("length")
+    assert worksheet.alias_calls_saved == 3  # 2 GetAliasByIndex calls and Count
+    with pytest.raises(ValueError):
+        worksheet.get_input("height")
+    worksheet.ws_object.Inputs._aliases.append("height")  # added by other means
+    assert "height" not in worksheet.inputs()
+    worksheet.refresh()
+    assert worksheet.inputs() == ["length", "width", "height"]
+
+
+def test_set_inputs_sends_a_batch_with_calculation_paused(mathcad_app, worksheet_path, monkeypatch):
+    worksheet = mathcad_app.open(worksheet_path)
+    calls = []
+    ws_object = worksheet.ws_object
+    for method in ("PauseCalculation", "ResumeCalculation", "Synchronize"):
+        monkeypatch.setattr(ws_object, method, lambda method=method: calls.append(method))
+    errors = worksheet.set_inputs({"length": 4.0, "width": (5.0, "m")})
+    assert errors == {"length": 0, "width": 0}
+    assert calls == ["PauseCalculation", "ResumeCalculation", "Synchronize"]
+    assert worksheet.get_input("width") == (5.0, "m", 0)
+    with pytest.raises(ValueError):
+        worksheet.set_inputs({"length": 1.0, "height": 1.0})
+    assert worksheet.get_input("length")[0] == 4.0  # nothing is sent if an alias is wrong
+
+
+def test_get_outputs_returns_a_record_per_alias(worksheet_path):
+    sheet = FakeSheet(
+        inputs={"length": (2.0, "m")}, outputs={"area": "m^2", "volume": "m^3"},
+        calculate=lambda values: {"area": values["length"] ** 2},
+    )
+    backend = FakeApplication({"test.mcdx": sheet}, unit_factors={("m^2", "cm^2"): 1e4})
+    worksheet = Mathcad(visible=False, backend=backend).open(worksheet_path)
+    results = worksheet.get_outputs(units={"area": "cm^2"})
+    assert results == {
+        "area": OutputResult(40000.0, "cm^2", 0),
+        "volume": OutputResult(None, None, 1),  # not calculated
+    }
+    assert worksheet.get_outputs(["area"])["area"].units == "m^2"
+    with pytest.raises(ValueError):
+        worksheet.get_outputs(["area"], units={"mass": "kg"})
+
+
+@pytest.fixture
+def matrix_worksheet(worksheet_path):
+    sheet = FakeSheet(
+        inputs={"loads": ([[1.0, 2.0], [3.0, 4.0]], "N")}, outputs={"loads_out": "N"},
+        calculate=lambda values: {"loads_out": values["loads"]},
+    )
+    mathcad_app = Mathcad(visible=False, backend=FakeApplication({"test.mcdx": sheet}))
+    return mathcad_app.open(worksheet_path)
+
+
+def test_matrix_element_loop_fallback():
+    matrix = FakeMatrix.from_rows([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    assert _matrix_to_array(matrix) == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+
+
+def test_matrix_inputs_accept_buffer_objects(matrix_worksheet):
+    buffer = memoryview(array("d", [5.0, 6.0, 7.0, 8.0])).cast("B").cast("d", (2, 2))
+    assert matrix_worksheet.set_matrix_input("loads", buffer) == 0
+    assert matrix_worksheet.get_matrix_input("loads")[0] == [[5.0, 6.0], [7.0, 8.0]]
+
+
+def test_matrix_numpy_fast_path(matrix_worksheet):
+    np = pytest.importorskip("numpy")
+    matrix = np.arange(6, dtype=np.float64).reshape((2, 3))
+    assert matrix_worksheet.set_matrix_input("loads", matrix) == 0
+    value, units, error_code = matrix_worksheet.get_matrix_output("loads_out", as_numpy=True)
+    assert isinstance(value, np.ndarray) and value.dtype == np.float64
+    assert np.array_equal(value, matrix)
+    assert (units, error_code) == ("N", 0)
+    assert _matrix_to_array(FakeMatrix.from_rows(matrix.tolist()), as_numpy=True).shape == (2, 3)
+
+
+def test_evaluate_cache_keys_on_every_input(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    worksheet.enable_result_cache()
+    assert worksheet.evaluate({"length": 4.0})["area"].value == 12.0
+    assert worksheet.evaluate({"width": 5.0})["area"].value == 20.0  # length is still 4
+    assert worksheet.result_cache.hits == 0
+    assert worksheet.evaluate({"length": 4.0, "width": (3.0, "m")})["area"].value == 12.0
+    assert worksheet.result_cache.hits == 1
+    assert worksheet.evaluate({"length": 1.0})["area"].value == 3.0  # the cached width was sent
+    assert worksheet.get_input("width")[0] == 3.0
+
+
+def test_evaluate_cache_returns_copies(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    worksheet.enable_result_cache()
+    worksheet.evaluate({"length": 4.0})
+    worksheet.evaluate({"length": 4.0})["area"] = None
+    assert worksheet.evaluate({"length": 4.0})["area"].value == 12.0
+
+
+def test_unchanged_inputs_are_not_sent_again(mathcad_app, worksheet_path, monkeypatch):
+    worksheet = mathcad_app.open(worksheet_path)
+    worksheet.set_inputs({"length": 4.0, "width": 5.0})
+    sent = []
+    set_real_value = worksheet.ws_object.SetRealValue
+    monkeypatch.setattr(worksheet.ws_object, "SetRealValue",
+                        lambda *args: sent.append(args[0]) or set_real_value(*args))
+    assert worksheet.set_inputs({"length": 4.0, "width": 6.0}) == {"length": 0, "width": 0}
+    assert sent == ["width"] and worksheet.inputs_skipped == 1
+    worksheet.set_inputs({"length": 4.0, "width": 6.0})
+    assert sent == ["width"] and worksheet.synchronize_skipped == 1
+    worksheet.set_real_input("length", 4.0)  # set outside set_inputs, so sent again next time
+    worksheet.set_inputs({"length": 4.0})
+    assert sent == ["width", "length", "length"]
+    assert worksheet.get_outputs()["area"].value == 24.0
+
+
+def test_outputs_are_read_again_after_calculation_resumes(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    worksheet.pause_calculation()
+    worksheet.set_real_input("length", 5.0)
+    assert worksheet.get_real_output("area") == (None, None, 1)  # not calculated yet
+    worksheet.resume_calculation()
+    assert worksheet.get_real_output("area") == (15.0, "m^2", 0)
+    with pytest.warns(DeprecationWarning):
+        worksheet.PauseCalculation()
+    with pytest.warns(DeprecationWarning):
+        worksheet.ResumeCalculation()
+    assert worksheet.get_real_output("area") == (15.0, "m^2", 0)
+
+
+def test_unit_conversion_factors_are_reused(worksheet_path):
+    sheet = FakeSheet(
+        inputs={"length": (2.0, "m")}, outputs={"area": "m^2", "plan": "m^2"},
+        calculate=lambda values: {
+            "area": values["length"] ** 2, "plan": [[1.0, values["length"]]]
+        },
+    )
+    backend = FakeApplication({"test.mcdx": sheet}, unit_factors={("m^2", "cm^2"): 1e4})
+    worksheet = Mathcad(visible=False, backend=backend).open(worksheet_path)
+    assert worksheet.get_real_output("area", units="cm^2") == (40000.0, "cm^2", 0)
+    assert worksheet.unit_converter.factor("m^2", "cm^2") == 1e4
+    backend.unit_factors.clear()  # so only a local conversion gives the right values
+    assert worksheet.get_matrix_output("plan", units="cm^2")[0] == [[1e4, 2e4]]
+    results = worksheet.convert_outputs({"m^2": "cm^2"})
+    assert (results["area"].value, results["area"].units) == (40000.0, "cm^2")
+
+
+def test_restart_reopens_saved_worksheets(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    application = mathcad_app._Mathcad__mcadapp
+    unsaved = FakeWorksheet(application, "", FakeSheet())
+    unsaved.Name = "Untitled-1"
+    application.Worksheets.append(unsaved)
+    assert len(mathcad_app.open_worksheets) == 2
+    mathcad_app.restart()
+    assert mathcad_app.open_worksheets == {worksheet_path.resolve(): worksheet}
+    worksheet.set_inputs({"length": 1.0})
+    assert worksheet.get_outputs()["area"].value == 3.0
+
+
+def test_hung_synchronize_restarts_mathcad(worksheet_path):
+    def calculate(values):
+        if values["length"] == 9:
+            sleep(0.5)  # hangs, as far as the watchdog is concerned
+        return {"area": values["length"]}
+
+    sheet = FakeSheet(inputs={"length": (1.0, "m")}, outputs={"area": "m^2"}, calculate=calculate)
+    killed = []
+    watchdog = Watchdog(timeouts={"Synchronize": 0.1}, kill=killed.append)
+    mathcad_app = Mathcad(visible=False, backend=FakeApplication({"test.mcdx": sheet}),
+                          watchdog=watchdog)
+    worksheet = mathcad_app.open(worksheet_path)
+    with pytest.raises(MathcadTimeoutError):
+        worksheet.set_inputs({"length": 9.0})
+    assert (len(killed), watchdog.stalls, mathcad_app.restarts) == (1, 1, 1)
+    worksheet.set_inputs({"length": 2.0})  # the worksheet was reopened in the new instance
+    assert worksheet.get_outputs()["area"].value == 2.0
+
+
+def test_error_mode_is_validated(mathcad_app, worksheet_path):
+    worksheet = mathcad_app.open(worksheet_path)
+    assert worksheet.error_mode == "warn"
+    worksheet.error_mode = "collect"
+    assert worksheet.error_mode == "collect"
+    with pytest.raises(ValueError):
+        worksheet.error_mode = "Strict"
+
+
+def test_output_errors_by_error_mode(worksheet_path):
+    sheet = FakeSheet(inputs={"length": (2.0, "m")}, outputs={"area": "m^2", "volume": "m^3"},
+                      calculate=lambda values: {"area": values["length"] ** 2})
+    mathcad_app = Mathcad(visible=False, backend=FakeApplication({"test.mcdx": sheet}))
+    worksheet = mathcad_app.open(worksheet_path)
+    assert worksheet.get_outputs()["volume"].error_code == 1  # "warn" only returns the code
+    worksheet.error_mode = "collect"
+    worksheet.get_outputs(case=3)
+    (error,) = worksheet.take_errors()
+    assert (error.errors, error.case) == ({"volume": 1}, 3)
+    assert worksheet.take_errors() == []
+    worksheet.error_mode = "strict"
+    with pytest.raises(MathcadOutputError):
+        worksheet.get_outputs()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+test_export.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+batch_export with the fake application.
+"""
+
+import pytest
+
+from MathcadPy.export import batch_export
+from MathcadPy.fake import FakeApplication, FakeSheet
+
+
+@pytest.fixture
+def sources(worksheet_path):
+    other = worksheet_path.with_name("other.mcdx")
+    other.write_bytes(worksheet_path.read_bytes())
+    return [worksheet_path, other]
+
+
+@pytest.fixture
+def backend():
+    return FakeApplication({"test.mcdx": FakeSheet(), "other.mcdx": FakeSheet()})
+
+
+def test_batch_export(sources, backend, tmp_path):
+    out_dir = tmp_path / "release"
+    out_dir.mkdir()
+    missing = tmp_path / "missing.mcdx"
+    results = batch_export(sources + [missing], formats=[".pdf", ".MCDX"], out_dir=out_dir,
+                           backend=backend)
+    assert [result.error for result in results[:2]] == ["", ""]
+    assert results[2].error.startswith("FileNotFoundError")
+    assert results[0].outputs == [out_dir / "test.pdf", out_dir / "test.mcdx"]
+    assert sorted(path.name for path in out_dir.iterdir()) == [
+        "other.mcdx", "other.pdf", "test.mcdx", "test.pdf"
+    ]
+    assert backend.Worksheets.Count == 0  # every worksheet was closed again
+
+    results = batch_export(sources, formats=[".pdf"], out_dir=out_dir, backend=backend)
+    assert [(result.outputs, len(result.skipped)) for result in results] == [([], 1), ([], 1)]
+
+
+def test_batch_export_never_overwrites_a_source(sources, backend):
+    with pytest.raises(ValueError):
+        batch_export(sources, formats=[".mcdx"], backend=backend)
+    with pytest.raises(ValueError):
+        batch_export(sources, formats=[".docx"], backend=backend)
+
+
+def test_batch_export_across_processes(sources, backend, tmp_path):
+    results = batch_export(sources, formats=[".rtf", ".xps"], out_dir=tmp_path, processes=2,
+                           backend=backend)
+    assert [result.error for result in results] == ["", ""]
+    assert results[1].outputs == [tmp_path / "other.rtf", tmp_path / "other.xps"]
+    assert all(path.exists() for result in results for path in result.outputs)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+test_instrument.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+ComProfiler counting the COM calls made to the fake application.
+"""
+
+import json
+import logging
+
+from MathcadPy import Mathcad
+from MathcadPy.fake import FakeApplication, FakeSheet
+from MathcadPy.instrument import ComProfiler
+
+
+def _worksheet(worksheet_path, profiler):
+    sheet = FakeSheet(
+        inputs={"length": (2.0, "m")}, outputs={"area": "m^2"},
+        calculate=lambda values: {"area": values["length"] ** 2},
+    )
+    backend = FakeApplication({"test.mcdx": sheet})
+    return Mathcad(visible=False, backend=backend, profiler=profiler).open(worksheet_path)
+
+
+def test_profiler_counts_com_calls(worksheet_path, tmp_path, caplog):
+    profiler = ComProfiler(trace=True)
+    worksheet = _worksheet(worksheet_path, profiler)
+    profiler.reset()
+    with caplog.at_level(logging.INFO, logger="MathcadPy.instrument"):
+        with profiler.case("first"):
+            assert worksheet.evaluate({"length": 3.0})["area"].value == 9.0
+    stats = profiler.as_dict()
+    assert stats["Synchronize"]["count"] == 1
+    assert stats["SetRealValue"]["count"] == 1
+    assert profiler.total_calls() == len(profiler.events)
+    assert "case first:" in caplog.text and "Synchronize x1" in caplog.text
+
+    profiler.dump_chrome_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    assert len(trace["traceEvents"]) == profiler.total_calls()
+    profiler.dump_json(tmp_path / "stats.json")
+    assert json.loads((tmp_path / "stats.json").read_text(encoding="utf-8")).keys() == stats.keys()
+
+
+def test_profiler_is_opt_in(worksheet_path):
+    worksheet = _worksheet(worksheet_path, None)
+    assert type(worksheet.ws_object).__name__ == "FakeWorksheet"  # not wrapped in a ComProxy
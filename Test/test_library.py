@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+test_library.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+WorksheetIndex over a directory of copies of the test worksheets.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from MathcadPy.library import WorksheetIndex
+
+TEST_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "calcs"
+    (root / "joints").mkdir(parents=True)
+    (root / "beam.mcdx").write_bytes((TEST_DIR / "test.mcdx").read_bytes())
+    (root / "joints" / "bolt.mcdx").write_bytes((TEST_DIR / "test_units.mcdx").read_bytes())
+    (root / "broken.mcdx").write_bytes(b"not a zip file")
+    return root
+
+
+def test_index_and_search(library):
+    with WorksheetIndex() as index:
+        report = index.update(library)
+        assert (report.scanned, report.indexed, report.removed) == (3, 3, 0)
+        assert [Path(path).name for path, _error in report.failed] == ["broken.mcdx"]
+        beam = library / "beam.mcdx"
+        assert index.find(alias="real_input_with_units_test", io="Input")[0] == beam
+        assert beam in index.find(units="mm")
+        assert index.search("aliases:real_input_with_units_test AND units:mm")[0] == beam
+        assert index.info(beam)["Input"]["matrix_input_test"] == ([[1.0, 2.0], [3.0, 4.0]], "s", 0)
+
+
+def test_update_only_reads_changed_files(library):
+    with WorksheetIndex() as index:
+        index.update(library)
+        beam = library / "beam.mcdx"
+        os.utime(beam, (1, 1))  # touched, with the same content
+        (library / "joints" / "bolt.mcdx").unlink()
+        report = index.update(library)
+        assert (report.scanned, report.unchanged, report.removed) == (2, 2, 1)
+        assert index.stats()["files"] == 2
+        assert index.search("bolt") == []
+        assert index.search("beam") == [beam]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+test_mcdx.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Offline reading of the designated inputs and outputs saved in the .mcdx test worksheets.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from MathcadPy.mcdx import McdxWorksheet
+
+TEST_DIR = Path(__file__).parent
+
+
+def test_aliases_and_version():
+    worksheet = McdxWorksheet(TEST_DIR / "test.mcdx")
+    assert worksheet.version() == "5.0.0.0"
+    assert worksheet.inputs() == [
+        "real_input_test", "real_input_with_units_test", "string_input_test", "matrix_input_test"
+    ]
+    assert worksheet.outputs() == ["matrix_output_test", "real_output_test"]
+
+
+def test_saved_inputs():
+    worksheet = McdxWorksheet(TEST_DIR / "test.mcdx")
+    assert worksheet.get_input("real_input_test") == (11.0, "", 0)
+    assert worksheet.get_input("real_input_with_units_test") == (3.0, "mm", 0)
+    assert worksheet.get_input("string_input_test") == ("string from python script!", "", 0)
+    assert worksheet.get_input("matrix_input_test") == ([[1.0, 2.0], [3.0, 4.0]], "s", 0)
+
+
+def test_saved_outputs():
+    worksheet = McdxWorksheet(TEST_DIR / "test.mcdx")
+    assert worksheet.get_output("matrix_output_test") == ([[10.0, 20.0], [30.0, 40.0]], "s", 0)
+    assert worksheet.get_output("real_output_test") == (0.033, "m", 0)
+    outputs = worksheet.get_outputs()
+    assert outputs["real_output_test"].units == "m"
+
+
+def test_output_units():
+    worksheet = McdxWorksheet(TEST_DIR / "test_units.mcdx")
+    assert worksheet.inputs() == []
+    value, units, error_code = worksheet.get_output("real_output_test")
+    assert value == pytest.approx(286354.258997866)
+    assert (units, error_code) == ("lb*ft^2/s^2", 0)
+    assert worksheet.get_output("real_output_test2") == (12067.0, "N*m", 0)
+    assert worksheet.get_output("real_output_test3")[1] == "ft*kip"
+
+
+def test_unknown_alias():
+    worksheet = McdxWorksheet(TEST_DIR / "test.mcdx")
+    with pytest.raises(ValueError):
+        worksheet.get_output("real_input_test")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+test_optimize.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+WorksheetFunction on the fake application: memoized values, gradients and failed points.
+"""
+
+import pytest
+
+from MathcadPy import Mathcad, MathcadOutputError
+from MathcadPy.fake import FakeApplication, FakeSheet
+from MathcadPy.optimize import WorksheetFunction
+
+
+def _calculate(values):
+    """A beam: mass = width * depth and stress = load / depth ** 2 (no result for depth 0)"""
+    results = {"mass": values["width"] * values["depth"]}
+    if values["depth"]:
+        results["stress"] = values["load"] / values["depth"] ** 2
+    return results
+
+
+@pytest.fixture
+def worksheet(worksheet_path):
+    sheet = FakeSheet(
+        inputs={"width": (1.0, "m"), "depth": (1.0, "m"), "load": (8.0, "N")},
+        outputs={"mass": "kg", "stress": "Pa"}, calculate=_calculate,
+    )
+    mathcad_app = Mathcad(visible=False, backend=FakeApplication({"test.mcdx": sheet}))
+    return mathcad_app.open(worksheet_path)
+
+
+def _beam(worksheet, **kwargs):
+    return WorksheetFunction(worksheet, parameters={"width": "m", "depth": "m"}, objective="mass",
+                             constraints={"stress": (None, 1.0)}, **kwargs)
+
+
+def test_objective_and_constraints_share_a_calculation(worksheet):
+    beam = _beam(worksheet)
+    assert beam([2.0, 4.0]) == 8.0
+    assert beam.value([2.0, 4.0], "stress") == 0.5
+    assert beam.evaluations == 1
+    assert beam.summary()["calls"] == {"objective": 1, "constraint": 1}
+    with pytest.raises(ValueError):
+        beam([2.0])
+
+
+def test_results_are_not_reused_after_another_input_changes(worksheet):
+    beam = _beam(worksheet)
+    assert beam.value([2.0, 4.0], "stress") == 0.5
+    worksheet.set_inputs({"load": 16.0})
+    assert beam.value([2.0, 4.0], "stress") == 1.0
+    assert beam.evaluations == 2
+
+
+@pytest.mark.parametrize("scheme, evaluations", [("forward", 3), ("central", 4)])
+def test_gradients(worksheet, scheme, evaluations):
+    beam = _beam(worksheet, scheme=scheme, step=1e-6)
+    gradients = beam.gradients([2.0, 4.0])
+    assert gradients["mass"] == pytest.approx([4.0, 2.0], rel=1e-4)
+    assert gradients["stress"] == pytest.approx([0.0, -0.25], rel=1e-4, abs=1e-6)
+    assert beam.evaluations == evaluations
+
+
+def test_failed_point_raises(worksheet):
+    beam = _beam(worksheet)
+    with pytest.raises(MathcadOutputError) as excinfo:
+        beam([2.0, 0.0])
+    assert excinfo.value.inputs == {"width": 2.0, "depth": 0.0}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+test_pool.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+MathcadPool workers running the fake application: results, hung cases and crashed workers.
+"""
+
+import functools
+import os
+from pathlib import Path
+from time import sleep
+
+from MathcadPy.fake import FakeApplication, FakeSheet
+from MathcadPy.pool import MathcadPool
+
+
+def _calculate(values, marker=None):
+    """
+    Doubles length. A length of 3 hangs, 7 is slow and 5 kills the worker process; with a marker
+    file, 5 only kills the first worker that calculates it
+    """
+    if values["length"] == 3:
+        sleep(60)
+    if values["length"] == 7:
+        sleep(1)
+    if values["length"] == 5 and (marker is None or not Path(marker).exists()):
+        if marker is not None:
+            Path(marker).touch()
+        os._exit(1)
+    return {"area": values["length"] * 2}
+
+
+def _backend(marker=None):
+    sheet = FakeSheet(
+        inputs={"length": (1.0, "m")}, outputs={"area": "m^2"},
+        calculate=functools.partial(_calculate, marker=marker),
+    )
+    return FakeApplication({"test.mcdx": sheet})
+
+
+def test_map(worksheet_path):
+    with MathcadPool(worksheet_path, processes=2, backend=_backend()) as pool:
+        rows = list(pool.map([{"length": float(length)} for length in [1, 2, 4]]))
+    assert [case_number for case_number, _row in rows] == [0, 1, 2]
+    assert [row["area"] for _case_number, row in rows] == [2.0, 4.0, 8.0]
+    assert all(row["error"] == "" and row["seconds"] >= 0 for _case_number, row in rows)
+
+
+def test_hung_and_crashed_cases_fail_after_retries(worksheet_path):
+    cases = [{"length": float(length)} for length in [1, 3, 5, 6]]
+    with MathcadPool(worksheet_path, processes=2, backend=_backend(), timeout=1,
+                     retries=1) as pool:
+        rows = dict(pool.map(cases, ordered=False))
+        assert pool.restarts == 4  # each failing case was tried twice
+    assert (rows[0]["area"], rows[3]["area"]) == (2.0, 12.0)
+    assert rows[1]["error"] == "case timed out after 1 seconds"
+    assert rows[1]["seconds"] >= 1
+    assert rows[2]["error"] == "worker process crashed"
+
+
+def test_crashed_case_is_retried(worksheet_path, tmp_path):
+    marker = tmp_path / "crashed"
+    cases = [{"length": float(length)} for length in [4, 5, 6]]
+    with MathcadPool(worksheet_path, processes=2, backend=_backend(str(marker)),
+                     retries=1) as pool:
+        rows = list(pool.map(cases))
+        assert pool.restarts == 1
+    assert marker.exists()
+    assert [row["area"] for _case_number, row in rows] == [8.0, 10.0, 12.0]
+
+
+def test_abandoned_map_does_not_affect_the_next(worksheet_path):
+    with MathcadPool(worksheet_path, processes=2, backend=_backend()) as pool:
+        for _row in pool.map([{"length": 1.0}, {"length": 7.0}]):
+            break  # case 1 is left running
+        rows = list(pool.map([{"length": 7.0}, {"length": 20.0}], ordered=False))
+    assert sorted((case_number, row["area"]) for case_number, row in rows) == [(0, 14.0), (1, 40.0)]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+test_registry.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Reuse, recycling and ownership of the warm Mathcad instances held by a MathcadRegistry.
+"""
+
+import pytest
+
+from MathcadPy import _com
+from MathcadPy.fake import FakeApplication, FakeSheet
+from MathcadPy.instrument import ComProfiler
+from MathcadPy.registry import MathcadRegistry
+from MathcadPy.sweep import Sweep
+from MathcadPy.watchdog import Watchdog
+
+
+class _User(FakeApplication):
+    """A Mathcad instance the user is working in"""
+
+    quit_calls = 0
+
+    def Quit(self, save_option):
+        self.quit_calls += 1
+        super().Quit(save_option)
+
+
+@pytest.fixture
+def com(monkeypatch):
+    """Replaces the COM server: new_instances lists the instances started with DispatchEx"""
+    user = _User()
+    new_instances = []
+
+    def dispatch_ex(prog_id=_com.PROG_ID):
+        new_instances.append(_User())
+        return new_instances[-1]
+
+    monkeypatch.setattr(_com, "get_active", lambda prog_id=_com.PROG_ID: user)
+    monkeypatch.setattr(_com, "attach", lambda prog_id=_com.PROG_ID: user)
+    monkeypatch.setattr(_com, "dispatch_ex", dispatch_ex)
+    return user, new_instances
+
+
+def test_starts_its_own_instance(com):
+    user, new_instances = com
+    registry = MathcadRegistry()
+    mathcad_app = registry.get()
+    assert registry.get() is mathcad_app
+    assert len(new_instances) == 1 and new_instances[0].Visible is False
+    registry.quit_all()
+    assert new_instances[0].quit_calls == 1
+    assert (user.Visible, user.quit_calls) == (True, 0)
+
+
+def test_attached_instance_is_never_hidden_or_quit(com):
+    user, new_instances = com
+    registry = MathcadRegistry(max_cases=2)
+    mathcad_app = registry.get(attach=True)
+    assert not new_instances and user.Visible is True
+    assert registry.case_done(mathcad_app, 2)
+    replacement = registry.get(attach=True)  # recycled: released, and replaced by its own
+    assert replacement is not mathcad_app and len(new_instances) == 1
+    assert registry.recycled == 1
+    registry.quit_all()
+    assert user.quit_calls == 0 and new_instances[0].quit_calls == 1
+
+
+def test_recycled_after_max_cases():
+    registry = MathcadRegistry(max_cases=3)
+    backend = FakeApplication()
+    mathcad_app = registry.get(backend=backend)
+    assert not registry.case_done(mathcad_app, 2)
+    assert registry.get(backend=backend) is mathcad_app
+    assert registry.case_done(mathcad_app)
+    assert registry.get(backend=backend) is not mathcad_app
+    assert registry.recycled == 1
+
+
+def test_release():
+    registry = MathcadRegistry()
+    mathcad_app = registry.get(backend=FakeApplication())
+    registry.release(mathcad_app)
+    with pytest.raises(ValueError):
+        registry.case_done(mathcad_app)
+
+
+def test_profiler_and_watchdog_are_given_to_the_instance():
+    registry = MathcadRegistry()
+    backend = FakeApplication()
+    profiler, watchdog = ComProfiler(), Watchdog(kill=lambda pid: None)
+    mathcad_app = registry.get(backend=backend, profiler=profiler, watchdog=watchdog)
+    assert (mathcad_app.profiler, mathcad_app.watchdog) == (profiler, watchdog)
+    assert registry.get(backend=backend, profiler=profiler, watchdog=watchdog) is mathcad_app
+    assert registry.get(backend=backend).profiler is None  # a separate instance
+
+
+def test_sweep_profiles_the_registry_instance(worksheet_path, tmp_path):
+    registry = MathcadRegistry()
+    profiler = ComProfiler()
+    backend = FakeApplication({"test.mcdx": FakeSheet(inputs={"length": (1.0, "m")})})
+    Sweep(worksheet_path, [{"length": 2.0}], tmp_path / "results.csv", backend=backend,
+          profiler=profiler, registry=registry).run()
+    assert profiler.as_dict()["SetRealValue"]["count"] == 1
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+test_replay.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+A session recorded from the fake application and replayed without it.
+"""
+
+import pytest
+
+from MathcadPy import Mathcad
+from MathcadPy.fake import FakeApplication, FakeSheet
+from MathcadPy.replay import ReplayBackend, ReplayError, SessionRecorder
+
+
+def _job(backend, worksheet_path, length=4.0):
+    """Opens the worksheet, sets an input and returns an output"""
+    worksheet = Mathcad(visible=False, backend=backend).open(worksheet_path)
+    worksheet.set_inputs({"length": length})
+    return worksheet.get_outputs()["area"].value
+
+
+@pytest.fixture
+def trace(worksheet_path, tmp_path):
+    sheet = FakeSheet(
+        inputs={"length": (2.0, "m")}, outputs={"area": "m^2"},
+        calculate=lambda values: {"area": values["length"] * 3},
+    )
+    recorder = SessionRecorder(FakeApplication({"test.mcdx": sheet}))
+    assert _job(recorder, worksheet_path) == 12.0
+    recorder.save(tmp_path / "job.trace.gz")
+    return tmp_path / "job.trace.gz"
+
+
+def test_replay_in_another_directory(trace, worksheet_path, tmp_path):
+    moved = tmp_path / "moved"
+    moved.mkdir()
+    (moved / "test.mcdx").write_bytes(worksheet_path.read_bytes())
+    worksheet_path.unlink()
+    replay = ReplayBackend(trace, time_scale=0, paths={str(worksheet_path.parent): str(moved)})
+    assert _job(replay, moved / "test.mcdx") == 12.0
+    assert replay.remaining() == 0
+
+
+def test_unrecorded_call_raises(trace, worksheet_path):
+    with pytest.raises(ReplayError):
+        _job(ReplayBackend(trace, time_scale=0), worksheet_path, length=5.0)
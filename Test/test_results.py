@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+test_results.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Result sinks: batching, typed matrix storage and resuming.
+"""
+
+import pytest
+
+from MathcadPy.results import (
+    NpySink, OutputResult, ParquetSink, ResultSink, SqliteSink, open_sink
+)
+
+
+def test_sqlite_round_trip(tmp_path):
+    path = tmp_path / "results.sqlite"
+    with open_sink(path, batch_size=2) as sink:
+        sink.write({"area": (6.0, "m^2", 0)}, 0, {"length": (2.0, "m")})
+        sink.write({"area": ([[1.0, 2.0], [3.0, 4.5]], "m^2", 0)}, 1)
+        sink.write({"area": (None, "", 3)}, 2)
+        assert sink.completed_cases() == {0, 1}  # the third case is still buffered
+    assert SqliteSink(path).completed_cases() == {0, 1, 2}
+    assert list(SqliteSink.read(path)) == [
+        (0, {"area": OutputResult(6.0, "m^2", 0)}),
+        (1, {"area": OutputResult([[1.0, 2.0], [3.0, 4.5]], "m^2", 0)}),
+        (2, {"area": OutputResult(None, "", 3)}),
+    ]
+
+
+def test_npy_stacks_values(tmp_path):
+    np = pytest.importorskip("numpy")
+    with NpySink(tmp_path / "results.npy", batch_size=10) as sink:
+        sink.write({"area": (6.0, "m^2", 0), "matrix": ([[1.0, 2.0]], "s", 0)}, 0)
+        sink.write({"area": (8.0, "m^2", 0), "matrix": ([[3.0, 4.0]], "s", 0)}, 1)
+    (chunk,) = (tmp_path / "results.npy").glob("chunk-*.npz")
+    with np.load(chunk) as arrays:
+        assert arrays["case"].tolist() == [0, 1]
+        assert arrays["area"].dtype == np.float64 and arrays["area"].tolist() == [6.0, 8.0]
+        assert arrays["matrix"].shape == (2, 1, 2)
+        assert arrays["area:units"].tolist() == ["m^2", "m^2"]
+
+
+def test_npy_mixed_values_are_stored_per_case(tmp_path):
+    np = pytest.importorskip("numpy")
+    with NpySink(tmp_path / "results.npy", batch_size=10) as sink:
+        sink.write({"label": ("A", "", 0)}, 0, {"length": 1.0})
+        sink.write({}, 1, {"length": "long"})  # a failed case
+        sink.write({"label": ("B", "", 0)}, 2, {"length": 3.0})
+    (chunk,) = (tmp_path / "results.npy").glob("chunk-*.npz")
+    with np.load(chunk) as arrays:
+        assert "label" not in arrays.files
+        assert (arrays["label[0]"].item(), arrays["label[2]"].item()) == ("A", "B")
+        assert arrays["label:error_code"].tolist() == [0, 1, 0]
+        assert arrays["input:length[1]"].item() == "long"
+
+
+def test_parquet_columns_that_appear_later_in_a_batch(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    with ParquetSink(tmp_path / "results.parquet", batch_size=10) as sink:
+        sink.write({}, 0, {"length": (1.0, "m")})  # a failed case
+        sink.write({"area": (4.0, "m^2", 0)}, 1, {"length": (2.0, "m")})
+    (part,) = (tmp_path / "results.parquet").glob("part-*.parquet")
+    table = pq.read_table(part)
+    assert table.column_names == ["case", "length", "area", "area units", "area error_code"]
+    assert table.column("area").to_pylist() == [None, 4.0]
+    assert ParquetSink(tmp_path / "results.parquet").completed_cases() == {0, 1}
+
+
+def test_failed_batch_is_not_written_again(tmp_path):
+    pytest.importorskip("numpy")
+    sink = NpySink(tmp_path / "results.npy", batch_size=1)
+    sink.path = tmp_path / "file"
+    sink.path.write_text("")  # not a directory, so the batch cannot be written
+    with pytest.raises(OSError):
+        sink.write({"area": (1.0, "", 0)}, 0)
+    sink.close()  # nothing is left buffered to fail again
+    assert sink.cases_written == 0
+
+
+def test_sink_is_abstract():
+    with pytest.raises(TypeError):
+        ResultSink()  # pylint: disable=abstract-class-instantiated
+
+
+def test_open_sink_extension(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(tmp_path / "results.txt")
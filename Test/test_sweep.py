@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+test_sweep.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Sweeps run against the fake application: result stores and resuming.
+"""
+
+import csv
+import sqlite3
+
+import pytest
+
+from MathcadPy._application import MathcadComError
+from MathcadPy.fake import FakeApplication, FakeSheet
+from MathcadPy.results import NpySink
+from MathcadPy.sweep import Sweep, open_store
+from MathcadPy.watchdog import Watchdog
+
+
+class _Stop(Exception):
+    """Stands in for a job that dies part way through a sweep"""
+
+
+def _calculate(values):
+    if values["length"] < 0:
+        raise RuntimeError("negative length")
+    if values["length"] == 0:
+        raise MathcadComError("Mathcad has stopped responding")
+    return {"area": values["length"] * values["width"]}
+
+
+class _Application(FakeApplication):
+    """Records Quit calls, and fails them if hung is True"""
+
+    def __init__(self, sheets):
+        super().__init__(sheets)
+        self.quit_calls = 0
+        self.hung = False
+
+    def Quit(self, save_option):
+        self.quit_calls += 1
+        if self.hung:
+            raise MathcadComError("Mathcad is not responding")
+        super().Quit(save_option)
+
+
+class _Watchdog(Watchdog):
+    """Watches a made up process id and records the processes it kills"""
+
+    def __init__(self):
+        self.killed = []
+        super().__init__(kill=self.killed.append)
+
+    def track(self, process_ids_before):
+        self.pid = 1234
+
+
+def _backend():
+    sheet = FakeSheet(
+        inputs={"length": (1.0, "m"), "width": (2.0, "m")}, outputs={"area": "m^2"},
+        calculate=_calculate,
+    )
+    return _Application({"test.mcdx": sheet})
+
+
+def _stop_after(cases):
+    """A progress callback that stops the sweep once a number of cases have run"""
+
+    def progress(report):
+        if report.cases_run >= cases:
+            raise _Stop
+
+    return progress
+
+
+def _rows(path):
+    if path.suffix == ".csv":
+        with open(path, newline="", encoding="utf-8") as file:
+            return list(csv.DictReader(file))
+    connection = sqlite3.connect(str(path))
+    connection.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in connection.execute('SELECT * FROM results ORDER BY "case"')]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("store_name", ["results.csv", "results.sqlite"])
+def test_resume(worksheet_path, tmp_path, store_name):
+    store = tmp_path / store_name
+    design_space = {"length": [1.0, 2.0, 3.0], "width": [10.0, 20.0]}
+    with pytest.raises(_Stop):
+        Sweep(worksheet_path, design_space, store, backend=_backend(),
+              progress=_stop_after(4)).run()
+    report = Sweep(worksheet_path, design_space, store, backend=_backend()).run()
+    assert (report.cases_skipped, report.cases_run, report.cases_failed) == (4, 2, 0)
+    rows = _rows(store)
+    assert [int(row["case"]) for row in rows] == list(range(6))
+    assert [float(row["area"]) for row in rows] == [10.0, 20.0, 20.0, 40.0, 30.0, 60.0]
+
+
+@pytest.mark.parametrize("store_name", ["results.csv", "results.sqlite"])
+def test_columns_added_after_a_failed_first_case(worksheet_path, tmp_path, store_name):
+    store = tmp_path / store_name
+    cases = [{"length": -1.0}, {"length": 2.0}]
+    report = Sweep(worksheet_path, cases, store, backend=_backend()).run()
+    assert (report.cases_run, report.cases_failed) == (2, 1)
+    first, second = _rows(store)
+    assert "RuntimeError: negative length" in first["error"]
+    assert first["area"] in ["", None]
+    assert (float(second["area"]), second["area units"], second["error"]) == (4.0, "m^2", "")
+
+
+def test_csv_partial_row_is_dropped(tmp_path):
+    path = tmp_path / "results.csv"
+    store = open_store(path)
+    store.append({"case": 0, "x": 1.0})
+    store.append({"case": 1, "x": 2.0})
+    store.close()
+    path.write_bytes(path.read_bytes()[:-3])  # the job died whilst writing case 1
+    assert open_store(path).completed_cases() == {0}
+
+
+def test_parquet_store(worksheet_path, tmp_path):
+    pytest.importorskip("pyarrow")
+    store = tmp_path / "results.parquet"
+    cases = [{"length": -1.0}, {"length": 2.0}, {"length": 3.0}]
+    Sweep(worksheet_path, cases, store, backend=_backend()).run()
+    assert open_store(store).completed_cases() == {0, 1, 2}
+
+
+
+def test_mathcad_is_quit_after_a_com_error(worksheet_path, tmp_path):
+    backend = _backend()
+    cases = [{"length": 1.0}, {"length": 0.0}, {"length": 2.0}]
+    report = Sweep(worksheet_path, cases, tmp_path / "results.csv", backend=backend).run()
+    assert (report.cases_run, report.cases_failed) == (3, 1)
+    assert backend.quit_calls == 1  # quit after the COM error, not left running
+    assert "MathcadComError" in _rows(tmp_path / "results.csv")[1]["error"]
+
+
+def test_unresponsive_mathcad_is_killed_after_a_com_error(worksheet_path, tmp_path):
+    backend = _backend()
+    backend.hung = True
+    watchdog = _Watchdog()
+    Sweep(worksheet_path, [{"length": 0.0}], tmp_path / "results.csv", backend=backend,
+          watchdog=watchdog).run()
+    assert watchdog.killed == [1234]
+
+
+def test_sink_resumes_with_the_store(worksheet_path, tmp_path):
+    pytest.importorskip("numpy")
+    store = tmp_path / "results.csv"
+    cases = [{"length": float(length)} for length in [1, 2, 3, -4, 5]]
+    sink = NpySink(tmp_path / "results.npy", batch_size=2)
+    sink.close = lambda: None  # the job dies before the last batch is written
+    with pytest.raises(_Stop):
+        Sweep(worksheet_path, cases, store, backend=_backend(), sink=sink,
+              progress=_stop_after(3)).run()
+    assert open_store(store).completed_cases() == {0, 1, 2}
+    assert NpySink(tmp_path / "results.npy").completed_cases() == {0, 1}
+
+    sink = NpySink(tmp_path / "results.npy", batch_size=2)
+    report = Sweep(worksheet_path, cases, store, backend=_backend(), sink=sink).run()
+    assert (report.cases_skipped, report.cases_run, report.cases_failed) == (2, 3, 1)
+    assert [int(row["case"]) for row in _rows(store)] == [0, 1, 2, 3, 4]  # not duplicated
+    assert NpySink(tmp_path / "results.npy").completed_cases() == {0, 1, 2, 3, 4}
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+test_util.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Discovery of Mathcad Prime installations from a FakeRegistry, and its on-disk cache.
+"""
+
+import pytest
+
+from MathcadPy.fake import FakeRegistry
+from MathcadPy.util import (
+    APP_PATHS_KEY, UNINSTALL_KEYS, RegistryReader, find_installation, list_installations,
+)
+
+UNINSTALL = UNINSTALL_KEYS[0]
+
+
+def _registry():
+    """Prime 9 and 10 installed, with the version independent ProgID starting Prime 10"""
+    return FakeRegistry({
+        rf"{UNINSTALL}\{{P9}}": {
+            "DisplayName": "PTC Mathcad Prime 9.0.0.0", "DisplayVersion": "9.0.0.0",
+            "InstallLocation": "C:\\Program Files\\PTC\\Mathcad Prime 9.0.0.0\\",
+        },
+        rf"{UNINSTALL}\{{P10}}": {
+            "DisplayName": "PTC Mathcad Prime 10.0.0.0", "DisplayVersion": "10.0.0.0",
+            "DisplayIcon": '"C:\\Program Files\\PTC\\Mathcad Prime 10.0.0.0\\MathcadPrime.exe",0',
+        },
+        rf"{UNINSTALL}\Other": {"DisplayName": "Something else", "DisplayVersion": "1.0"},
+        r"HKCR\MathcadPrime.Application\CLSID": {"": "{C}"},
+        r"HKCR\CLSID\{C}\LocalServer32": {
+            "": '"C:\\Program Files\\PTC\\Mathcad Prime 10.0.0.0\\MathcadPrime.exe" /automation'
+        },
+    })
+
+
+def test_discovery():
+    installations = list_installations(_registry())
+    assert [installation.version for installation in installations] == ["9.0.0.0", "10.0.0.0"]
+    assert installations[0].path == "C:\\Program Files\\PTC\\Mathcad Prime 9.0.0.0"
+    assert installations[1].path == "C:\\Program Files\\PTC\\Mathcad Prime 10.0.0.0"
+    assert [installation.prog_id for installation in installations] == [
+        None, "MathcadPrime.Application"
+    ]
+
+
+def test_versioned_prog_id():
+    registry = _registry()
+    registry.set(r"HKCR\MathcadPrime.Application.9", {})
+    assert list_installations(registry)[0].prog_id == "MathcadPrime.Application.9"
+
+
+def test_path_from_app_paths():
+    registry = FakeRegistry({
+        rf"{UNINSTALL}\{{P10}}": {"DisplayName": "PTC Mathcad Prime 10.0.0.0"},
+        APP_PATHS_KEY: {"": "C:\\PTC\\Prime\\MathcadPrime.exe"},
+    })
+    (installation,) = list_installations(registry)
+    assert (installation.version, installation.path) == ("10.0.0.0", "C:\\PTC\\Prime")
+
+
+def test_find_installation():
+    registry = _registry()
+    assert find_installation("10", reader=registry).version == "10.0.0.0"
+    assert find_installation(reader=registry).version == "10.0.0.0"  # the newest
+    with pytest.raises(ValueError, match="installed versions: 9.0.0.0, 10.0.0.0"):
+        find_installation("8", reader=registry)
+
+
+def test_cache_is_discarded_when_an_installation_is_removed(tmp_path):
+    registry = _registry()
+    cache_path = tmp_path / "installations.json"
+    assert len(list_installations(registry, cache_path)) == 2
+    assert cache_path.exists()
+    registry.delete(rf"{UNINSTALL}\{{P9}}")
+    assert [installation.version for installation in list_installations(registry, cache_path)] == [
+        "10.0.0.0"
+    ]
+
+
+def test_cache_tracks_prog_id_keys(tmp_path):
+    registry = _registry()
+    cache_path = tmp_path / "installations.json"
+    assert list_installations(registry, cache_path)[0].prog_id is None
+    registry.set(r"HKCR\MathcadPrime.Application.9", {})
+    assert list_installations(registry, cache_path)[0].prog_id == "MathcadPrime.Application.9"
+    registry.set(
+        r"HKCR\CLSID\{C}\LocalServer32",
+        {"": "C:\\Program Files\\PTC\\Mathcad Prime 9.0.0.0\\MathcadPrime.exe"},
+    )
+    assert list_installations(registry, cache_path)[1].prog_id is None
+
+
+def test_cached_result(tmp_path, monkeypatch):
+    registry = _registry()
+    cache_path = tmp_path / "installations.json"
+    expected = list_installations(registry, cache_path)
+    monkeypatch.setattr(registry, "subkeys", lambda key: pytest.fail("the registry was read"))
+    assert list_installations(registry, cache_path) == expected
+    monkeypatch.undo()
+    assert list_installations(registry, cache_path, refresh=True) == expected
+
+
+def test_reader_is_abstract():
+    with pytest.raises(TypeError):
+        RegistryReader()  # pylint: disable=abstract-class-instantiated
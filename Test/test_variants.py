@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+test_variants.py
+~~~~~~~~~~~~~~
+MathcadPy
+https://github.com/MattWoodhead/MathcadPy
+Copyright 2025 Matt Woodhead
+
+Variants written with MathcadPy.variants read back with McdxWorksheet.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from MathcadPy.mcdx import McdxWorksheet
+from MathcadPy.variants import _SAVED_RESULT, McdxTemplate, write_variants
+
+TEST_DIR = Path(__file__).parent
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_round_trip(tmp_path, processes):
+    cases = [
+        {"real_input_test": -2.5, "string_input_test": "case <A> & B"},
+        {"real_input_with_units_test": (7.0, "mm"), "matrix_input_test": [[5.0, 6.0], [7.5, 8]]},
+    ]
+    results = write_variants(TEST_DIR / "test.mcdx", cases, tmp_path, processes=processes)
+    assert [(result.case, result.error) for result in results] == [(0, ""), (1, "")]
+    assert [result.path.name for result in results] == ["test_00000.mcdx", "test_00001.mcdx"]
+
+    first = McdxWorksheet(results[0].path)
+    assert first.get_input("real_input_test") == (-2.5, "", 0)
+    assert first.get_input("string_input_test") == ("case <A> & B", "", 0)
+    assert first.get_input("real_input_with_units_test") == (3.0, "mm", 0)  # unchanged
+    second = McdxWorksheet(results[1].path)
+    assert second.get_input("real_input_with_units_test") == (7.0, "mm", 0)
+    assert second.get_input("matrix_input_test") == ([[5.0, 6.0], [7.5, 8.0]], "s", 0)
+
+
+def test_new_units(tmp_path):
+    destination = McdxTemplate(TEST_DIR / "test.mcdx").write(
+        tmp_path / "variant.mcdx", {"real_input_with_units_test": (0.25, "m")},
+        preserve_worksheet_units=False,
+    )
+    assert McdxWorksheet(destination).get_input("real_input_with_units_test") == (0.25, "m", 0)
+
+
+def test_saved_results_are_removed(tmp_path):
+    destination = McdxTemplate(TEST_DIR / "test.mcdx").write(
+        tmp_path / "variant.mcdx", {"real_input_test": 12.0}
+    )
+    _value, _units, error_code = McdxWorksheet(destination).get_output("real_output_test")
+    assert error_code != 0  # calculated when the variant is next opened in Mathcad
+
+
+@pytest.mark.parametrize("saved", [
+    b"<result><real>1</real></result>",
+    b'<ml:result xml:space="preserve"><ml:real>1</ml:real></ml:result>',
+])
+def test_saved_result_pattern(saved):
+    part = b"<regions><region>" + saved + b"<results /></region></regions>"
+    assert _SAVED_RESULT.sub(b"", part) == b"<regions><region><results /></region></regions>"
+
+
+def test_unknown_alias(tmp_path):
+    results = write_variants(TEST_DIR / "test.mcdx", [{"missing": 1.0}], tmp_path)
+    assert results[0].error.startswith("ValueError")
+    assert not results[0].path.exists()
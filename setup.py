@@ -32,8 +32,8 @@ setup(
     url=about['__url__'],
     packages=['MathcadPy'],
     include_package_data=True,
-    python_requires=">3.5",
-    install_requires=['pywin32'],
+    python_requires=">=3.7",
+    install_requires=['pywin32; sys_platform == "win32"'],
     license=about['__license__'],
     zip_safe=False,
     entry_points={
@@ -42,7 +42,15 @@ setup(
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
+        'Programming Language :: Python :: 3.13',
         'Environment :: Win32 (MS Windows)',
         'License :: OSI Approved :: GNU General Public License v3 (GPLv3)',
     ],